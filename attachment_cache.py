@@ -0,0 +1,294 @@
+# attachment_cache.py
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Awaitable, BinaryIO, Callable
+
+from config import (
+    MEDIA_ATTACHED_TTL,
+    MEDIA_CACHE_DIR,
+    MEDIA_CACHE_DB_PATH,
+    MEDIA_CACHE_MAX_BYTES,
+    MEDIA_CACHE_MAX_FILE_BYTES,
+    MEDIA_CHUNK_SIZE,
+)
+from storage import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+
+ATTACHMENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attachment_blobs (
+    sha256     TEXT PRIMARY KEY,
+    size       INTEGER NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attachment_blobs_lru ON attachment_blobs (last_used);
+CREATE TABLE IF NOT EXISTS attachment_files (
+    unique_id  TEXT PRIMARY KEY,
+    sha256     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attachment_files_sha ON attachment_files (sha256);
+CREATE TABLE IF NOT EXISTS issue_attachments (
+    issue_key   TEXT NOT NULL,
+    sha256      TEXT NOT NULL,
+    filename    TEXT NOT NULL,
+    attached_at REAL NOT NULL,
+    PRIMARY KEY (issue_key, sha256)
+);
+"""
+
+
+class AttachmentCache:
+    """
+    Кеш вкладень на диску, адресований вмістом:
+      - file_unique_id Telegram → SHA-256 вмісту → файл <directory>/<sha256>;
+        повторне вкладення того самого файлу не завантажується з Telegram;
+      - сумарний розмір обмежений max_bytes, найдавніше використані файли
+        витісняються першими (LRU);
+      - для кожної задачі зберігаються хеші вже прикріплених файлів, тож
+        той самий файл у ту саму задачу вдруге не вивантажується; записи
+        старші за attached_ttl забуваються, а знайдений запис можна звірити
+        зі списком вкладень у Jira (verify) — видалене там вкладення
+        прикріплюється знову.
+    Метадані — у SQLite (WAL), тому кеш спільний для процесів-обробників.
+    """
+
+    def __init__(
+        self,
+        db: SQLiteDatabase,
+        directory: str,
+        max_bytes: int,
+        max_file_bytes: int,
+        attached_ttl: int = 0,
+    ):
+        self.db = db
+        self.db.add_schema(ATTACHMENT_SCHEMA)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self.attached_ttl = attached_ttl
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+        self.evictions = 0
+        # (задача, sha256) -> [замок, кількість власників]
+        self._locks: dict[tuple[str, str], list] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def cacheable(self, size: int | None) -> bool:
+        return self.enabled and (size or 0) <= self.max_file_bytes
+
+    # --- читання ---
+
+    async def _query(self, sql: str, params: tuple) -> list[tuple]:
+        # читання теж у потоці БД: під навантаженням запис може тримати файл, а event loop чекати не повинен
+        return await self.db.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def digest_for(self, unique_id: str | None) -> str | None:
+        """SHA-256 вмісту файлу Telegram, якщо він є в кеші."""
+        if not self.enabled or not unique_id:
+            return None
+        rows = await self._query("SELECT sha256 FROM attachment_files WHERE unique_id = ?", (unique_id,))
+        return rows[0][0] if rows else None
+
+    async def open(self, digest: str) -> BinaryIO | None:
+        """Відкриває файл з кешу; None — файл витіснено (можливо, іншим процесом)."""
+        try:
+            stream = open(self._path(digest), "rb")
+        except FileNotFoundError:
+            return None
+        self.hits += 1
+        await self.db.run(lambda conn: conn.execute(
+            "UPDATE attachment_blobs SET last_used = ? WHERE sha256 = ?", (time.time(), digest)
+        ))
+        return stream
+
+    def _attached_since(self) -> float:
+        return time.time() - self.attached_ttl if self.attached_ttl > 0 else 0.0
+
+    async def is_attached(
+        self,
+        issue_key: str,
+        digest: str | None,
+        verify: Callable[[str, str], Awaitable[bool]] | None = None,
+    ) -> bool:
+        """
+        Чи файл уже прикріплено до задачі. verify(issue_key, filename) — звірка з Jira:
+        False означає, що вкладення там видалили, і запис забувається.
+        """
+        if not self.enabled or not digest:
+            return False
+        rows = await self._query(
+            "SELECT filename FROM issue_attachments WHERE issue_key = ? AND sha256 = ? AND attached_at >= ?",
+            (issue_key, digest, self._attached_since()),
+        )
+        if not rows:
+            return False
+        if verify is not None and not await verify(issue_key, rows[0][0]):
+            await self.forget_attached(issue_key, digest)
+            return False
+        self.duplicates += 1
+        return True
+
+    @asynccontextmanager
+    async def attaching(self, issue_key: str, digests):
+        """
+        Серіалізує «перевірити is_attached → вивантажити → mark_attached» для тих самих
+        файлів у ту саму задачу: паралельні надсилання одного файлу не вивантажують його двічі.
+        Замки беруться в сталому порядку, тож альбоми з перехресними файлами не блокують одне одного.
+        """
+        keys = sorted({(issue_key, d) for d in digests if d})
+        async with AsyncExitStack() as stack:
+            for key in keys:
+                entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+                entry[1] += 1
+                stack.callback(self._release, key)
+                await stack.enter_async_context(entry[0])
+            yield
+
+    def _release(self, key: tuple[str, str]) -> None:
+        entry = self._locks[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[key]
+
+    # --- запис ---
+
+    def _write_blob(self, stream: BinaryIO) -> tuple[str, int]:
+        """Копіює потік у кеш, рахуючи SHA-256; потік лишається на початку."""
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while chunk := stream.read(MEDIA_CHUNK_SIZE):
+                    sha.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            digest = sha.hexdigest()
+            if os.path.exists(self._path(digest)):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, self._path(digest))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            stream.seek(0)
+        return digest, size
+
+    async def store(self, unique_id: str | None, stream: BinaryIO) -> str | None:
+        """
+        Зберігає щойно завантажений файл і повертає його SHA-256.
+        None — кеш вимкнено або запис не вдався (вкладення все одно надсилається).
+        """
+        if not self.enabled or not unique_id:
+            return None
+        self.misses += 1
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            digest, size = await asyncio.to_thread(self._write_blob, stream)
+        except OSError as e:
+            logger.warning(f"[MEDIA-CACHE] Не вдалося зберегти файл у кеш: {e}")
+            return None
+        if size > self.max_file_bytes:
+            await asyncio.to_thread(self._remove_blob, digest)
+            return digest
+
+        def save(conn: sqlite3.Connection) -> int:
+            now = time.time()
+            conn.execute(
+                "INSERT INTO attachment_blobs (sha256, size, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT(sha256) DO UPDATE SET last_used = excluded.last_used",
+                (digest, size, now),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO attachment_files (unique_id, sha256) VALUES (?, ?)",
+                (unique_id, digest),
+            )
+            return self._evict(conn)
+
+        self.evictions += await self.db.run(save)
+        return digest
+
+    def _remove_blob(self, digest: str) -> None:
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Витісняє найдавніше використані файли, поки кеш більший за max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM attachment_blobs").fetchone()[0]
+        evicted = 0
+        if total <= self.max_bytes:
+            return evicted
+        for digest, size in conn.execute(
+            "SELECT sha256, size FROM attachment_blobs ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM attachment_blobs WHERE sha256 = ?", (digest,))
+            conn.execute("DELETE FROM attachment_files WHERE sha256 = ?", (digest,))
+            self._remove_blob(digest)
+            total -= size
+            evicted += 1
+        return evicted
+
+    async def mark_attached(self, issue_key: str, digest: str | None, filename: str) -> None:
+        if not self.enabled or not digest:
+            return
+
+        def save(conn: sqlite3.Connection) -> None:
+            # прострочені записи заразом прибираємо, щоб таблиця не росла безмежно
+            conn.execute("DELETE FROM issue_attachments WHERE attached_at < ?", (self._attached_since(),))
+            conn.execute(
+                "INSERT OR REPLACE INTO issue_attachments (issue_key, sha256, filename, attached_at) "
+                "VALUES (?, ?, ?, ?)",
+                (issue_key, digest, filename, time.time()),
+            )
+
+        await self.db.run(save)
+
+    async def forget_attached(self, issue_key: str, digest: str) -> None:
+        await self.db.run(lambda conn: conn.execute(
+            "DELETE FROM issue_attachments WHERE issue_key = ? AND sha256 = ?", (issue_key, digest)
+        ))
+
+    def close(self) -> None:
+        self.db.close()
+
+    def stats(self) -> dict:
+        used = (0, 0)
+        if self.enabled:
+            used = self.db.read("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM attachment_blobs")[0]
+        return {
+            "files": used[0],
+            "bytes": used[1],
+            "hits": self.hits,
+            "misses": self.misses,
+            "duplicates": self.duplicates,
+            "evictions": self.evictions,
+        }
+
+
+attachment_cache = AttachmentCache(
+    SQLiteDatabase(MEDIA_CACHE_DB_PATH),
+    MEDIA_CACHE_DIR,
+    max_bytes=MEDIA_CACHE_MAX_BYTES,
+    max_file_bytes=MEDIA_CACHE_MAX_FILE_BYTES,
+    attached_ttl=MEDIA_ATTACHED_TTL,
+)
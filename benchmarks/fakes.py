@@ -0,0 +1,246 @@
+# benchmarks/fakes.py
+"""
+Локальні замінники зовнішніх сервісів для бенчмарку:
+Jira (httpx.MockTransport), Google Sheets (in-memory worksheet)
+та Bot API (BaseRequest, що відповідає без мережі).
+Затримка кожного сервісу задається окремо.
+"""
+import asyncio
+import itertools
+import json
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import httpx
+from gspread.utils import a1_to_rowcol
+from telegram.request import BaseRequest, RequestData
+
+from google_sheets_service import USER_HEADERS, TICKET_HEADERS
+
+
+# -----------------------
+# JIRA
+# -----------------------
+
+class FakeJira:
+    """Мінімальний REST API Jira Cloud: створення задач, пошук, коментарі, вкладення."""
+
+    def __init__(self, latency: float = 0.05, project: str = "BENCH"):
+        self.latency = latency
+        self.project = project
+        self.issues: dict[str, dict] = {}
+        self.calls: Counter = Counter()
+        self._ids = itertools.count(1)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = request.url.path
+        method = request.method
+        if method == "POST" and path == "/rest/api/3/issue":
+            self.calls["create"] += 1
+            fields = json.loads(request.content)["fields"]
+            key = f"{self.project}-{next(self._ids)}"
+            self.issues[key] = {
+                "status": "Open",
+                "summary": fields.get("summary", ""),
+                "labels": fields.get("labels", []),
+                "comments": 0,
+                "attachments": [],
+            }
+            return httpx.Response(201, json={"id": key.split("-")[1], "key": key})
+        if method == "GET" and path == "/rest/api/3/myself":
+            self.calls["myself"] += 1
+            return httpx.Response(200, json={"accountId": "bench", "emailAddress": "bench@example.com"})
+        if method == "POST" and path == "/rest/api/3/search":
+            self.calls["search"] += 1
+            return httpx.Response(200, json={"issues": self._search(json.loads(request.content)["jql"])})
+
+        match = re.fullmatch(r"/rest/api/3/issue/([^/]+)(/comment|/attachments)?", path)
+        issue = self.issues.get(match.group(1)) if match else None
+        if issue is None:
+            return httpx.Response(404, json={"errorMessages": ["Issue does not exist"]})
+        key, sub = match.group(1), match.group(2)
+        if method == "GET" and sub is None:
+            self.calls["get"] += 1
+            return httpx.Response(200, json={"key": key, "fields": self._fields(issue)})
+        if method == "POST" and sub == "/comment":
+            self.calls["comment"] += 1
+            issue["comments"] += 1
+            return httpx.Response(201, json={"id": str(issue["comments"])})
+        if method == "POST" and sub == "/attachments":
+            self.calls["attach"] += 1
+            body = await request.aread()
+            names = re.findall(rb'filename="([^"]*)"', body)
+            issue["attachments"].extend(n.decode() for n in names)
+            return httpx.Response(200, json=[{"id": str(len(issue["attachments"]))}])
+        return httpx.Response(405)
+
+    @staticmethod
+    def _fields(issue: dict) -> dict:
+        return {
+            "status": {"name": issue["status"]},
+            "summary": issue["summary"],
+            "attachment": [{"filename": name} for name in issue["attachments"]],
+        }
+
+    def _search(self, jql: str) -> list[dict]:
+        keys = re.search(r"key in \(([^)]*)\)", jql)
+        if keys:
+            wanted = [k.strip() for k in keys.group(1).split(",")]
+            return [{"key": k, "fields": self._fields(self.issues[k])} for k in wanted if k in self.issues]
+        label = re.search(r'labels = "([^"]+)"', jql)
+        if label:
+            return [
+                {"key": k, "fields": self._fields(i)}
+                for k, i in self.issues.items() if label.group(1) in i["labels"]
+            ][:1]
+        return []
+
+
+def file_download_transport(size: int, latency: float = 0.0) -> httpx.MockTransport:
+    """Відповідає на завантаження файлів з Telegram вмістом заданого розміру."""
+    payload = b"\0" * size
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        if latency:
+            await asyncio.sleep(latency)
+        return httpx.Response(200, content=payload)
+
+    return httpx.MockTransport(handle)
+
+
+# -----------------------
+# GOOGLE SHEETS
+# -----------------------
+
+class FakeWorksheet:
+    """Аркуш у пам'яті з тими методами gspread, якими користується бот."""
+
+    def __init__(self, headers: list[str], rows: list[list[str]] | None = None, latency: float = 0.1):
+        self.latency = latency
+        self.values = [list(headers)] + [list(r) for r in rows or []]
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _wait(self, op: str) -> None:
+        self.calls[op] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_all_values(self):
+        self._wait("get_all_values")
+        with self._lock:
+            return [list(r) for r in self.values]
+
+    def get(self, range_name: str):
+        self._wait("get")
+        first = int(re.match(r"[A-Z]+(\d+)", range_name).group(1))
+        with self._lock:
+            return [list(r) for r in self.values[first - 1:]]
+
+    def cell(self, row: int, col: int):
+        self._wait("cell")
+        with self._lock:
+            line = self.values[row - 1] if row <= len(self.values) else []
+            return SimpleNamespace(value=line[col - 1] if col <= len(line) else None)
+
+    def col_values(self, col: int):
+        self._wait("col_values")
+        with self._lock:
+            return [r[col - 1] if col <= len(r) else "" for r in self.values]
+
+    def append_rows(self, rows, **kwargs):
+        self._wait("append_rows")
+        with self._lock:
+            self.values.extend([str(v) for v in r] for r in rows)
+
+    def batch_update(self, data, **kwargs):
+        self._wait("batch_update")
+        with self._lock:
+            for item in data:
+                row, col = a1_to_rowcol(item["range"])
+                while len(self.values) < row:
+                    self.values.append([])
+                line = self.values[row - 1]
+                line.extend([""] * (col - len(line)))
+                line[col - 1] = str(item["values"][0][0])
+
+
+class FakeSheets:
+    """Аркуші users і tickets; підміняє SheetsSession.worksheet."""
+
+    def __init__(self, users: list[list[str]], latency: float = 0.1):
+        self.users = FakeWorksheet(USER_HEADERS, users, latency)
+        self.tickets = FakeWorksheet(TICKET_HEADERS, [], latency)
+
+    def worksheet(self, sheet_id: str, name: str) -> FakeWorksheet:
+        return self.users if name == "users" else self.tickets
+
+    def install(self, session) -> None:
+        session.worksheet = self.worksheet
+
+
+# -----------------------
+# TELEGRAM BOT API
+# -----------------------
+
+BOT_USER = {"id": 100000, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+
+class FakeBotRequest(BaseRequest):
+    """Bot API без мережі: відповідає валідними об'єктами після заданої затримки."""
+
+    def __init__(self, latency: float = 0.02, file_size: int = 256 * 1024):
+        self.latency = latency
+        self.file_size = file_size
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self) -> float | None:
+        return 5.0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url: str, method: str, request_data: RequestData | None = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[endpoint] += 1
+        params = request_data.parameters if request_data is not None else {}
+        if self.latency and endpoint != "getMe":
+            await asyncio.sleep(self.latency)
+        return 200, json.dumps({"ok": True, "result": self._result(endpoint, params)}).encode()
+
+    def _result(self, endpoint: str, params: dict):
+        if endpoint == "getMe":
+            return dict(BOT_USER, can_join_groups=False, can_read_all_group_messages=False,
+                        supports_inline_queries=False)
+        if endpoint.startswith("send") or endpoint.startswith("edit"):
+            chat_id = int(params.get("chat_id", 0))
+            return {
+                "message_id": int(params.get("message_id") or next(self._message_ids)),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        if endpoint == "getFile":
+            file_id = params["file_id"]
+            return {
+                "file_id": file_id,
+                "file_unique_id": f"u{file_id}",
+                "file_size": self.file_size,
+                "file_path": f"documents/{file_id}.bin",
+            }
+        return True
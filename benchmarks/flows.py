@@ -0,0 +1,154 @@
+# benchmarks/flows.py
+"""
+Синтетичні оновлення Telegram і сценарії віртуальних користувачів.
+Кожне оновлення проходить через справжній Application (update_processor,
+обробники, persistence), а час його обробки записується під назвою сценарію.
+"""
+import asyncio
+import itertools
+import time
+from collections import defaultdict
+
+from telegram import Update
+
+from keyboards import STEPS, OPTIONS, BUTTONS
+
+FLOWS = ("start", "contact", "create_ticket", "create_ticket.async", "media", "my_tickets", "comment")
+
+
+class VirtualUser:
+    def __init__(self, index: int):
+        self.index = index
+        self.user_id = 500000 + index
+        self.username = f"bench{index}"
+        self.phone = f"+38050{index:07d}"
+        self.issue_key: str | None = None
+
+    @property
+    def user(self) -> dict:
+        return {"id": self.user_id, "is_bot": False, "first_name": f"Bench{self.index}", "username": self.username}
+
+    @property
+    def chat(self) -> dict:
+        return {"id": self.user_id, "type": "private", "first_name": f"Bench{self.index}"}
+
+    def directory_row(self) -> list[str]:
+        """Рядок аркуша users: користувач відомий лише за телефоном, telegram_id дописується при авторизації."""
+        return [f"key{self.index}", f"Bench User {self.index}", OPTIONS["division"][0],
+                OPTIONS["department"][0], self.phone, "", "", f"bench{self.index}@example.com", ""]
+
+
+class UpdateFactory:
+    def __init__(self, bot):
+        self.bot = bot
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1_000_000)
+
+    def _message(self, vu: VirtualUser, **fields) -> dict:
+        return {"message_id": next(self._message_ids), "date": int(time.time()),
+                "chat": vu.chat, "from": vu.user, **fields}
+
+    def _update(self, **fields) -> Update:
+        return Update.de_json({"update_id": next(self._update_ids), **fields}, self.bot)
+
+    def text(self, vu: VirtualUser, text: str) -> Update:
+        fields = {"text": text}
+        if text.startswith("/"):
+            fields["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return self._update(message=self._message(vu, **fields))
+
+    def contact(self, vu: VirtualUser) -> Update:
+        contact = {"phone_number": vu.phone, "first_name": vu.user["first_name"], "user_id": vu.user_id}
+        return self._update(message=self._message(vu, contact=contact))
+
+    def document(self, vu: VirtualUser, size: int) -> Update:
+        n = next(self._message_ids)
+        document = {"file_id": f"doc{n}", "file_unique_id": f"udoc{n}",
+                    "file_name": f"report_{n}.pdf", "mime_type": "application/pdf", "file_size": size}
+        return self._update(message=self._message(vu, document=document))
+
+    def callback(self, vu: VirtualUser, data: str) -> Update:
+        message = self._message(vu, text="✒️", **{"from": {"id": 100000, "is_bot": True, "first_name": "Bench"}})
+        return self._update(callback_query={
+            "id": str(next(self._update_ids)), "from": vu.user, "chat_instance": str(vu.user_id),
+            "data": data, "message": message,
+        })
+
+
+class Recorder:
+    """Затримки по сценаріях і загальна кількість оброблених оновлень."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.updates = 0
+
+    def add(self, flow: str, seconds: float) -> None:
+        self.samples[flow].append(seconds)
+
+
+class FlowRunner:
+    def __init__(self, app, factory: UpdateFactory, recorder: Recorder, *, file_size: int,
+                 outbox, think_time: float = 0.0, outbox_timeout: float = 60.0):
+        self.app = app
+        self.factory = factory
+        self.recorder = recorder
+        self.file_size = file_size
+        self.outbox = outbox
+        self.think_time = think_time
+        self.outbox_timeout = outbox_timeout
+
+    async def send(self, flow: str, update: Update) -> None:
+        started = time.perf_counter()
+        # той самий шлях, яким Application обробляє оновлення з update_queue
+        await self.app.update_processor.process_update(update, self.app.process_update(update))
+        self.recorder.add(flow, time.perf_counter() - started)
+        self.recorder.updates += 1
+        if self.think_time:
+            await asyncio.sleep(self.think_time)
+
+    def user_data(self, vu: VirtualUser) -> dict:
+        return self.app.user_data[vu.user_id]
+
+    async def run_user(self, vu: VirtualUser) -> None:
+        await self.send("start", self.factory.text(vu, "/start"))
+        await self.send("contact", self.factory.contact(vu))
+        await self.create_ticket(vu)
+        if vu.issue_key:
+            await self.send("media", self.factory.document(vu, self.file_size))
+        await self.send("my_tickets", self.factory.text(vu, BUTTONS["my_tickets"]))
+        if vu.issue_key:
+            await self.send("comment", self.factory.text(vu, BUTTONS["add_comment"]))
+            await self.send("comment", self.factory.callback(vu, f"comment_task_{vu.issue_key}"))
+            await self.send("comment", self.factory.text(vu, f"Коментар бенчмарку {vu.index}"))
+            await self.send("comment", self.factory.text(vu, BUTTONS["exit_comment"]))
+
+    async def create_ticket(self, vu: VirtualUser) -> None:
+        await self.send("create_ticket", self.factory.text(vu, BUTTONS["create_ticket"]))
+        answers = {
+            "division": OPTIONS["division"][0],
+            "department": OPTIONS["department"][0],
+            "full_name": f"Bench User {vu.index}",
+            "service": OPTIONS["service"][0],
+            "description": f"Проблема з бенчмарку #{vu.index}",
+        }
+        # відповідаємо на той крок, який показав бот, — сценарій не залежить від порядку кроків
+        for _ in range(len(STEPS)):
+            step = self.user_data(vu).get("step")
+            if step is None or STEPS[step] not in answers:
+                break
+            await self.send("create_ticket", self.factory.text(vu, answers[STEPS[step]]))
+
+        started = time.perf_counter()
+        await self.send("create_ticket", self.factory.text(vu, BUTTONS["confirm_create"]))
+        job_id = self.user_data(vu).get("outbox_job")
+        if job_id is None:
+            return
+        deadline = started + self.outbox_timeout
+        while time.perf_counter() < deadline:
+            found = self.outbox.status(job_id)
+            if found and found[0] in ("done", "failed"):
+                vu.issue_key = found[1]
+                break
+            await asyncio.sleep(0.005)
+        if vu.issue_key:
+            self.recorder.add("create_ticket.async", time.perf_counter() - started)
@@ -0,0 +1,266 @@
+# benchmarks/run.py
+"""
+Офлайн-бенчмарк бота: справжній Application і обробники, але Jira, Google Sheets
+і Bot API замінені локальними заглушками з налаштовуваною затримкою (benchmarks/fakes.py).
+
+Запуск з кореня репозиторію:
+    python -m benchmarks.run --users 200 --jira-latency 0.08 --sheets-latency 0.15
+    python -m benchmarks.run --save-baseline          # зберегти результат як базовий
+    python -m benchmarks.run --tolerance 0.2          # порівняти з базовим, exit 1 при регресії
+    python -m benchmarks.run --smoke                  # швидка перевірка, що бенчмарк і обробники працюють
+
+Звіт: оновлень/с і p50/p95/p99 для кожного сценарію (benchmarks/flows.py).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# різниця, меншу за яку не вважаємо регресією (шум планувальника)
+ABSOLUTE_SLACK = 0.005
+SMOKE_USERS = 5
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Офлайн-бенчмарк euromix_tg_bot")
+    p.add_argument("--users", type=int, default=100, help="кількість віртуальних користувачів")
+    p.add_argument("--concurrency", type=int, default=0, help="скільки користувачів працюють одночасно (0 — усі)")
+    p.add_argument("--think-time", type=float, default=0.0, help="пауза між діями користувача, с")
+    p.add_argument("--jira-latency", type=float, default=0.05)
+    p.add_argument("--sheets-latency", type=float, default=0.1)
+    p.add_argument("--telegram-latency", type=float, default=0.02)
+    p.add_argument("--file-size", type=int, default=256 * 1024, help="розмір вкладення, байт")
+    p.add_argument("--real-flood-limits", action="store_true",
+                   help="не знімати ліміти Telegram на чат (за замовчуванням вимкнені, щоб міряти сам бот)")
+    p.add_argument("--baseline", default=BASELINE_PATH)
+    p.add_argument("--save-baseline", action="store_true", help="записати результат як базовий")
+    p.add_argument("--tolerance", type=float, default=0.2, help="допустиме погіршення p50/p95/оновлень/с")
+    p.add_argument("--json", dest="json_out", help="записати результат у файл JSON")
+    p.add_argument("--verbose", action="store_true", help="не приглушувати логи бота")
+    p.add_argument("--smoke", action="store_true",
+                   help="кілька користувачів без затримок; exit 1, якщо є помилки обробників або сценарій не пройшов")
+    args = p.parse_args(argv)
+    if args.smoke:
+        args.users, args.concurrency, args.think_time = SMOKE_USERS, 0, 0.0
+        args.jira_latency = args.sheets_latency = args.telegram_latency = 0.0
+        args.file_size = 1024
+    return args
+
+
+def configure_environment(args: argparse.Namespace, workdir: str) -> None:
+    """Змінні оточення до імпорту config: тимчасові БД, без метрик-сервера, фейковий токен."""
+    env = {
+        "TOKEN": "123456:BENCHMARK",
+        "JIRA_DOMAIN": "https://jira.bench.local",
+        "JIRA_EMAIL": "bench@example.com",
+        "JIRA_API_TOKEN": "bench",
+        "JIRA_PROJECT_KEY": "BENCH",
+        "SESSION_DB_PATH": os.path.join(workdir, "bot.sqlite3"),
+        "OUTBOX_DB_PATH": os.path.join(workdir, "bot.sqlite3"),
+        "SHARED_CACHE_PATH": os.path.join(workdir, "shared.sqlite3"),
+        "MEDIA_TMP_DIR": workdir,
+        "MEDIA_CACHE_DIR": os.path.join(workdir, "attachments"),
+        "MEDIA_CACHE_DB_PATH": os.path.join(workdir, "bot.sqlite3"),
+        "LOG_FILE": os.path.join(workdir, "bot.log"),
+        "METRICS_ENABLED": "0",
+        "BOT_WORKERS": "1",
+        "BOT_MODE": "polling",
+    }
+    if not args.real_flood_limits:
+        env.update({"TG_GLOBAL_RATE": "1000000", "TG_CHAT_RATE": "1000000", "TG_CHAT_BURST": "1000000"})
+    # явні змінні оточення мають пріоритет, крім шляхів — бенчмарк не чіпає робочі БД
+    for key, value in env.items():
+        if key.endswith("_PATH") or key in ("MEDIA_TMP_DIR", "MEDIA_CACHE_DIR", "LOG_FILE", "TOKEN", "JIRA_DOMAIN", "METRICS_ENABLED"):
+            os.environ[key] = value
+        else:
+            os.environ.setdefault(key, value)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: dict[str, list[float]], updates: int, elapsed: float, flows) -> dict:
+    result = {"updates": updates, "elapsed": round(elapsed, 3),
+              "updates_per_sec": round(updates / elapsed, 2) if elapsed else 0.0, "flows": {}}
+    for flow in flows:
+        values = sorted(samples.get(flow, []))
+        if not values:
+            continue
+        result["flows"][flow] = {
+            "count": len(values),
+            "p50": round(percentile(values, 0.50), 5),
+            "p95": round(percentile(values, 0.95), 5),
+            "p99": round(percentile(values, 0.99), 5),
+            "max": round(values[-1], 5),
+        }
+    return result
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Список регресій відносно базового результату."""
+    problems = []
+    base_rate = baseline.get("updates_per_sec", 0)
+    if base_rate and result["updates_per_sec"] < base_rate * (1 - tolerance):
+        problems.append(f"оновлень/с: {result['updates_per_sec']} < {base_rate} (−{tolerance:.0%})")
+    for flow, base in baseline.get("flows", {}).items():
+        current = result["flows"].get(flow)
+        if current is None:
+            problems.append(f"{flow}: сценарій не виконувався")
+            continue
+        for q in ("p50", "p95"):
+            limit = base[q] * (1 + tolerance)
+            if current[q] > limit and current[q] - base[q] > ABSOLUTE_SLACK:
+                problems.append(f"{flow} {q}: {current[q] * 1000:.1f} мс > {base[q] * 1000:.1f} мс (+{tolerance:.0%})")
+    return problems
+
+
+def smoke_problems(result: dict, flows) -> list[str]:
+    """Що зламано в смоук-запуску: помилки обробників і сценарії, які не виконались."""
+    problems = []
+    errors = result["extra"]["помилок обробників"]
+    if errors:
+        problems.append(f"помилок обробників: {errors}")
+    for flow in flows:
+        if flow not in result["flows"]:
+            problems.append(f"{flow}: сценарій не виконувався")
+    return problems
+
+
+def print_report(result: dict, baseline: dict | None) -> None:
+    print(f"\nОновлень: {result['updates']} за {result['elapsed']:.2f} с — {result['updates_per_sec']:.1f} оновлень/с")
+    print(f"{'сценарій':<22}{'к-сть':>7}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'max, мс':>10}{'Δp95':>9}")
+    for flow, s in result["flows"].items():
+        delta = ""
+        base = (baseline or {}).get("flows", {}).get(flow)
+        if base and base["p95"]:
+            delta = f"{(s['p95'] / base['p95'] - 1) * 100:+.0f}%"
+        print(f"{flow:<22}{s['count']:>7}{s['p50'] * 1000:>10.1f}{s['p95'] * 1000:>10.1f}"
+              f"{s['p99'] * 1000:>10.1f}{s['max'] * 1000:>10.1f}{delta:>9}")
+    for name, value in result.get("extra", {}).items():
+        print(f"  {name}: {value}")
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    # імпорти після configure_environment: config читає оточення при імпорті
+    import httpx
+
+    import media
+    from main import build_application, on_startup, on_shutdown
+    from services import jira_client
+    from google_sheets_service import sheets_session
+    from outbox import ticket_outbox
+    from metrics import HANDLER_TIMING, loop_lag_monitor
+    from benchmarks.fakes import FakeJira, FakeSheets, FakeBotRequest, file_download_transport
+    from benchmarks.flows import FLOWS, VirtualUser, UpdateFactory, Recorder, FlowRunner
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    users = [VirtualUser(i) for i in range(args.users)]
+    jira = FakeJira(args.jira_latency)
+    sheets = FakeSheets([vu.directory_row() for vu in users], args.sheets_latency)
+    bot_request = FakeBotRequest(args.telegram_latency, args.file_size)
+
+    jira_client._transport = jira.transport()
+    sheets.install(sheets_session)
+    media._download_client = httpx.AsyncClient(transport=file_download_transport(args.file_size))
+
+    app = build_application(with_updater=False, request=bot_request)
+    recorder = Recorder()
+    async with app:
+        await on_startup(app)
+        await app.start()
+        runner = FlowRunner(app, UpdateFactory(app.bot), recorder,
+                            file_size=args.file_size, outbox=ticket_outbox, think_time=args.think_time)
+        limit = asyncio.Semaphore(args.concurrency or len(users) or 1)
+
+        async def one(vu):
+            async with limit:
+                await runner.run_user(vu)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(vu) for vu in users))
+        elapsed = time.perf_counter() - started
+        await app.stop()
+    await on_shutdown(app)
+
+    result = summarize(recorder.samples, recorder.updates, elapsed, FLOWS)
+    result["params"] = {k: v for k, v in vars(args).items()
+                        if k in ("users", "concurrency", "think_time", "jira_latency", "sheets_latency",
+                                 "telegram_latency", "file_size", "real_flood_limits")}
+    result["extra"] = {
+        "помилок обробників": int(sum(HANDLER_TIMING.errors._values.values())),
+        "виклики Jira": dict(jira.calls),
+        "виклики Bot API": dict(bot_request.calls),
+        "записи Sheets": dict(sheets.tickets.calls + sheets.users.calls),
+        "event loop": loop_lag_monitor.stats(),
+    }
+    return result
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        configure_environment(args, workdir)
+        result = asyncio.run(run_benchmark(args))
+
+    if args.smoke:
+        # без порівняння з базовим: параметри смоук-запуску інші
+        from benchmarks.flows import FLOWS
+        print_report(result, None)
+        problems = smoke_problems(result, FLOWS)
+        for line in problems:
+            print(f"❌ {line}")
+        if not problems:
+            print("\n✅ Смоук-запуск пройшов")
+        return 1 if problems else 0
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("params") != result["params"]:
+            print(f"⚠️ Параметри відрізняються від базового запуску: {baseline.get('params')}")
+
+    print_report(result, baseline)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        stored = {k: v for k, v in result.items() if k != "extra"}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, ensure_ascii=False, indent=2)
+        print(f"\nБазовий результат збережено: {args.baseline}")
+        return 0
+    if baseline is None:
+        print("\nБазового результату немає — запустіть з --save-baseline, щоб зберегти поточний.")
+        return 0
+
+    problems = compare(result, baseline, args.tolerance)
+    if problems:
+        print("\n❌ Регресії:")
+        for line in problems:
+            print(f"  - {line}")
+        return 1
+    print("\n✅ Без регресій відносно базового результату")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+# cache.py
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    In-process LRU-кеш з TTL та stale-while-revalidate.
+
+    - свіжий запис (вік < ttl) віддається одразу;
+    - застарілий запис (ttl <= вік < ttl + stale_ttl) теж віддається одразу,
+      а оновлення запускається у фоні;
+    - старіший запис вважається промахом і завантажується синхронно.
+    Паралельні завантаження одного ключа об'єднуються в один запит.
+    Кожен set/invalidate ставить ключу нову позначку часу (generation); результат
+    завантаження, що почалося раніше за неї, відкидається — старі дані з Jira
+    не перезаписують свіжі та не повертають щойно інвалідований запис.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, stale_ttl: float = 300.0, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._inflight: dict[Hashable, tuple[asyncio.Future, int]] = {}
+        self._refreshing: set[Hashable] = set()
+        # ключ -> generation останнього set/invalidate, від найстаршої позначки до найновішої
+        self._generations: OrderedDict[Hashable, int] = OrderedDict()
+        self._clock = 0
+        # generation на початку кожного незавершеного завантаження -> кількість таких завантажень
+        self._loading: dict[int, int] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _age(self, key: Hashable) -> float | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        return time.monotonic() - entry[1]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Повертає значення незалежно від віку, не чіпаючи лічильники."""
+        entry = self._data.get(key)
+        return entry[0] if entry is not None else default
+
+    def lookup(self, key: Hashable) -> tuple[Any, bool] | None:
+        """
+        Повертає (значення, is_stale) для свіжого або застарілого запису,
+        None — якщо запису немає або він старший за ttl + stale_ttl.
+        Оновлює лічильники та LRU-порядок.
+        """
+        age = self._age(key)
+        if age is None or age >= self.ttl + self.stale_ttl:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        if age < self.ttl:
+            self.hits += 1
+            return self._data[key][0], False
+        self.stale_hits += 1
+        return self._data[key][0], True
+
+    def generation(self) -> int:
+        """Позначка, яку треба взяти перед завантаженням і передати в set(..., since=...)."""
+        return self._clock
+
+    def _bump(self, key: Hashable) -> None:
+        self._clock += 1
+        self._generations[key] = self._clock
+        self._generations.move_to_end(key)
+        # позначку можна забути, лише коли немає завантаження, що почалося раніше за неї:
+        # інакше set(..., since=...) не побачить інвалідації і прийме старий результат
+        oldest_load = min(self._loading, default=self._clock)
+        while len(self._generations) > self.maxsize:
+            if next(iter(self._generations.values())) > oldest_load:
+                break
+            self._generations.popitem(last=False)
+
+    def _begin_load(self) -> int:
+        since = self.generation()
+        self._loading[since] = self._loading.get(since, 0) + 1
+        return since
+
+    def _end_load(self, since: int) -> None:
+        self._loading[since] -= 1
+        if not self._loading[since]:
+            del self._loading[since]
+
+    def set(self, key: Hashable, value: Any, since: int | None = None) -> bool:
+        """
+        Записує значення. since — generation() на початку завантаження: якщо ключ
+        відтоді оновили чи інвалідували, значення застаріле і відкидається (False).
+        """
+        if since is not None and self._generations.get(key, 0) > since:
+            return False
+        self._bump(key)
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        self._bump(key)
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        found = self.lookup(key)
+        if found is not None:
+            value, stale = found
+            if stale:
+                self.refresh_in_background(key, loader)
+            return value
+        return await self._load(key, loader)
+
+    def refresh_in_background(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._refreshing or key in self._inflight:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._background_load(key, loader))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _background_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await self._load(key, loader)
+        except Exception as e:
+            logger.warning(f"[{self.name}] Фонове оновлення '{key}' не вдалося: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def load_many(self, keys: list[Hashable], loader: Callable[[list], Awaitable[dict]]) -> dict:
+        """
+        Завантажує кілька ключів одним викликом loader(keys) -> {ключ: значення}
+        (наприклад, одним JQL-пошуком) і записує результат у кеш з тією ж перевіркою
+        generation, що й get_or_load. Ключів, яких немає в результаті, кеш не запам'ятовує.
+        """
+        since = self._begin_load()
+        try:
+            values = await loader(keys)
+            for key, value in values.items():
+                self.set(key, value, since=since)
+            return values
+        finally:
+            self._end_load(since)
+
+    def refresh_many_in_background(self, keys: list[Hashable], loader: Callable[[list], Awaitable[dict]]) -> None:
+        """Фонове load_many для застарілих ключів; ключі, що вже оновлюються, пропускаються."""
+        keys = [k for k in keys if k not in self._refreshing and k not in self._inflight]
+        if not keys:
+            return
+        self._refreshing.update(keys)
+        task = asyncio.create_task(self._background_load_many(keys, loader))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _background_load_many(self, keys: list[Hashable], loader: Callable[[list], Awaitable[dict]]) -> None:
+        try:
+            await self.load_many(keys, loader)
+        except Exception as e:
+            logger.warning(f"[{self.name}] Фонове оновлення {len(keys)} ключів не вдалося: {e}")
+        finally:
+            self._refreshing.difference_update(keys)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        inflight = self._inflight.get(key)
+        # до завантаження, що почалося до інвалідації, не приєднуємось — воно принесе старі дані
+        if inflight is not None and self._generations.get(key, 0) <= inflight[1]:
+            return await asyncio.shield(inflight[0])
+
+        fut = asyncio.get_running_loop().create_future()
+        since = self._begin_load()
+        self._inflight[key] = (fut, since)
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # щоб asyncio не скаржився на невитягнутий виняток, якщо ніхто не чекав
+            fut.exception()
+            raise
+        else:
+            self.set(key, value, since=since)
+            fut.set_result(value)
+            return value
+        finally:
+            self._end_load(since)
+            if self._inflight.get(key, (None,))[0] is fut:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+        }
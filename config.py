@@ -4,7 +4,9 @@ logger = logging.getLogger(__name__)
 from datetime import datetime
 from dotenv import load_dotenv
 
-# підвантажити credentials.env
+# Єдине місце завантаження оточення: спершу .env, потім credentials.env
+# (load_dotenv не перезаписує вже задані змінні, тож оточення процесу має пріоритет)
+load_dotenv()
 load_dotenv("credentials.env")
 
 # — Telegram —
@@ -21,3 +23,169 @@ JIRA_REPORTER_ACCOUNT_ID = os.getenv("JIRA_REPORTER_ACCOUNT_ID")
 # SSL для webhook (якщо ви використовуєте webhook)
 SSL_CERT_PATH = os.getenv("SSL_CERT_PATH")
 SSL_KEY_PATH = os.getenv("SSL_KEY_PATH")
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """Читає булеву змінну оточення ("1", "true", "yes", "on")."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# — Jira HTTP-клієнт (спільний пул з'єднань) —
+JIRA_HTTP2 = _env_flag("JIRA_HTTP2", False)
+JIRA_MAX_CONNECTIONS = int(os.getenv("JIRA_MAX_CONNECTIONS", "20"))
+JIRA_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("JIRA_MAX_KEEPALIVE_CONNECTIONS", "10"))
+JIRA_KEEPALIVE_EXPIRY = float(os.getenv("JIRA_KEEPALIVE_EXPIRY", "60"))
+JIRA_CONNECT_TIMEOUT = float(os.getenv("JIRA_CONNECT_TIMEOUT", "5"))
+JIRA_TIMEOUT = float(os.getenv("JIRA_TIMEOUT", "10"))
+JIRA_WRITE_TIMEOUT = float(os.getenv("JIRA_WRITE_TIMEOUT", "15"))
+JIRA_UPLOAD_TIMEOUT = float(os.getenv("JIRA_UPLOAD_TIMEOUT", "120"))
+# Скільки ключів задач вміщується в один JQL-пошук `key in (...)`
+JIRA_SEARCH_CHUNK_SIZE = int(os.getenv("JIRA_SEARCH_CHUNK_SIZE", "50"))
+
+# Скільки заявок показувати на одній сторінці списку «Мої заявки» / вибору задачі
+TICKETS_PAGE_SIZE = int(os.getenv("TICKETS_PAGE_SIZE", "8"))
+
+# — Кеш статусів/summary задач Jira —
+ISSUE_CACHE_TTL = float(os.getenv("ISSUE_CACHE_TTL", "30"))
+ISSUE_CACHE_STALE_TTL = float(os.getenv("ISSUE_CACHE_STALE_TTL", "300"))
+ISSUE_CACHE_MAXSIZE = int(os.getenv("ISSUE_CACHE_MAXSIZE", "2000"))
+
+# — Google Sheets —
+# Пул потоків для блокуючих викликів gspread та таймаут одного виклику
+SHEETS_MAX_WORKERS = int(os.getenv("SHEETS_MAX_WORKERS", "4"))
+SHEETS_CALL_TIMEOUT = float(os.getenv("SHEETS_CALL_TIMEOUT", "30"))
+USER_DIRECTORY_REFRESH_INTERVAL = float(os.getenv("USER_DIRECTORY_REFRESH_INTERVAL", "300"))
+USER_DIRECTORY_NEGATIVE_TTL = float(os.getenv("USER_DIRECTORY_NEGATIVE_TTL", "60"))
+
+# — Моніторинг блокувань event loop —
+LOOP_LAG_MONITOR = _env_flag("LOOP_LAG_MONITOR", True)
+LOOP_LAG_REPORT_INTERVAL = float(os.getenv("LOOP_LAG_REPORT_INTERVAL", "60"))
+# Write-behind черга записів у Sheets: розмір пачки, інтервал скидання, кількість повторів
+SHEETS_WRITE_BATCH_SIZE = int(os.getenv("SHEETS_WRITE_BATCH_SIZE", "50"))
+SHEETS_WRITE_FLUSH_INTERVAL = float(os.getenv("SHEETS_WRITE_FLUSH_INTERVAL", "2"))
+SHEETS_WRITE_MAX_RETRIES = int(os.getenv("SHEETS_WRITE_MAX_RETRIES", "5"))
+# Як часто дочитувати нові рядки реєстру заявок в індекс
+TICKET_INDEX_REFRESH_INTERVAL = float(os.getenv("TICKET_INDEX_REFRESH_INTERVAL", "60"))
+
+# — Медіа: потокове завантаження з Telegram у Jira —
+# Файли до MEDIA_SPOOL_THRESHOLD байт тримаються в пам'яті, більші — у тимчасовому файлі
+MEDIA_SPOOL_THRESHOLD = int(os.getenv("MEDIA_SPOOL_THRESHOLD", str(4 * 1024 * 1024)))
+# Скільки байт вкладень може одночасно перебувати в обробці (завантаження + вивантаження)
+MEDIA_MAX_INFLIGHT_BYTES = int(os.getenv("MEDIA_MAX_INFLIGHT_BYTES", str(100 * 1024 * 1024)))
+MEDIA_CHUNK_SIZE = int(os.getenv("MEDIA_CHUNK_SIZE", str(64 * 1024)))
+MEDIA_TMP_DIR = os.getenv("MEDIA_TMP_DIR") or None
+MEDIA_DOWNLOAD_TIMEOUT = float(os.getenv("MEDIA_DOWNLOAD_TIMEOUT", "120"))
+# Скільки секунд після останньої частини альбому чекати наступну
+MEDIA_GROUP_WINDOW = float(os.getenv("MEDIA_GROUP_WINDOW", "1.5"))
+
+# — Режим отримання оновлень: "polling" (за замовчуванням) або "webhook" —
+BOT_MODE = os.getenv("BOT_MODE", "polling").strip().lower()
+# Публічна адреса, яку Telegram викликатиме, напр. https://bot.example.com:8443
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram").strip("/")
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN")
+# Скільки останніх update_id пам'ятати для відсікання повторних доставок
+UPDATE_DEDUP_SIZE = int(os.getenv("UPDATE_DEDUP_SIZE", "10000"))
+
+# — Паралельна обробка оновлень —
+# Скільки оновлень із різних чатів обробляються одночасно (0 — послідовно, як раніше)
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "16"))
+# Скільки оновлень може чекати в черзі на обробку (включно з тими, що чекають свого чату)
+MAX_PENDING_UPDATES = int(os.getenv("MAX_PENDING_UPDATES", "1024"))
+
+# — Збереження сесій користувачів (SQLite у режимі WAL) —
+SESSION_PERSISTENCE = _env_flag("SESSION_PERSISTENCE", True)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "data/bot.sqlite3")
+# Як часто змінені сесії скидаються на диск (секунди)
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "5"))
+
+# — Багатопроцесний режим —
+# Кількість процесів-обробників (1 — один процес, як раніше)
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+# Спільне локальне сховище кешів (довідник користувачів, індекс заявок) для процесів-обробників
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "data/shared_cache.sqlite3")
+# Розмір черги оновлень до кожного процесу-обробника
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", "1000"))
+
+# — Обмеження частоти вихідних повідомлень Telegram —
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "30"))          # повідомлень/с на бота
+TG_CHAT_RATE = float(os.getenv("TG_CHAT_RATE", "1"))               # повідомлень/с в особистий чат
+TG_CHAT_BURST = int(os.getenv("TG_CHAT_BURST", "3"))               # короткий сплеск в один чат
+TG_GROUP_RATE_PER_MIN = float(os.getenv("TG_GROUP_RATE_PER_MIN", "20"))  # повідомлень/хв у групу
+TG_MAX_RETRIES = int(os.getenv("TG_MAX_RETRIES", "3"))             # повтори після 429 retry_after
+TG_COALESCE_WINDOW = float(os.getenv("TG_COALESCE_WINDOW", "1.0")) # вікно відсікання однакових редагувань
+
+# — Circuit breaker для Jira —
+JIRA_CB_WINDOW = float(os.getenv("JIRA_CB_WINDOW", "60"))                # ковзне вікно, с
+JIRA_CB_MIN_CALLS = int(os.getenv("JIRA_CB_MIN_CALLS", "10"))            # мінімум викликів у вікні для рішення
+JIRA_CB_ERROR_RATE = float(os.getenv("JIRA_CB_ERROR_RATE", "0.5"))       # частка помилок, що відкриває breaker
+JIRA_CB_SLOW_CALL = float(os.getenv("JIRA_CB_SLOW_CALL", "5"))           # виклик довший за це — повільний
+JIRA_CB_SLOW_RATE = float(os.getenv("JIRA_CB_SLOW_RATE", "0.8"))         # частка повільних, що відкриває breaker
+JIRA_CB_OPEN_SECONDS = float(os.getenv("JIRA_CB_OPEN_SECONDS", "30"))    # скільки breaker відкритий до проби
+JIRA_CB_HALF_OPEN_PROBES = int(os.getenv("JIRA_CB_HALF_OPEN_PROBES", "1"))
+# Повтори ідемпотентних запитів (GET, пошук) з експоненційною затримкою та jitter
+JIRA_READ_RETRIES = int(os.getenv("JIRA_READ_RETRIES", "2"))
+JIRA_RETRY_BASE_DELAY = float(os.getenv("JIRA_RETRY_BASE_DELAY", "0.3"))
+# довший Retry-After з 429 не чекаємо — відповідь 429 повертається викликачу
+JIRA_RETRY_AFTER_MAX = float(os.getenv("JIRA_RETRY_AFTER_MAX", "30"))
+
+# — Черга створення заявок (outbox) —
+OUTBOX_DB_PATH = os.getenv("OUTBOX_DB_PATH", SESSION_DB_PATH)
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "12"))
+OUTBOX_RETRY_BASE_DELAY = float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "2"))
+OUTBOX_RETRY_MAX_DELAY = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "300"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "120"))      # скільки заявка закріплена за обробником
+OUTBOX_DEDUP_WINDOW = float(os.getenv("OUTBOX_DEDUP_WINDOW", "600"))        # однакова заявка в межах вікна — дубль
+# ідемпотентний ключ заявки як мітка Jira; вимкніть, якщо на екрані створення немає поля Labels
+# (ключ завжди додається й в опис задачі — за ним шукаємо, коли мітки не використовуються)
+OUTBOX_JIRA_LABELS = _env_flag("OUTBOX_JIRA_LABELS", True)
+
+# — Метрики (Prometheus) —
+METRICS_ENABLED = _env_flag("METRICS_ENABLED", True)
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+# у багатопроцесному режимі обробник N (з 0) слухає METRICS_PORT + 1 + N
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# — Прогрів при старті —
+WARMUP_ENABLED = _env_flag("WARMUP_ENABLED", True)
+# скільки чекати прогріву перед стартом polling; незавершені кроки доробляються у фоні
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "20"))
+JIRA_WARMUP_CONNECTIONS = int(os.getenv("JIRA_WARMUP_CONNECTIONS", "2"))
+
+# — Вебхук Jira (push-оновлення статусів і коментарів) —
+JIRA_WEBHOOK_ENABLED = _env_flag("JIRA_WEBHOOK_ENABLED", False)
+# окремий від метрик порт: його зазвичай публікують через reverse proxy
+JIRA_WEBHOOK_LISTEN = os.getenv("JIRA_WEBHOOK_LISTEN", "127.0.0.1")
+JIRA_WEBHOOK_PORT = int(os.getenv("JIRA_WEBHOOK_PORT", "9480"))
+JIRA_WEBHOOK_PATH = os.getenv("JIRA_WEBHOOK_PATH", "jira/webhook").strip("/")
+# спільний секрет: ?secret=... в URL вебхука або підпис X-Hub-Signature (HMAC-SHA256)
+JIRA_WEBHOOK_SECRET = os.getenv("JIRA_WEBHOOK_SECRET", "")
+# у багатопроцесному режимі вебхук приймає перший обробник, решта забирають оновлення задач
+# із SHARED_CACHE_PATH раз на стільки секунд
+JIRA_WEBHOOK_FANOUT_INTERVAL = float(os.getenv("JIRA_WEBHOOK_FANOUT_INTERVAL", "2"))
+
+# — Логування —
+LOG_FILE = os.getenv("LOG_FILE", "logs/bot.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+# записи «на кожне повідомлення»: частка, що пишеться, і стеля записів за секунду (0 — без стелі)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_SAMPLED_PER_SECOND = float(os.getenv("LOG_SAMPLED_PER_SECOND", "20"))
+
+# — Кеш вкладень (за file_unique_id Telegram) —
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "data/attachments")
+MEDIA_CACHE_DB_PATH = os.getenv("MEDIA_CACHE_DB_PATH", SESSION_DB_PATH)
+# сумарний розмір файлів у кеші; 0 — кеш і перевірку повторних вкладень вимкнено
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# більші файли не кешуються (Bot API і так віддає ботам файли до 20 МБ)
+MEDIA_CACHE_MAX_FILE_BYTES = int(os.getenv("MEDIA_CACHE_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
+# скільки секунд пам'ятаємо, що файл уже є в задачі (вкладення могли видалити в Jira); 0 — без обмеження
+MEDIA_ATTACHED_TTL = int(os.getenv("MEDIA_ATTACHED_TTL", str(7 * 24 * 3600)))
@@ -1,14 +1,27 @@
 import os
+import asyncio
+import functools
 import logging
+import random
+import threading
+import time
+from bisect import insort
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from dotenv import load_dotenv
-from gspread.exceptions import SpreadsheetNotFound
+from metrics import SHEETS_TIMING
+
+from config import (
+    SHEETS_MAX_WORKERS,
+    SHEETS_CALL_TIMEOUT,
+    USER_DIRECTORY_REFRESH_INTERVAL,
+    USER_DIRECTORY_NEGATIVE_TTL,
+    SHEETS_WRITE_BATCH_SIZE,
+    SHEETS_WRITE_FLUSH_INTERVAL,
+    SHEETS_WRITE_MAX_RETRIES,
+    TICKET_INDEX_REFRESH_INTERVAL,
+)
 
-# Завантаження .env
-load_dotenv()
 logger = logging.getLogger(__name__)
 
 # -----------------------
@@ -19,112 +32,777 @@ def normalize_phone(p: str) -> str:
     return "".join(filter(str.isdigit, p))
 
 # -----------------------
-# ПІДКЛЮЧЕННЯ ДО ТАБЛИЦЬ
+# ПУЛ ПОТОКІВ ДЛЯ GSPREAD
 # -----------------------
 
-def connect_to_users_sheet():
+# gspread синхронний, тому всі виклики йдуть через окремий обмежений пул потоків,
+# щоб очікування відповіді Google не блокувало event loop
+_sheets_executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_WORKERS, thread_name_prefix="sheets")
+
+
+async def run_sheets_call(fn, *args, timeout: float | None = SHEETS_CALL_TIMEOUT, op: str | None = None, **kwargs):
+    """
+    Виконує блокуючу функцію fn у пулі потоків Sheets.
+    Після `timeout` секунд кидає asyncio.TimeoutError (сам потік доробить виклик у фоні).
+    Час виклику (разом з очікуванням вільного потоку) пишеться в метрику з міткою op.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_sheets_executor, functools.partial(fn, *args, **kwargs))
+    started = time.perf_counter()
+    error = False
     try:
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ]
+        return await asyncio.wait_for(future, timeout)
+    except Exception:
+        error = True
+        raise
+    finally:
+        SHEETS_TIMING.observe(time.perf_counter() - started, op or getattr(fn, "__name__", "call"), error=error)
+
+
+def sheets_executor_backlog() -> int:
+    """Скільки викликів Sheets чекає на вільний потік."""
+    return _sheets_executor._work_queue.qsize()
+
+
+def shutdown_sheets_executor() -> None:
+    _sheets_executor.shutdown(wait=False, cancel_futures=True)
+
+# -----------------------
+# ПІДКЛЮЧЕННЯ ДО ТАБЛИЦЬ
+# -----------------------
+
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+def _is_auth_error(e: Exception) -> bool:
+    """Чи є помилка наслідком недійсного/відкликаного токена."""
+    if "RefreshError" in type(e).__name__ or "AccessTokenRefreshError" in type(e).__name__:
+        return True
+    response = getattr(e, "response", None)
+    return getattr(response, "status_code", None) == 401
+
+
+class SheetsSession:
+    """
+    Спільна для процесу сесія Google Sheets.
+    Тримає облікові дані сервісного акаунта, авторизований gspread-клієнт
+    та відкриті worksheet-об'єкти. OAuth-токен оновлюється лише коли він
+    прострочений, а клієнт і handles перебудовуються лише після помилки авторизації.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._creds = None
+        self._client = None
+        self._spreadsheets: dict[str, object] = {}
+        self._worksheets: dict[tuple[str, str], object] = {}
+
+    def _authorize(self) -> None:
+        # gspread і oauth2client важкі для імпорту — підтягуємо їх лише при першому підключенні
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
         creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH")
-        creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
-        client = gspread.authorize(creds)
+        self._creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, SCOPE)
+        self._client = gspread.authorize(self._creds)
+        logger.info("[SheetsSession] Клієнт Google Sheets авторизовано")
+
+    def _token_expired(self) -> bool:
+        auth = getattr(self._client, "auth", None)
+        if auth is None:
+            return False
+        if hasattr(auth, "access_token_expired"):  # oauth2client
+            return not auth.access_token or auth.access_token_expired
+        return bool(getattr(auth, "expired", False))  # google-auth
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._authorize()
+            elif self._token_expired() and hasattr(self._client, "login"):
+                self._client.login()
+            return self._client
+
+    def worksheet(self, sheet_id: str, name: str):
+        with self._lock:
+            client = self.client()
+            ws = self._worksheets.get((sheet_id, name))
+            if ws is None:
+                spreadsheet = self._spreadsheets.get(sheet_id)
+                if spreadsheet is None:
+                    spreadsheet = client.open_by_key(sheet_id)
+                    self._spreadsheets[sheet_id] = spreadsheet
+                ws = spreadsheet.worksheet(name)
+                self._worksheets[(sheet_id, name)] = ws
+            return ws
+
+    def reset(self) -> None:
+        """Скидає клієнт і всі handles — наступний виклик авторизується заново."""
+        with self._lock:
+            self._creds = None
+            self._client = None
+            self._spreadsheets.clear()
+            self._worksheets.clear()
+
+    def run(self, sheet_id: str, name: str, op):
+        """
+        Виконує op(worksheet). Після помилки авторизації перебудовує
+        сесію та повторює операцію один раз.
+        """
+        try:
+            return op(self.worksheet(sheet_id, name))
+        except Exception as e:
+            if not _is_auth_error(e):
+                raise
+            logger.warning(f"[SheetsSession] Помилка авторизації ({e}) — перепідключення")
+            self.reset()
+            return op(self.worksheet(sheet_id, name))
+
+
+sheets_session = SheetsSession()
+
+
+def _users_sheet_ref() -> tuple[str, str]:
+    return os.getenv("GOOGLE_SHEET_users_ID"), "users"
+
+
+def _ticket_sheet_ref() -> tuple[str, str]:
+    return os.getenv("GOOGLE_SHEET_ID"), os.getenv("GOOGLE_SHEET_NAME", "euromix_tickets")
+
+
+def with_users_sheet(op):
+    return sheets_session.run(*_users_sheet_ref(), op)
+
+
+def with_ticket_sheet(op):
+    return sheets_session.run(*_ticket_sheet_ref(), op)
+
 
-        sheet_id = os.getenv("GOOGLE_SHEET_users_ID")
-        return client.open_by_key(sheet_id).worksheet("users")
+def connect_to_users_sheet():
+    try:
+        return sheets_session.worksheet(*_users_sheet_ref())
     except Exception as e:
         logger.error(f"[connect_to_users_sheet] ❌ Error: {e}")
         return None
 
 def connect_to_ticket_sheet():
     try:
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive"
-        ]
-        creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH")
-        creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
-        client = gspread.authorize(creds)
-
-        sheet_id = os.getenv("GOOGLE_SHEET_ID")
-        sheet_name = os.getenv("GOOGLE_SHEET_NAME", "euromix_tickets")
-        return client.open_by_key(sheet_id).worksheet(sheet_name)
-    except SpreadsheetNotFound:
-        logger.error("[connect_to_ticket_sheet] ❗️ Sheet not found. Check GOOGLE_SHEET_ID and name.")
-        return None
+        return sheets_session.worksheet(*_ticket_sheet_ref())
     except Exception as e:
-        logger.error(f"[connect_to_ticket_sheet] ❌ {e}")
+        from gspread.exceptions import SpreadsheetNotFound
+        if isinstance(e, SpreadsheetNotFound):
+            logger.error("[connect_to_ticket_sheet] ❗️ Sheet not found. Check GOOGLE_SHEET_ID and name.")
+        else:
+            logger.error(f"[connect_to_ticket_sheet] ❌ {e}")
         return None
 
+# -----------------------
+# ЧЕРГА ЗАПИСІВ (WRITE-BEHIND)
+# -----------------------
+
+def _is_quota_error(e: Exception) -> bool:
+    response = getattr(e, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    text = str(e)
+    return "RATE_LIMIT_EXCEEDED" in text or "Quota exceeded" in text
+
+
+class _SheetBatch:
+    """Накопичені зміни для одного аркуша."""
+
+    def __init__(self):
+        self.rows: list[list] = []                        # append_rows
+        self.cells: dict[tuple[int, int], object] = {}    # (row, col) -> value
+        self.keyed: list[tuple] = []                      # (key, col, value, resolve)
+
+    def __len__(self) -> int:
+        return len(self.rows) + len(self.cells) + len(self.keyed)
+
+    def merge_front(self, older: "_SheetBatch") -> None:
+        """Повертає невдалу пачку в початок черги, новіші значення комірок мають пріоритет."""
+        self.rows = older.rows + self.rows
+        self.cells = {**older.cells, **self.cells}
+        self.keyed = older.keyed + self.keyed
+
+    def write(self, sheet) -> None:
+        # Виконується в потоці Sheets. Успішно записані частини очищаються одразу,
+        # щоб повтор після помилки не продублював рядки.
+        if self.rows:
+            sheet.append_rows(self.rows)
+            self.rows = []
+        for key, col, value, resolve in self.keyed:
+            row = resolve(sheet, key)
+            if row:
+                self.cells.setdefault((row, col), value)
+            else:
+                logger.warning(f"[GoogleSheets] Ключ '{key}' не знайдено — запис пропущено.")
+        self.keyed = []
+        if self.cells:
+            from gspread.utils import rowcol_to_a1
+            sheet.batch_update([
+                {"range": rowcol_to_a1(row, col), "values": [[value]]}
+                for (row, col), value in self.cells.items()
+            ])
+            self.cells = {}
+
+
+_SHEET_TARGETS = {
+    "users": with_users_sheet,
+    "tickets": with_ticket_sheet,
+}
+
+
+class SheetsWriteQueue:
+    """
+    Write-behind черга мутацій Google Sheets.
+    Обробники лише ставлять зміни в чергу; фонова задача скидає їх пачками
+    через append_rows / batch_update, коли набирається batch_size змін
+    або минає flush_interval секунд. При помилках квоти пачка повертається
+    в чергу з експоненційною затримкою; при зупинці виконується фінальний flush.
+    """
+
+    def __init__(self, batch_size: int = 50, flush_interval: float = 2.0, max_retries: int = 5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._pending: dict[str, _SheetBatch] = {}
+        self._attempts: dict[str, int] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._flush_lock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    def __len__(self) -> int:
+        return sum(len(b) for b in self._pending.values())
+
+    # --- постановка в чергу ---
+
+    def append_row(self, target: str, row: list) -> None:
+        self._batch(target).rows.append(row)
+        self._changed()
+
+    def update_cell(self, target: str, row: int, col: int, value) -> None:
+        self._batch(target).cells[(row, col)] = value
+        self._changed()
+
+    def update_by_key(self, target: str, key: str, col: int, value, resolve) -> None:
+        """Оновлення комірки, рядок якої визначається під час запису: resolve(sheet, key) -> row."""
+        self._batch(target).keyed.append((key, col, value, resolve))
+        self._changed()
+
+    def _batch(self, target: str) -> _SheetBatch:
+        if target not in _SHEET_TARGETS:
+            raise ValueError(f"Unknown sheet target: {target!r}")
+        return self._pending.setdefault(target, _SheetBatch())
+
+    def _changed(self) -> None:
+        self._ensure_started()
+        if len(self) >= self.batch_size:
+            self._wakeup.set()
+
+    # --- життєвий цикл ---
+
+    def _ensure_started(self) -> None:
+        if self._task is not None or self._stopping:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # поза event loop — запишеться при start()/flush()
+        self.start()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run(), name="sheets-write-queue")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._task is not None:
+            # не перериваємо запис, що вже виконується, — чекаємо його завершення
+            async with self._flush_lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # фінальний flush — одна спроба на кожен аркуш
+        await self.flush(final=True)
+        if len(self):
+            logger.error(f"[SheetsWriteQueue] ❗ При зупинці не записано {len(self)} змін")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            delay = await self.flush()
+            if delay:
+                await asyncio.sleep(delay)
+
+    # --- запис ---
+
+    async def flush(self, final: bool = False) -> float:
+        """
+        Записує все накопичене. Повертає затримку (с) перед наступною спробою,
+        якщо частину змін довелося повернути в чергу, інакше 0.
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            batch, self._pending = self._pending, {}
+            batch = {t: b for t, b in batch.items() if len(b)}
+            if not batch:
+                return 0.0
+            # без таймауту: результат запису має бути відомий, інакше повтор продублює рядки
+            failures = await run_sheets_call(self._write, batch, timeout=None, op="write_batch")
+
+            delay = 0.0
+            for target in batch:
+                if target not in failures:
+                    self._attempts.pop(target, None)
+            for target, (failed, error) in failures.items():
+                attempts = self._attempts.get(target, 0) + 1
+                if final:
+                    # при зупинці залишаємо в черзі, щоб stop() повідомив кількість втрачених змін
+                    self._batch(target).merge_front(failed)
+                    logger.error(f"[SheetsWriteQueue] ❗ Фінальний запис у '{target}' не вдався: {error!r}")
+                    continue
+                if attempts > self.max_retries and not _is_quota_error(error):
+                    logger.error(
+                        f"[SheetsWriteQueue] ❗ Відкинуто {len(failed)} змін аркуша '{target}' "
+                        f"після {attempts} спроб: {error!r}"
+                    )
+                    self._attempts.pop(target, None)
+                    continue
+                self._attempts[target] = attempts
+                self._batch(target).merge_front(failed)
+                delay = max(delay, min(60.0, 2 ** attempts) + random.uniform(0, 1))
+                logger.warning(
+                    f"[SheetsWriteQueue] Запис у '{target}' не вдався ({error!r}), "
+                    f"повтор через {delay:.1f} с"
+                )
+            return delay
+
+    @staticmethod
+    def _write(batch: dict[str, _SheetBatch]) -> dict[str, tuple[_SheetBatch, Exception]]:
+        failures = {}
+        for target, sheet_batch in batch.items():
+            try:
+                _SHEET_TARGETS[target](sheet_batch.write)
+            except Exception as e:
+                failures[target] = (sheet_batch, e)
+        return failures
+
+
+sheets_write_queue = SheetsWriteQueue(
+    batch_size=SHEETS_WRITE_BATCH_SIZE,
+    flush_interval=SHEETS_WRITE_FLUSH_INTERVAL,
+    max_retries=SHEETS_WRITE_MAX_RETRIES,
+)
+
+# -----------------------
+# ДОВІДНИК КОРИСТУВАЧІВ
+# -----------------------
+
+USER_HEADERS = ["user_key_1", "full_name", "division", "department", "mobile_number",
+                "telegram_id", "telegram_username", "email", "account_id"]
+USER_COL_TELEGRAM_ID = USER_HEADERS.index("telegram_id") + 1
+USER_COL_TELEGRAM_USERNAME = USER_HEADERS.index("telegram_username") + 1
+
+
+class UserDirectory:
+    """
+    Копія аркуша `users` у пам'яті з хеш-індексами по telegram_id,
+    username (у нижньому регістрі) та нормалізованому номеру телефону.
+    Аркуш завантажується один раз і перечитується раз на refresh_interval
+    (або за запитом через refresh()); пошук — O(1) без мережевих викликів.
+    Негативні результати кешуються на negative_ttl секунд.
+    """
+
+    def __init__(self, refresh_interval: float = 300.0, negative_ttl: float = 60.0):
+        self.refresh_interval = refresh_interval
+        self.negative_ttl = negative_ttl
+        self._by_id: dict[str, tuple[dict, int]] = {}
+        self._by_username: dict[str, tuple[dict, int]] = {}
+        self._by_phone: dict[str, tuple[dict, int]] = {}
+        self._negative: dict[tuple, float] = {}
+        self._loaded_at: float | None = None
+        self._refresh_lock = threading.Lock()
+        # спільне сховище рядків для кількох процесів (SharedSheetStore), див. supervisor.py
+        self.shared = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval
+
+    def refresh(self) -> bool:
+        """Перечитує аркуш і перебудовує індекси. Повертає False, якщо аркуш недоступний."""
+        with self._refresh_lock:
+            try:
+                rows = self._load_rows()
+            except Exception as e:
+                logger.error(f"[UserDirectory] ❌ Не вдалося завантажити аркуш users: {e}")
+                return False
+            self._build(rows)
+            logger.info(f"[UserDirectory] Завантажено {len(rows)} користувачів")
+            return True
+
+    def _load_rows(self) -> list[list[str]]:
+        shared = self.shared
+        if shared is not None:
+            meta = shared.meta("users")
+            if meta is not None and time.time() - meta[0] < self.refresh_interval:
+                return [row for _, row in shared.read_rows("users")]
+        rows = with_users_sheet(lambda ws: ws.get_all_values())[1:]  # Пропускаємо заголовки
+        if shared is not None:
+            shared.publish("users", rows, first_row=2, replace=True)
+        return rows
+
+    def _build(self, rows: list[list[str]]) -> None:
+        by_id, by_username, by_phone = {}, {}, {}
+        for idx, row in enumerate(rows):
+            record = dict(zip(USER_HEADERS, row + [""] * (len(USER_HEADERS) - len(row))))
+            entry = (record, idx + 2)  # номер рядка в аркуші (1 — заголовки)
+            row_uid = record["telegram_id"].strip()
+            row_uname = record["telegram_username"].strip().lower()
+            row_phone = normalize_phone(record["mobile_number"])
+            # як і при лінійному проході, перемагає перший рядок у таблиці
+            if row_uid:
+                by_id.setdefault(row_uid, entry)
+            if row_uname:
+                by_username.setdefault(row_uname, entry)
+            if row_phone:
+                by_phone.setdefault(row_phone, entry)
+        self._by_id, self._by_username, self._by_phone = by_id, by_username, by_phone
+        self._negative.clear()
+        self._loaded_at = time.monotonic()
+
+    def find(self, user_id: int, username: str = "", phone: str = "") -> tuple[dict, int] | None:
+        """
+        Шукає користувача за telegram_id, потім username, потім телефоном.
+        Повертає (record, row_index) або None.
+        """
+        uname = (username or "").strip().lower()
+        phone = normalize_phone(phone) if phone else ""
+        neg_key = (str(user_id), uname, phone)
+
+        expires = self._negative.get(neg_key)
+        if expires is not None:
+            if expires > time.monotonic():
+                return None
+            del self._negative[neg_key]
+
+        entry = (
+            self._by_id.get(str(user_id))
+            or (uname and self._by_username.get(uname))
+            or (phone and self._by_phone.get(phone))
+            or None
+        )
+        if entry is None:
+            self._negative[neg_key] = time.monotonic() + self.negative_ttl
+        return entry
+
+    def link(self, entry: tuple[dict, int], user_id: int | None = None, username: str | None = None) -> None:
+        """Оновлює локальну копію після дописування telegram_id / username в аркуш."""
+        record = entry[0]
+        if user_id is not None:
+            record["telegram_id"] = str(user_id)
+            self._by_id.setdefault(str(user_id), entry)
+        if username:
+            record["telegram_username"] = username
+            self._by_username.setdefault(username.lower(), entry)
+        self._negative.clear()
+
+
+user_directory = UserDirectory(
+    refresh_interval=USER_DIRECTORY_REFRESH_INTERVAL,
+    negative_ttl=USER_DIRECTORY_NEGATIVE_TTL,
+)
+_directory_refresh_task: asyncio.Task | None = None
+
+
+def _schedule_directory_refresh() -> None:
+    """Перечитує довідник у фоні, поки запити обслуговуються поточною копією."""
+    global _directory_refresh_task
+    if _directory_refresh_task is not None and not _directory_refresh_task.done():
+        return
+    _directory_refresh_task = asyncio.create_task(run_sheets_call(user_directory.refresh, op="users.refresh"))
+
+
 # -----------------------
 # ІДЕНТИФІКАЦІЯ КОРИСТУВАЧА
 # -----------------------
 
+def _user_row_key(record: dict) -> tuple[str, str] | None:
+    """Стабільний ключ рядка користувача: user_key_1, а без нього — телефон."""
+    if record.get("user_key_1", "").strip():
+        return "user_key_1", record["user_key_1"].strip()
+    phone = normalize_phone(record.get("mobile_number", ""))
+    return ("mobile_number", phone) if phone else None
+
+
+def _user_key_matches(column: str, value: str, key: str) -> bool:
+    if column == "mobile_number":
+        return normalize_phone(value) == key
+    return value.strip() == key
+
+
+def _find_user_row(sheet, key: str, column: str, expected_row: int) -> int | None:
+    """
+    Номер рядка користувача на момент запису. Знімок довідника міг застаріти
+    (адміністратор вставив, видалив чи відсортував рядки), тому спершу
+    перевіряємо рядок зі знімка, а якщо там інший користувач — шукаємо ключ у стовпці.
+    """
+    col = USER_HEADERS.index(column) + 1
+    if _user_key_matches(column, sheet.cell(expected_row, col).value or "", key):
+        return expected_row
+    for idx, value in enumerate(sheet.col_values(col)[1:], start=2):
+        if _user_key_matches(column, value, key):
+            return idx
+    return None
+
+
 async def identify_user_by_telegram(user_id: int, username: str = "", phone: str = "") -> dict | None:
     """
     Повертає словник з даними користувача, якщо знайдено за:
     - telegram_id
     - telegram_username
     - або номером телефону (з нормалізацією)
+    Пошук іде по UserDirectory; аркуш перечитується лише при першому
+    зверненні та періодично у фоні.
     """
     try:
-        sheet = connect_to_users_sheet()
-        if not sheet:
-            return None
-
-        rows = sheet.get_all_values()[1:]  # Пропускаємо заголовки
-        headers = ["user_key_1", "full_name", "division", "department", "mobile_number",
-                   "telegram_id", "telegram_username", "email", "account_id"]
+        if not user_directory.loaded:
+            if not await run_sheets_call(user_directory.refresh, op="users.refresh"):
+                return None
+        elif user_directory.is_stale():
+            _schedule_directory_refresh()
 
-        # Нормалізація вхідного номера
-        phone = phone.replace(" ", "").replace("-", "").lstrip("+").strip() if phone else ""
+        found = user_directory.find(user_id, username, phone)
+        if found is None:
+            return None
+        record, row_index = found
 
-        for idx, row in enumerate(rows):
-            record = dict(zip(headers, row + [""] * (len(headers) - len(row))))
-            row_index = idx + 2
-
-            # Нормалізація номера телефону з таблиці
-            row_phone = record.get("mobile_number", "").replace(" ", "").replace("-", "").lstrip("+").strip()
-            row_uid = record.get("telegram_id", "").strip()
-            row_uname = record.get("telegram_username", "").strip().lower()
-
-            # 1) Збіг по Telegram ID
-            if str(user_id) == row_uid:
-                if not row_uname and username:
-                    sheet.update_cell(row_index, 7, username)
-                return record
-
-            # 2) Збіг по username
-            if username and username.lower() == row_uname:
-                if not row_uid:
-                    sheet.update_cell(row_index, 6, str(user_id))
-                return record
-
-            # 3) Збіг по номеру телефону
-            if phone and phone == row_phone:
-                if not row_uid:
-                    sheet.update_cell(row_index, 6, str(user_id))
-                if not row_uname and username:
-                    sheet.update_cell(row_index, 7, username)
-                return record
+        # Дописуємо відсутні telegram_id / username у таблицю
+        missing_uid = not record.get("telegram_id", "").strip()
+        missing_uname = bool(username) and not record.get("telegram_username", "").strip()
+        row_key = _user_row_key(record)
+        if (missing_uid or missing_uname) and row_key is not None:
+            # рядок шукаємо під час запису: номер зі знімка міг зсунутися
+            column, key = row_key
+            resolve = functools.partial(_find_user_row, column=column, expected_row=row_index)
+            if missing_uid:
+                sheets_write_queue.update_by_key("users", key, USER_COL_TELEGRAM_ID, str(user_id), resolve)
+            if missing_uname:
+                sheets_write_queue.update_by_key("users", key, USER_COL_TELEGRAM_USERNAME, username, resolve)
+            user_directory.link(
+                found,
+                user_id=user_id if missing_uid else None,
+                username=username if missing_uname else None,
+            )
 
-        return None
+        return dict(record)
 
     except Exception as e:
         logger.exception(f"[identify_user_by_telegram] ❌ Error: {e}")
         return None
 
 # -----------------------
-# ЗАЯВКИ
+# ІНДЕКС ЗАЯВОК
 # -----------------------
 
-def add_ticket(ticket_id, telegram_user_id, telegram_chat_id, telegram_username=None, status="Open"):
-    sheet = connect_to_ticket_sheet()
-    if sheet is None:
-        return
+TICKET_HEADERS = ["Ticket_ID", "Telegram_User_ID", "Telegram_Chat_ID", "Created_At",
+                  "Status", "Telegram_Username", "User_name_Real", "Account_ID"]
 
+
+class TicketIndex:
+    """
+    Локальний індекс реєстру заявок:
+    - Telegram_User_ID -> заявки, відсортовані за Created_At;
+    - Ticket_ID -> номер рядка в аркуші.
+    Будується один раз повним читанням, далі дочитуються лише рядки,
+    додані після останньої відомої кількості рядків. Заявки, створені цим
+    процесом, потрапляють в індекс одразу (номер рядка — після синхронізації).
+    """
+
+    def __init__(self, refresh_interval: float = 60.0):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._headers: list[str] | None = None
+        self._row_count = 0  # останній прочитаний рядок аркуша (1 — заголовки)
+        self._by_user: dict[str, list[dict]] = {}
+        self._by_ticket: dict[str, dict] = {}
+        self._row_by_ticket: dict[str, int] = {}
+        self._synced_at: float | None = None
+        # спільне сховище рядків для кількох процесів (SharedSheetStore), див. supervisor.py
+        self.shared = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._synced_at is not None
+
+    def is_stale(self) -> bool:
+        return self._synced_at is None or time.monotonic() - self._synced_at >= self.refresh_interval
+
+    def column(self, name: str) -> int:
+        headers = self._headers or TICKET_HEADERS
+        return headers.index(name) + 1
+
+    def sync(self, sheet, force: bool = False) -> None:
+        """
+        Читає з аркуша нові рядки (при першому виклику — весь аркуш). Виконується в потоці Sheets.
+        Якщо підключено спільне сховище і воно свіже, аркуш не читається (крім force=True).
+        """
+        with self._sync_lock:
+            if self.shared is not None and self._sync_from_shared() and not force:
+                return
+            if self._headers is None:
+                values = sheet.get_all_values()
+                headers, rows, first_row = (values[0] if values else TICKET_HEADERS), values[1:], 2
+                if self.shared is not None:
+                    self.shared.publish("tickets", [headers] + rows, first_row=1, replace=True)
+            else:
+                import gspread
+                from gspread.utils import rowcol_to_a1
+
+                headers, first_row = self._headers, self._row_count + 1
+                last_col = rowcol_to_a1(1, len(headers)).rstrip("0123456789")
+                try:
+                    rows = sheet.get(f"A{first_row}:{last_col}")
+                except gspread.exceptions.APIError as e:
+                    # нових рядків немає, а сітка аркуша закінчується на останньому
+                    if "exceeds grid limits" not in str(e):
+                        raise
+                    rows = []
+                if self.shared is not None:
+                    self.shared.publish("tickets", rows, first_row=first_row)
+            self._apply(headers, rows, first_row)
+            if rows:
+                logger.info(f"[TicketIndex] Дочитано {len(rows)} рядків (усього {self._row_count - 1})")
+
+    def _sync_from_shared(self) -> bool:
+        """Підтягує рядки зі спільного сховища. Повертає True, якщо копія там свіжа."""
+        meta = self.shared.meta("tickets")
+        if meta is None:
+            return False
+        synced_at, row_count = meta
+        if row_count > self._row_count:
+            shared_rows = self.shared.read_rows("tickets", after_row=self._row_count)
+            if shared_rows and shared_rows[0][0] == 1:
+                self._headers = shared_rows.pop(0)[1]
+            if self._headers is None:
+                return False
+            if shared_rows:
+                self._apply(self._headers, [row for _, row in shared_rows], shared_rows[0][0])
+        return self._headers is not None and time.time() - synced_at < self.refresh_interval
+
+    def _apply(self, headers: list[str], rows: list[list], first_row: int) -> None:
+        with self._lock:
+            self._headers = headers
+            for offset, row in enumerate(rows):
+                if any(row):
+                    self._add(dict(zip(headers, row + [""] * (len(headers) - len(row)))), first_row + offset)
+            self._row_count = max(self._row_count, first_row + len(rows) - 1)
+            self._synced_at = time.monotonic()
+
+    def _add(self, record: dict, row: int | None) -> None:
+        ticket_id = str(record.get("Ticket_ID", "")).strip()
+        if not ticket_id:
+            return
+        known = self._by_ticket.get(ticket_id)
+        if row is not None:
+            self._row_by_ticket[ticket_id] = row
+        if known is not None:
+            # заявка вже додана локально — лише уточнюємо поля з аркуша
+            known.update(record)
+            return
+        self._by_ticket[ticket_id] = record
+        tickets = self._by_user.setdefault(str(record.get("Telegram_User_ID", "")), [])
+        insort(tickets, record, key=lambda r: str(r.get("Created_At", "")))
+
+    def add_local(self, record: dict) -> None:
+        """Реєструє заявку, що ще чекає запису в аркуш."""
+        with self._lock:
+            self._add(record, None)
+
+    def tickets_for(self, telegram_user_id) -> list[dict]:
+        with self._lock:
+            return [dict(r) for r in self._by_user.get(str(telegram_user_id), [])]
+
+    def get(self, ticket_id: str) -> dict | None:
+        with self._lock:
+            record = self._by_ticket.get(ticket_id)
+            return dict(record) if record is not None else None
+
+    def row_for(self, ticket_id: str) -> int | None:
+        return self._row_by_ticket.get(ticket_id)
+
+    def set_status(self, ticket_id: str, status: str) -> None:
+        with self._lock:
+            record = self._by_ticket.get(ticket_id)
+            if record is not None:
+                record["Status"] = status
+
+
+ticket_index = TicketIndex(refresh_interval=TICKET_INDEX_REFRESH_INTERVAL)
+_ticket_sync_task: asyncio.Task | None = None
+_ticket_resync_task: asyncio.Task | None = None
+_ticket_resynced_at = 0.0
+# примусове дочитування аркуша — не частіше, ніж раз на стільки секунд
+TICKET_RESYNC_MIN_INTERVAL = 5.0
+
+
+async def ensure_ticket_index() -> None:
+    """Будує індекс при першому зверненні; далі дочитує нові рядки у фоні."""
+    global _ticket_sync_task
+    if not ticket_index.loaded:
+        await run_sheets_call(with_ticket_sheet, ticket_index.sync, op="tickets.sync")
+    elif ticket_index.is_stale():
+        if _ticket_sync_task is None or _ticket_sync_task.done():
+            _ticket_sync_task = asyncio.create_task(run_sheets_call(with_ticket_sheet, ticket_index.sync, op="tickets.sync"))
+
+
+async def resync_ticket_index() -> None:
+    """
+    Примусово дочитує нові рядки аркуша, навіть якщо індекс свіжий: заявку могли
+    щойно створити в іншому процесі-обробнику. Паралельні виклики чекають одне
+    читання, а частіше TICKET_RESYNC_MIN_INTERVAL аркуш не читається.
+    """
+    global _ticket_resync_task, _ticket_resynced_at
+    if _ticket_resync_task is None or _ticket_resync_task.done():
+        if time.monotonic() - _ticket_resynced_at < TICKET_RESYNC_MIN_INTERVAL:
+            return
+        _ticket_resynced_at = time.monotonic()
+        _ticket_resync_task = asyncio.create_task(run_sheets_call(
+            with_ticket_sheet, lambda sheet: ticket_index.sync(sheet, force=True), op="tickets.sync"
+        ))
+    await asyncio.shield(_ticket_resync_task)
+
+
+# -----------------------
+# ЗАЯВКИ
+# -----------------------
+
+async def add_ticket(ticket_id, telegram_user_id, telegram_chat_id, telegram_username=None, status="Open"):
+    """
+    Дописує заявку в аркуш напряму, не через SheetsWriteQueue: outbox вважає
+    заявку завершеною лише після підтвердженого запису і повторює цей крок при
+    помилці. Повтор безпечний — рядок, дописаний попередньою спробою, не дублюється.
+    """
     created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     row = [
         ticket_id,
@@ -136,36 +814,37 @@ def add_ticket(ticket_id, telegram_user_id, telegram_chat_id, telegram_username=
         "",  # User_name_Real
         ""   # Account_ID
     ]
-    try:
-        sheet.append_row(row)
-    except Exception as e:
-        logger.error(f"[GoogleSheets] ❗ Помилка при записі заявки: {e}")
+    ticket_index.add_local(dict(zip(TICKET_HEADERS, [str(v) for v in row])))
+    # без таймауту: після таймауту потік усе одно допише рядок, і повтор його продублював би
+    await run_sheets_call(with_ticket_sheet, lambda sheet: _append_ticket_row(sheet, row), timeout=None, op="tickets.append")
 
-def update_ticket_status(ticket_id, new_status):
-    sheet = connect_to_ticket_sheet()
-    if sheet is None:
-        return
 
-    try:
-        cell = sheet.find(ticket_id)
-        if cell:
-            sheet.update_cell(cell.row, 5, new_status)
-        else:
-            logger.warning(f"[GoogleSheets] Ticket ID '{ticket_id}' не знайдено.")
-    except Exception as e:
-        logger.error(f"[GoogleSheets] Помилка при оновленні статусу: {e}")
+def _append_ticket_row(sheet, row: list) -> None:
+    # попередня спроба могла дописати рядок, а відповідь загубилась — спершу дочитуємо аркуш
+    ticket_index.sync(sheet, force=True)
+    if ticket_index.row_for(str(row[0])) is None:
+        sheet.append_rows([row])
+
+def _find_ticket_row(sheet, ticket_id):
+    row = ticket_index.row_for(ticket_id)
+    if row is None:
+        # заявка могла щойно потрапити в аркуш — дочитуємо нові рядки
+        ticket_index.sync(sheet, force=True)
+        row = ticket_index.row_for(ticket_id)
+    return row
 
-def get_user_tickets(telegram_user_id):
-    sheet = connect_to_ticket_sheet()
-    if sheet is None:
-        return []
+async def update_ticket_status(ticket_id, new_status):
+    ticket_index.set_status(ticket_id, new_status)
+    sheets_write_queue.update_by_key(
+        "tickets", ticket_id, ticket_index.column("Status"), new_status, _find_ticket_row
+    )
 
+async def get_user_tickets(telegram_user_id):
+    """Заявки користувача з локального індексу, у порядку Created_At."""
     try:
-        records = sheet.get_all_records()
-        return [
-            record for record in records
-            if str(record.get('Telegram_User_ID')) == str(telegram_user_id)
-        ]
+        await ensure_ticket_index()
     except Exception as e:
-        logger.error(f"[GoogleSheets] Помилка при отриманні заявок: {e}")
-        return []
+        logger.error(f"[GoogleSheets] Помилка при отриманні заявок: {e!r}")
+        if not ticket_index.loaded:
+            return []
+    return ticket_index.tickets_for(telegram_user_id)
@@ -2,39 +2,45 @@
 import logging
 logger = logging.getLogger(__name__)
 from datetime import datetime
+from typing import Callable, NamedTuple
 from telegram import (
     Update, KeyboardButton, ReplyKeyboardMarkup,
     InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 )
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
+from config import TICKETS_PAGE_SIZE
+
 from google_sheets_service import (
     get_user_tickets,
-    add_ticket,
     identify_user_by_telegram
 )
 
 from keyboards import (
-    make_keyboard, remove_keyboard, STEPS,
+    make_keyboard, remove_keyboard, FORM, FORM_FIELDS,
+    first_step, next_step, prev_step,
     main_menu_markup, after_create_menu_markup, mytickets_action_markup,
     comment_mode_markup, BUTTONS,
     request_contact_keyboard
 )
 
+from media import attach_telegram_file, media_groups
+from log_setup import SAMPLED
+from metrics import instrument_handler, set_branch
+from outbox import ticket_outbox, dedup_key_for, STATE_FAILED
 from services import (
-    create_jira_issue,
-    attach_file_to_jira,
     add_comment_to_jira,
     get_issue_status,
-    get_issue_summary
+    get_issue_summary,
+    get_issues_bulk,
+    JiraUnavailableError
 )
 
-# Сховище стану користувача в пам'яті процесу
-user_data: dict[int, dict] = {}
-
 import logging
 logger = logging.getLogger(__name__)
 
+@instrument_handler("start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Старт та головне меню"""
     user = update.effective_user
@@ -65,71 +71,107 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['started'] = True
 
 
-async def mytickets_handler(update, context):
-    user_id = update.effective_user.id
-    # 1) Дістаємо всі записи–заявки з Google Sheets
-    records =  get_user_tickets(user_id)
+async def _fetch_issues_for_list(issue_ids: list[str]) -> dict[str, dict]:
+    """Статуси для списку задач одним запитом; при помилці Jira — порожній словник."""
+    try:
+        return await get_issues_bulk([str(i) for i in issue_ids if i])
+    except Exception as e:
+        logger.error(f"[JIRA] Помилка пакетного отримання статусів: {e}")
+        return {}
+
+
+# ─── Список заявок з посторінковою навігацією ───────────────────────────────
+# callback_data: "tl:<вид>:<сторінка>", напр. "tl:v:2" — вміщується в ліміт 64 байти.
+# Номер сторінки рахується від найновіших заявок; статуси з Jira — лише для видимої сторінки.
+TICKET_LIST_PREFIX = "tl"
 
+
+class TicketListKind(NamedTuple):
+    title: str
+    empty: str
+
+
+TICKET_LISTS = {
+    "v": TicketListKind("✒️ Оберіть задачу для перегляду деталей:", "У вас немає відкритих заявок."),
+    "c": TicketListKind(
+        "🖋️ Натисніть на задачу, щоб переглянути деталі та додати коментар:",
+        "❗️ У вас немає заявок для коментаря.",
+    ),
+}
+
+
+async def _ticket_page(user_id: int, kind: str, page: int) -> tuple[str, InlineKeyboardMarkup | None]:
+    """Текст і клавіатура однієї сторінки списку; (empty, None), якщо заявок немає."""
+    spec = TICKET_LISTS[kind]
+    records = await get_user_tickets(user_id)
     if not records:
-        return await update.message.reply_text(
-            "У вас немає відкритих заявок.",
-            reply_markup=main_menu_markup
-        )
+        return spec.empty, None
+
+    pages = (len(records) + TICKETS_PAGE_SIZE - 1) // TICKETS_PAGE_SIZE
+    page = max(0, min(page, pages - 1))
+    # індекс упорядкований за Created_At — найновіші в кінці
+    newest = len(records) - page * TICKETS_PAGE_SIZE
+    visible = records[max(0, newest - TICKETS_PAGE_SIZE):newest][::-1]
 
-    # 2) Формуємо список Inline-кнопок з ключами і статусами
+    issues = await _fetch_issues_for_list([rec["Ticket_ID"] for rec in visible])
     buttons = []
-    for rec in records:
+    for rec in visible:
         issue_key = rec["Ticket_ID"]
-        try:
-            status = await get_issue_status(issue_key)
-        except Exception:
-            status = "❓ помилка"
+        status = issues.get(issue_key, {}).get("status", "❓ помилка")
         buttons.append([InlineKeyboardButton(
             f"{issue_key} — {status}",
             callback_data=f"comment_task_{issue_key}"
         )])
 
-    # 3) Відправляємо список
-    await update.message.reply_text(
-        "✒️ Оберіть задачу для перегляду деталей:",
-        reply_markup=InlineKeyboardMarkup(buttons)
-    )
+    if pages > 1:
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton("◀️", callback_data=f"{TICKET_LIST_PREFIX}:{kind}:{page - 1}"))
+        # середня кнопка оновлює поточну сторінку
+        nav.append(InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=f"{TICKET_LIST_PREFIX}:{kind}:{page}"))
+        if page < pages - 1:
+            nav.append(InlineKeyboardButton("▶️", callback_data=f"{TICKET_LIST_PREFIX}:{kind}:{page + 1}"))
+        buttons.append(nav)
+
+    return spec.title, InlineKeyboardMarkup(buttons)
+
+
+async def _send_ticket_list(update: Update, kind: str):
+    text, markup = await _ticket_page(update.effective_user.id, kind, 0)
+    await update.message.reply_text(text, reply_markup=markup or main_menu_markup)
+
+
+async def mytickets_handler(update, context):
+    await _send_ticket_list(update, "v")
+
 
 async def choose_task_for_comment(update, context):
-    uid = update.effective_user.id
-    tickets =  get_user_tickets(uid)  # Added await to make it asynchronous
+    await _send_ticket_list(update, "c")
 
-    if not tickets:
-        return await update.message.reply_text(
-            "❗️ У вас немає заявок для коментаря.",
-            reply_markup=main_menu_markup
-        )
 
-    # Сортуємо й беремо останні 10
-    sorted_tickets = sorted(
-        tickets,
-        key=lambda t: t.get("Created_At", ""),
-        reverse=True
-    )[:10]
-
-    keyboard = []
-    for t in sorted_tickets:
-        issue_id = t.get("Ticket_ID")
-        try:
-            status = await get_issue_status(issue_id)
-        except Exception:
-            status = "❓ помилка"
-        keyboard.append([InlineKeyboardButton(
-            f"{issue_id} — {status}",
-            callback_data=f"comment_task_{issue_id}"
-        )])
+@instrument_handler("ticket_page")
+async def handle_ticket_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Кнопки ◀️/▶️ списку заявок: редагує те саме повідомлення замість надсилання нового."""
+    query = update.callback_query
+    try:
+        _, kind, page = query.data.split(":")
+        page = int(page)
+        TICKET_LISTS[kind]
+    except (ValueError, KeyError):
+        await query.answer()
+        return
 
-    await update.message.reply_text(
-        "🖋️ Натисніть на задачу, щоб переглянути деталі та додати коментар:",
-        reply_markup=InlineKeyboardMarkup(keyboard)
-    )
+    text, markup = await _ticket_page(update.effective_user.id, kind, page)
+    await query.answer()
+    try:
+        await query.edit_message_text(text, reply_markup=markup)
+    except BadRequest as e:
+        # натиснули «оновити», а статуси не змінились
+        if "not modified" not in str(e).lower():
+            raise
 
 # 1) обробляє клік на інлайн-кнопку «comment_task_<ID>»
+@instrument_handler("handle_comment_callback")
 async def handle_comment_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Обробляє натиск на кнопку з issue_id:
@@ -167,68 +209,105 @@ async def handle_comment_callback(update: Update, context: ContextTypes.DEFAULT_
 async def send_to_jira(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Формує payload з усього, що накопичилось у context.user_data + profile,
-    відправляє в Jira, заносить у Google Sheets і повертає меню.
+    ставить заявку в outbox і одразу відповідає «прийнято».
+    Саму задачу в Jira та запис у Google Sheets створює фоновий обробник
+    (див. outbox.py), який потім редагує це повідомлення, підставляючи ключ задачі.
     """
     user = update.effective_user
     uid = user.id
     profile = context.user_data.get("profile", {})
 
+    form = {key: context.user_data.get(key) for key in FORM_FIELDS}
+    if not form.get("description"):
+        # форму вже відправлено (подвійне натискання) або її не заповнювали
+        await _reply_last_submission(update, context)
+        return
+
     # Формуємо опис задачі
     description = (
         f"ПІБ: {profile.get('full_name', '-')}\n"
         f"Підрозділ: {profile.get('division', '-')}\n"
         f"Департамент: {profile.get('department', '-')}\n"
-        f"Сервіс: {context.user_data.get('service', '-')}\n"
-        f"Опис проблеми: {context.user_data.get('description', '-')}\n\n"
+        f"Сервіс: {form.get('service') or '-'}\n"
+        f"Опис проблеми: {form.get('description') or '-'}\n\n"
         f"tg id: {uid}\n"
         f"tg username: {user.username or '-'}\n"
         f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
     )
+    summary = f"Заявка від {profile.get('full_name', '-')}"
+
+    job_id, is_new = await ticket_outbox.submit(
+        user_id=uid,
+        chat_id=update.effective_chat.id,
+        username=user.username or "",
+        summary=summary,
+        description=description,
+        dedup_key=dedup_key_for(uid, summary, form),
+    )
+    # форма відправлена — повторне «Створити задачу» її вже не побачить
+    for key in FORM_FIELDS:
+        context.user_data.pop(key, None)
+    context.user_data.pop("step", None)
+    context.user_data["outbox_job"] = job_id
+
+    if not is_new:
+        logger.info(f"[JIRA] User {uid}: повторна заявка, вже є #{job_id}")
+        await _reply_last_submission(update, context)
+        return
 
-    payload = {
-        "summary": f"Заявка від {profile.get('full_name', '-')}",
-        "description": description,
-    }
+    logger.info(f"[JIRA] User {uid}: заявку #{job_id} поставлено в чергу")
+    msg = await update.message.reply_text(
+        "📨 Заявку прийнято, створюю задачу…",
+        reply_markup=main_menu_markup
+    )
+    await ticket_outbox.set_ack_message(job_id, msg.message_id)
 
-    try:
-        # Викликаємо новий підпис: (summary, description)
-        resp = await create_jira_issue(payload["summary"], payload["description"])
-        if resp["status_code"] != 201 or "key" not in resp["json"]:
-            raise RuntimeError(f"Jira API error: {resp}")
-        issue_key = resp["json"]["key"]
-
-        # Заносимо запис у Google Sheets
-        await add_ticket({
-            "issue_key": issue_key,
-            "telegram_user_id": uid,
-            "telegram_chat_id": update.effective_chat.id,
-            "telegram_username": user.username or ""
-        })
-
-        # Відповідь користувачу
-        await update.message.reply_text(
-            f"✅ Задача створена: {issue_key}",
-            reply_markup=main_menu_markup
-        )
-    except Exception as e:
-        logger.exception(f"[JIRA] Помилка створення задачі: {e}")
-        await update.message.reply_text(
-            "⛔ Сталася помилка при створенні задачі. Спробуйте знову.",
-            reply_markup=main_menu_markup
-        )
+
+async def _reply_last_submission(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Відповідь на повторне «Створити задачу»: стан останньої відправленої заявки."""
+    issue_key = _current_task_id(context)
+    if issue_key:
+        text = f"✅ Задача вже створена: {issue_key}"
+    elif context.user_data.get("outbox_job"):
+        text = "⏳ Заявку вже прийнято, задача створюється."
+    else:
+        text = "Невідома команда. Оберіть дію з меню:"
+    await update.message.reply_text(text, reply_markup=main_menu_markup)
+
+
+def _current_task_id(context: ContextTypes.DEFAULT_TYPE) -> str | None:
+    """
+    Остання створена задача користувача — до неї прикріплюються файли та
+    перевіряється статус. Якщо заявка ще в outbox, дізнаємось ключ звідти.
+    """
+    job_id = context.user_data.get("outbox_job")
+    if job_id is not None:
+        found = ticket_outbox.status(job_id)
+        if found is None or found[0] == STATE_FAILED:
+            context.user_data.pop("outbox_job", None)
+        elif found[1]:
+            context.user_data["task_id"] = found[1]
+            context.user_data.pop("outbox_job", None)
+        else:
+            return None
+    return context.user_data.get("task_id")
 
 
+@instrument_handler("handle_media")
 async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     uid = user.id
-    logger.info(f"[MEDIA] User {uid} (@{user.username or '-'}, {user.first_name}) надсилає медіа")
-    if uid not in user_data or "task_id" not in user_data[uid]:
+    logger.info("[MEDIA] User %s (@%s) надсилає медіа", uid, user.username or '-', extra=SAMPLED)
+    tid = _current_task_id(context)
+    if not tid:
+        if context.user_data.get("outbox_job"):
+            await update.message.reply_text("⏳ Задача ще створюється — надішліть файл за кілька секунд.")
+            return
         await update.message.reply_text(
             "❗ Спочатку натисніть 'Створити задачу', а потім надсилайте файли."
         )
         return
 
-    tid = user_data[uid]["task_id"]
     file_obj = None
     filename = None
 
@@ -238,7 +317,9 @@ async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
         filename = file_obj.file_name
     elif update.message.photo:
         file_obj = update.message.photo[-1]
-        filename = f"photo_{datetime.now().strftime('%H%M%S')}.jpg"
+        # file_unique_id, а не час: фото альбому приходять у ту саму секунду, а імена
+        # вкладень мають розрізнятися (і лишатися тими самими для того самого фото)
+        filename = f"photo_{file_obj.file_unique_id}.jpg"
     elif update.message.video:
         file_obj = update.message.video
         filename = file_obj.file_name or f"video_{file_obj.file_id}.mp4"
@@ -249,11 +330,19 @@ async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Непідтримуваний тип файлу.")
         return
 
-    # завантажити bytes
-    f = await context.bot.get_file(file_obj.file_id)
-    content = await f.download_as_bytearray()
-    resp = await attach_file_to_jira(tid, filename, content)
-    if resp.status_code in (200, 201):
+    # частини альбому збираються й надсилаються в Jira одним запитом
+    if update.message.media_group_id:
+        media_groups.add(
+            update.message.media_group_id, context.bot, tid,
+            update.message, file_obj, filename
+        )
+        return
+
+    # потоково переносимо файл з Telegram у Jira
+    resp = await attach_telegram_file(context.bot, tid, file_obj, filename)
+    if resp is None:
+        await update.message.reply_text(f"ℹ️ '{filename}' вже прикріплено до {tid}")
+    elif resp.status_code in (200, 201):
         await update.message.reply_text(f"✅ '{filename}' прикріплено")
     else:
         await update.message.reply_text(
@@ -263,7 +352,7 @@ async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def add_comment_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     uid = user.id
-    logger.info(f"[COMMENT] User {uid} (@{user.username or '-'}, {user.first_name}) додає коментар")
+    logger.info("[COMMENT] User %s (@%s) додає коментар", uid, user.username or '-', extra=SAMPLED)
 
     if not context.user_data.get("user_comment_mode"):
         return  # не в режимі — пропускаємо
@@ -308,17 +397,22 @@ async def add_comment_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def check_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     uid = user.id
-    tid = user_data.get(uid, {}).get("task_id")
+    tid = _current_task_id(context)
     if not tid:
+        if context.user_data.get("outbox_job"):
+            await update.message.reply_text("⏳ Задача ще створюється.")
+            return
         await update.message.reply_text("Немає активної задачі.")
-        logger.info(f"[STATUS] User {uid} (@{user.username or '-'}, {user.first_name}) — немає задачі")
+        logger.info("[STATUS] User %s — немає задачі", uid, extra=SAMPLED)
         return
     try:
         st = await get_issue_status(tid)
         await update.message.reply_text(f"Статус {tid}: {st}")
-        logger.info(f"[STATUS] User {uid} (@{user.username or '-'}, {user.first_name}) — статус: {st}")
+        logger.info("[STATUS] User %s — %s: %s", uid, tid, st, extra=SAMPLED)
+    except JiraUnavailableError as e:
+        await update.message.reply_text(e.user_message)
     except Exception as e:
-        logger.exception(f"[STATUS] User {uid} (@{user.username or '-'}, {user.first_name}) — помилка: {e}")
+        logger.exception("[STATUS] User %s (@%s) — помилка: %s", uid, user.username or '-', e)
         await update.message.reply_text(f"⚠️ Помилка при отриманні статусу: {e}")
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -329,12 +423,15 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if step is not None:
         # 1) зберігаємо відповідь
-        key = STEPS[step]
-        context.user_data[key] = text
+        context.user_data[FORM[step].name] = text
 
-        # 2) якщо ми щойно отримали description (останній крок) — показуємо фінальний огляд
-        if step == len(STEPS) - 1:
-            profile = context.user_data["profile"] or {}
+        # 2) обчислюємо наступний крок за таблицею переходів
+        # (для авторизованих кроки division/department/full_name пропускаються)
+        following = next_step(step, bool(context.user_data.get("profile")))
+
+        # 3) останній крок — показуємо фінальний огляд
+        if following is None:
+            profile = context.user_data.get("profile") or {}
             summary = (
                 f"*Опис заявки:*  \n"
                 f"ПІБ: {profile.get('full_name', '-') }  \n"
@@ -356,15 +453,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
             context.user_data.pop("step")
             return
 
-        # 3) обчислюємо наступний крок
-        # для авторизованих: пропускаємо full_name (крок 2) → переходимо одразу до service (крок 3)
-        if context.user_data.get("profile") and step == 1:
-            next_step = 3
-        else:
-            next_step = step + 1
-
-        context.user_data["step"] = next_step
-        prompt, markup = make_keyboard(next_step, context.user_data.get("description",""))
+        context.user_data["step"] = following
+        prompt, markup = make_keyboard(following, context.user_data.get("description",""))
         await update.message.reply_text(prompt, reply_markup=markup)
         return
 
@@ -376,91 +466,104 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-async def universal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = update.effective_user
-    uid = user.id
-    text = update.message.text or ""
-    logger.info(f"[UNIVERSAL] User {uid} (@{user.username or '-'}, {user.first_name}) sent: {text}")
-
-    # 0️⃣ Перевірка статусу
-    if text == BUTTONS["check_status"]:
-        await check_status(update, context)
-        return
-
-    # 1️⃣ Будь-яке медіа
-    if update.message.document or update.message.photo or update.message.video or update.message.audio:
-        await handle_media(update, context)
-        return
-
-    # 2️⃣ Режим коментаря
-    if context.user_data.get("user_comment_mode"):
-        if text == BUTTONS["exit_comment"]:
-            context.user_data["user_comment_mode"] = False
-            context.user_data["comment_task_id"] = None
-            await update.message.reply_text(
-                "🔙 Ви вийшли з режиму коментаря.",
-                reply_markup=main_menu_markup
-            )
-        else:
-            await add_comment_handler(update, context)
-        return
-
-    # 3️⃣ Головне меню
-    if text == BUTTONS["help"]:
-        await start(update, context)
-    elif text == BUTTONS["my_tickets"]:
-        await mytickets_handler(update, context)
-
-    # 4️⃣ Створити заявку
-    elif text == BUTTONS["create_ticket"]:
-        # якщо вже авторизовані — стрибаємо division & department & full_name
-        start_step = 2 if context.user_data.get("profile") else 0
-        context.user_data["step"] = start_step
-        prompt, markup = make_keyboard(start_step)
-        await update.message.reply_text(prompt, reply_markup=markup)
-        # якщо вже авторизовані — стрибаємо division, department, full_name
-        profile = context.user_data.get("profile")
-        if profile:
-            # підтягуємо дані з профілю
-            context.user_data["division"]   = profile.get("division")
-            context.user_data["department"] = profile.get("department")
-            context.user_data["full_name"]  = profile.get("full_name")
-            start_step = 2  # 0=division, 1=department, 2=service
-        else:
-            start_step = 0
-
-        context.user_data["step"] = start_step
-        prompt, markup = make_keyboard(start_step)
-        await update.message.reply_text(prompt, reply_markup=markup)
+async def start_ticket_form(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Починає форму створення заявки."""
+    profile = context.user_data.get("profile")
+    if profile:
+        # якщо вже авторизовані — підтягуємо division, department, full_name з профілю
+        context.user_data["division"]   = profile.get("division")
+        context.user_data["department"] = profile.get("department")
+        context.user_data["full_name"]  = profile.get("full_name")
+    step = first_step(bool(profile))
+    context.user_data["step"] = step
+    prompt, markup = make_keyboard(step)
+    await update.message.reply_text(prompt, reply_markup=markup)
 
-    # 5️⃣ Показати форму коментаря
-    elif text == BUTTONS["add_comment"]:
-        await choose_task_for_comment(update, context)
 
-    # 6️⃣ Підтвердження створення задачі
-    elif text == BUTTONS["confirm_create"]:
-        await send_to_jira(update, context)
+async def form_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """«Назад» у формі."""
+    current = context.user_data.get("step", 1)
+    prev = prev_step(current, bool(context.user_data.get("profile")))
+    context.user_data["step"] = prev
+    prompt, markup = make_keyboard(prev, context.user_data.get("description",""))
+    await update.message.reply_text(prompt, reply_markup=markup)
 
-    # 7️⃣ «Назад» у формі (якщо ви використовуєте таку кнопку)
-    elif text == BUTTONS.get("back"):
-        prev = max(0, context.user_data.get("step", 1) - 1)
-        context.user_data["step"] = prev
-        prompt, markup = make_keyboard(prev, context.user_data.get("description",""))
-        await update.message.reply_text(prompt, reply_markup=markup)
 
-    else:
-        # будь-який інший текст — у загальний обробник
-        await handle_message(update, context)
+async def back_to_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """«Вийти на головну» / «Продовжити без авторизації»: закриває форму і показує меню."""
+    context.user_data.pop("step", None)
+    await update.message.reply_text("Оберіть дію:", reply_markup=main_menu_markup)
 
 
-async def exit_comment_mode(update: Update, uid: int):
+async def exit_comment_mode(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Вимикаємо режим коментаря
-    user_data[uid]["user_comment_mode"] = False
-    user_data[uid]["comment_task_id"] = None
+    context.user_data["user_comment_mode"] = False
+    context.user_data["comment_task_id"] = None
     await update.message.reply_text(
         "🔙 Ви вийшли з режиму коментаря.",
         reply_markup=main_menu_markup
     )
+
+
+class TextAction(NamedTuple):
+    branch: str    # мітка гілки для метрик
+    handler: Callable
+    scope: str     # ANY — завжди, MENU — поза режимом коментаря, COMMENT — лише в ньому
+
+
+ANY, MENU, COMMENT = "any", "menu", "comment"
+
+# Текст кнопки -> дія. Будується один раз при імпорті, пошук — один dict lookup.
+TEXT_ACTIONS = {
+    BUTTONS["check_status"]:          TextAction("check_status", check_status, ANY),
+    BUTTONS["exit_comment"]:          TextAction("comment", exit_comment_mode, COMMENT),
+    BUTTONS["help"]:                  TextAction("help", start, MENU),
+    BUTTONS["restart"]:               TextAction("help", start, MENU),
+    BUTTONS["my_tickets"]:            TextAction("my_tickets", mytickets_handler, MENU),
+    BUTTONS["create_ticket"]:         TextAction("create_ticket", start_ticket_form, MENU),
+    BUTTONS["add_comment"]:           TextAction("add_comment", choose_task_for_comment, MENU),
+    BUTTONS["confirm_create"]:        TextAction("confirm_create", send_to_jira, MENU),
+    BUTTONS["back"]:                  TextAction("back", form_back, MENU),
+    BUTTONS["exit"]:                  TextAction("main_menu", back_to_main_menu, MENU),
+    BUTTONS["continue_unauthorized"]: TextAction("main_menu", back_to_main_menu, MENU),
+}
+
+
+@instrument_handler("universal_handler")
+async def universal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    message = update.message
+    text = message.text or ""
+    # текст повідомлення — лише на DEBUG; на INFO — проріджений рядок без вмісту
+    logger.info("[UNIVERSAL] User %s (@%s) надіслав %s симв.", user.id, user.username or '-', len(text), extra=SAMPLED)
+    logger.debug("[UNIVERSAL] User %s sent: %r", user.id, text)
+
+    # 0️⃣ Будь-яке медіа
+    if message.document or message.photo or message.video or message.audio:
+        set_branch("media")
+        await handle_media(update, context)
+        return
+
+    # 1️⃣ Кнопки меню, форми та режиму коментаря
+    comment_mode = bool(context.user_data.get("user_comment_mode"))
+    action = TEXT_ACTIONS.get(text)
+    if action is not None and (action.scope == ANY or (action.scope == COMMENT) == comment_mode):
+        set_branch(action.branch)
+        await action.handler(update, context)
+        return
+
+    # 2️⃣ Режим коментаря: будь-який інший текст — це коментар
+    if comment_mode:
+        set_branch("comment")
+        await add_comment_handler(update, context)
+        return
+
+    # 3️⃣ Будь-який інший текст — відповідь на крок форми
+    set_branch("form" if context.user_data.get("step") is not None else "unknown")
+    await handle_message(update, context)
+
+
+@instrument_handler("handle_contact")
 async def handle_contact(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     uid = user.id
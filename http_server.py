@@ -0,0 +1,126 @@
+# http_server.py
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+_REASONS = {
+    200: "OK", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+    404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict[str, list[str]]
+    headers: dict[str, str]  # імена заголовків у нижньому регістрі
+    body: bytes = b""
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: bytes | str = b""
+    content_type: str = "text/plain; charset=utf-8"
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class LocalHTTPServer:
+    """
+    Мінімальний HTTP/1.1-сервер на asyncio для службових ендпоінтів
+    (метрики, вебхуки). Один запит на з'єднання, тіло — лише з Content-Length.
+    Не призначений для публічного трафіку: слухайте 127.0.0.1 або ставте за reverse proxy.
+    """
+
+    def __init__(self, host: str, port: int, max_body: int = 1024 * 1024, read_timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.read_timeout = read_timeout
+        self._routes: dict[tuple[str, str], Handler] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    def route(self, method: str, path: str, handler: Handler) -> None:
+        self._routes[(method.upper(), "/" + path.strip("/"))] = handler
+
+    async def start(self) -> None:
+        if self._server is not None:
+            return
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info("[HTTP] Слухаю %s:%s (%s)", self.host, self.port,
+                    ", ".join(f"{m} {p}" for m, p in self._routes))
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                request = await asyncio.wait_for(self._read_request(reader), self.read_timeout)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                return
+            except ValueError as e:
+                response = Response(e.args[1] if len(e.args) > 1 else 400, str(e.args[0]))
+            else:
+                response = await self._dispatch(request) if request else Response(400, "bad request")
+            await self._write(writer, response)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Request | None:
+        line = (await reader.readline()).decode("latin-1").strip()
+        parts = line.split(" ")
+        if len(parts) != 3:
+            return None
+        method, target, _ = parts
+        headers = {}
+        while True:
+            raw = await reader.readline()
+            if raw in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = raw.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > self.max_body:
+            raise ValueError("payload too large", 413)
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return Request(method.upper(), "/" + url.path.strip("/"), parse_qs(url.query), headers, body)
+
+    async def _dispatch(self, request: Request) -> Response:
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                return Response(405, "method not allowed")
+            return Response(404, "not found")
+        try:
+            return await handler(request)
+        except Exception as e:
+            logger.exception(f"[HTTP] {request.method} {request.path}: {e}")
+            return Response(500, "internal error")
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, response: Response) -> None:
+        body = response.body.encode("utf-8") if isinstance(response.body, str) else response.body
+        head = [
+            f"HTTP/1.1 {response.status} {_REASONS.get(response.status, 'Unknown')}",
+            f"Content-Type: {response.content_type}",
+            f"Content-Length: {len(body)}",
+            "Connection: close",
+        ]
+        head += [f"{k}: {v}" for k, v in response.headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
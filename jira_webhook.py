@@ -0,0 +1,223 @@
+# jira_webhook.py
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import sqlite3
+
+from telegram import Bot
+from telegram.error import TelegramError
+
+from config import JIRA_WEBHOOK_SECRET, JIRA_WEBHOOK_FANOUT_INTERVAL
+from http_server import Request, Response
+from services import jira_client, issue_cache
+from google_sheets_service import ensure_ticket_index, resync_ticket_index, ticket_index, update_ticket_status
+
+logger = logging.getLogger(__name__)
+
+EVENT_ISSUE_UPDATED = "jira:issue_updated"
+EVENT_COMMENT_CREATED = "comment_created"
+# подія в SharedSheetStore: [ключ задачі, знімок {"status", "summary"}]
+SHARED_ISSUE_SNAPSHOT = "issue_snapshot"
+
+# Telegram обмежує повідомлення 4096 символами; довгі коментарі обрізаємо
+COMMENT_PREVIEW_CHARS = 1000
+
+
+def _adf_text(node) -> str:
+    """Плоский текст з Atlassian Document Format (тіло коментаря у REST API v3)."""
+    if isinstance(node, str):
+        return node
+    if isinstance(node, list):
+        return "".join(_adf_text(n) for n in node)
+    if not isinstance(node, dict):
+        return ""
+    if node.get("type") == "text":
+        return node.get("text", "")
+    if node.get("type") == "hardBreak":
+        return "\n"
+    text = _adf_text(node.get("content", []))
+    if node.get("type") in ("paragraph", "heading", "listItem", "codeBlock"):
+        text += "\n"
+    return text
+
+
+class JiraWebhook:
+    """
+    Приймає вебхуки Jira (jira:issue_updated, comment_created):
+    оновлює кеш задач і статус у таблиці tickets та повідомляє автора заявки
+    в чат, збережений у Telegram_Chat_ID. Jira отримує 204 одразу після
+    перевірки секрету — обробка йде у фоні.
+    У багатопроцесному режимі вебхук приймає лише перший обробник; нові знімки
+    задач він публікує в спільне сховище, а інші обробники (follow()) кожні
+    fanout_interval секунд переносять їх у свій issue_cache.
+    """
+
+    def __init__(self, secret: str, fanout_interval: float = 2.0):
+        self.secret = secret
+        self.fanout_interval = fanout_interval
+        self._bot: Bot | None = None
+        self._tasks: set[asyncio.Task] = set()
+        # спільне сховище (SharedSheetStore) процесів-обробників, див. supervisor.py
+        self.shared = None
+        self._follow_task: asyncio.Task | None = None
+        self.received = 0
+        self.rejected = 0
+        self.notified = 0
+        self.forwarded = 0
+
+    def start(self, bot: Bot) -> None:
+        self._bot = bot
+
+    def follow(self) -> None:
+        """Запускає перенесення знімків задач, отриманих вебхуком в іншому процесі."""
+        if self.shared is not None and self._follow_task is None:
+            self._follow_task = asyncio.create_task(self._follow())
+
+    async def stop(self) -> None:
+        if self._follow_task is not None:
+            self._follow_task.cancel()
+            try:
+                await self._follow_task
+            except asyncio.CancelledError:
+                pass
+            self._follow_task = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _authorized(self, request: Request) -> bool:
+        if not self.secret:
+            return False
+        signature = request.headers.get("x-hub-signature", "")
+        if signature:
+            expected = "sha256=" + hmac.new(self.secret.encode(), request.body, hashlib.sha256).hexdigest()
+            return hmac.compare_digest(signature, expected)
+        given = (request.query.get("secret") or [""])[0]
+        return hmac.compare_digest(given.encode(), self.secret.encode())
+
+    async def endpoint(self, request: Request) -> Response:
+        if not self._authorized(request):
+            self.rejected += 1
+            logger.warning("[JIRA-WEBHOOK] Відхилено запит з невірним секретом")
+            return Response(401, "unauthorized")
+        try:
+            event = json.loads(request.body)
+        except ValueError:
+            return Response(400, "invalid json")
+        self.received += 1
+        task = asyncio.create_task(self._handle(event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return Response(204)
+
+    async def _handle(self, event: dict) -> None:
+        kind = event.get("webhookEvent")
+        issue = event.get("issue") or {}
+        key = issue.get("key")
+        if not key:
+            return
+        try:
+            if kind == EVENT_ISSUE_UPDATED:
+                await self._issue_updated(key, issue, event.get("changelog") or {})
+            elif kind == EVENT_COMMENT_CREATED:
+                await self._comment_created(key, issue, event.get("comment") or {})
+        except Exception as e:
+            logger.exception(f"[JIRA-WEBHOOK] Помилка обробки {kind} для {key}: {e}")
+
+    async def _issue_updated(self, key: str, issue: dict, changelog: dict) -> None:
+        fields = issue.get("fields") or {}
+        cached = issue_cache.peek(key) or {}
+        status = (fields.get("status") or {}).get("name") or cached.get("status")
+        summary = fields.get("summary", cached.get("summary", ""))
+        if status:
+            snapshot = {"status": status, "summary": summary}
+            issue_cache.set(key, snapshot)
+            await self._share(key, snapshot)
+
+        change = next((i for i in changelog.get("items", []) if i.get("field") == "status"), None)
+        if change is None:
+            return
+        new_status = change.get("toString") or status
+        ticket = await self._ticket(key)
+        if ticket is None:
+            return
+        if ticket.get("Status") != new_status:
+            await update_ticket_status(key, new_status)
+        await self._notify(
+            ticket,
+            f"🔔 Задача {key}: статус змінено «{change.get('fromString', '')}» → «{new_status}»\n"
+            f"Summary: {summary}",
+        )
+
+    async def _comment_created(self, key: str, issue: dict, comment: dict) -> None:
+        author = comment.get("author") or {}
+        # коментарі, які бот сам переслав від користувача, назад не надсилаємо
+        if author.get("accountId") and author.get("accountId") == await jira_client.own_account_id():
+            return
+        ticket = await self._ticket(key)
+        if ticket is None:
+            return
+        text = _adf_text(comment.get("body", "")).strip()
+        if len(text) > COMMENT_PREVIEW_CHARS:
+            text = text[:COMMENT_PREVIEW_CHARS] + "…"
+        await self._notify(
+            ticket,
+            f"💬 Новий коментар до задачі {key} від {author.get('displayName', 'Jira')}:\n{text}",
+        )
+
+    async def _share(self, key: str, snapshot: dict) -> None:
+        if self.shared is None:
+            return
+        try:
+            await asyncio.to_thread(self.shared.publish_event, SHARED_ISSUE_SNAPSHOT, [key, snapshot])
+        except sqlite3.Error as e:
+            logger.warning(f"[JIRA-WEBHOOK] Не вдалося передати {key} іншим обробникам: {e}")
+
+    async def _follow(self) -> None:
+        seq = await asyncio.to_thread(self.shared.last_event)
+        while True:
+            await asyncio.sleep(self.fanout_interval)
+            try:
+                seq, events = await asyncio.to_thread(self.shared.read_events, SHARED_ISSUE_SNAPSHOT, seq)
+            except sqlite3.Error as e:
+                logger.warning(f"[JIRA-WEBHOOK] Не вдалося прочитати оновлення задач: {e}")
+                continue
+            for key, snapshot in events:
+                issue_cache.set(key, snapshot)
+            self.forwarded += len(events)
+
+    @staticmethod
+    async def _ticket(key: str) -> dict | None:
+        """Заявка з індексу tickets; None — задачу створено не через бота."""
+        try:
+            await ensure_ticket_index()
+            ticket = ticket_index.get(key)
+            if ticket is None:
+                # заявку міг щойно створити інший процес-обробник — дочитуємо аркуш
+                await resync_ticket_index()
+        except Exception as e:
+            logger.error(f"[JIRA-WEBHOOK] Індекс заявок недоступний: {e!r}")
+        return ticket_index.get(key)
+
+    async def _notify(self, ticket: dict, text: str) -> None:
+        chat_id = ticket.get("Telegram_Chat_ID") or ticket.get("Telegram_User_ID")
+        if not chat_id or self._bot is None:
+            return
+        try:
+            await self._bot.send_message(int(chat_id), text)
+            self.notified += 1
+        except (TelegramError, ValueError) as e:
+            logger.warning(f"[JIRA-WEBHOOK] Не вдалося повідомити чат {chat_id} про {ticket.get('Ticket_ID')}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "notified": self.notified,
+            "forwarded": self.forwarded,
+            "in_progress": len(self._tasks),
+        }
+
+
+jira_webhook = JiraWebhook(JIRA_WEBHOOK_SECRET, fanout_interval=JIRA_WEBHOOK_FANOUT_INTERVAL)
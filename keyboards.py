@@ -1,14 +1,19 @@
 import logging
+from typing import NamedTuple
+
 from telegram import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 
 logger = logging.getLogger(__name__)
 
+_contact_markup = ReplyKeyboardMarkup(
+    [[KeyboardButton("📞 Надіслати номер телефону", request_contact=True)]],
+    resize_keyboard=True,
+    one_time_keyboard=True
+)
+
+
 def request_contact_keyboard():
-    return ReplyKeyboardMarkup(
-        [[KeyboardButton("📞 Надіслати номер телефону", request_contact=True)]],
-        resize_keyboard=True,
-        one_time_keyboard=True
-    )
+    return _contact_markup
 
 # Основні кроки створення заявки
 # Замінено порядок: full_name іде перед service, щоб при авторизованому user
@@ -54,40 +59,89 @@ BUTTONS = {
     "restart":               "Повторити /start"
 }
 
+# Підказки кроків; {description} підставляється під час показу
+PROMPTS = {
+    "division":    "Оберіть ваш Підрозділ:",
+    "department":  "Оберіть Департамент:",
+    "full_name":   "Введіть ваше Прізвище та Ім'я:",
+    "service":     "Оберіть Сервіс:",
+    "description": "Опишіть вашу проблему:",
+    "confirm_create": (
+        f"Натисніть '{BUTTONS['confirm_create']}', якщо все заповнено.\n\n"
+        "Опис задачі:\n{description}"
+    ),
+}
+
+# Кроки, які авторизований користувач не заповнює — дані беруться з профілю
+PROFILE_STEPS = frozenset({"division", "department", "full_name"})
+
+
+class FormStep(NamedTuple):
+    index: int
+    name: str
+    prompt: str                  # шаблон підказки
+    markup: ReplyKeyboardMarkup  # готова клавіатура кроку
+    templated: bool              # чи потрібно підставляти {description}
+
+
+def _compile_form() -> tuple[FormStep, ...]:
+    steps = []
+    for index, name in enumerate(STEPS):
+        if name == "confirm_create":
+            buttons = [[KeyboardButton(BUTTONS["confirm_create"])]]
+        else:
+            # Якщо для цього кроку є OPTIONS — показуємо їх, інакше залишаємо поле для вводу
+            buttons = [[KeyboardButton(opt)] for opt in OPTIONS.get(name, [])]
+        # Додаємо завжди кнопку "Назад"
+        buttons.append([KeyboardButton(BUTTONS["back"])])
+        prompt = PROMPTS.get(name, "Невідомий крок")
+        steps.append(FormStep(index, name, prompt, ReplyKeyboardMarkup(buttons, resize_keyboard=True),
+                              "{description}" in prompt))
+    return tuple(steps)
+
+
+def _compile_transitions() -> tuple[dict, dict, dict]:
+    """Таблиці переходів (крок, авторизований) -> крок; наступний після останнього — None."""
+    first, forward, backward = {}, {}, {}
+    for authorized in (False, True):
+        order = [i for i, name in enumerate(STEPS) if not (authorized and name in PROFILE_STEPS)]
+        first[authorized] = order[0]
+        for i in range(len(STEPS)):
+            later = [j for j in order if j > i]
+            earlier = [j for j in order if j < i]
+            forward[(i, authorized)] = later[0] if later else None
+            backward[(i, authorized)] = earlier[-1] if earlier else order[0]
+    return first, forward, backward
+
+
+# Скомпільовано один раз при імпорті: обробники лише читають готові об'єкти
+FORM = _compile_form()
+_FIRST_STEP, _NEXT_STEP, _PREV_STEP = _compile_transitions()
+FORM_FIELDS = tuple(step.name for step in FORM if step.name != "confirm_create")
+
+
+def first_step(authorized: bool) -> int:
+    """Перший крок форми: авторизований одразу обирає сервіс (STEPS.index("service") == 3)."""
+    return _FIRST_STEP[authorized]
+
+
+def next_step(step: int, authorized: bool) -> int | None:
+    return _NEXT_STEP[(step, authorized)]
+
+
+def prev_step(step: int, authorized: bool) -> int:
+    return _PREV_STEP[(step, authorized)]
+
+
 def make_keyboard(step: int, description: str = "") -> tuple[str, ReplyKeyboardMarkup]:
     """
     Повертає (prompt, ReplyKeyboardMarkup) для поточного кроку створення заявки.
+    Клавіатури та підказки збудовані заздалегідь (див. FORM).
     """
-    name = STEPS[step]
-
-    # Підбираємо кнопки
-    if name == "confirm_create":
-        buttons = [[KeyboardButton(BUTTONS["confirm_create"])]]
-    else:
-        # Якщо для цього кроку є OPTIONS — показуємо їх, інакше залишаємо поле для вводу
-        opts = OPTIONS.get(name, [])
-        buttons = [[KeyboardButton(opt)] for opt in opts]
-
-    # Додаємо завжди кнопку "Назад"
-    buttons.append([KeyboardButton(BUTTONS["back"])])
-
-    markup = ReplyKeyboardMarkup(buttons, resize_keyboard=True)
-
-    # Підсказки- prompt
-    prompts = {
-        "division":    "Оберіть ваш Підрозділ:",
-        "department":  "Оберіть Департамент:",
-        "full_name":   "Введіть ваше Прізвище та Ім'я:",
-        "service":     "Оберіть Сервіс:",
-        "description": "Опишіть вашу проблему:",
-        "confirm_create":     (
-            f"Натисніть '{BUTTONS['confirm_create']}', якщо все заповнено.\n\n"
-            f"Опис задачі:\n{description}"
-        )
-    }
-
-    prompt = prompts.get(name, "Невідомий крок")
-    return prompt, markup
+    form_step = FORM[step]
+    if form_step.templated:
+        return form_step.prompt.format(description=description), form_step.markup
+    return form_step.prompt, form_step.markup
 
 def remove_keyboard() -> ReplyKeyboardRemove:
     """
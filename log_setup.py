@@ -0,0 +1,124 @@
+# log_setup.py
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+
+from config import (
+    LOG_FILE,
+    LOG_LEVEL,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_SAMPLE_RATE,
+    LOG_SAMPLED_PER_SECOND,
+)
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# extra=SAMPLED позначає записи, що пишуться на кожне повідомлення користувача;
+# їх проріджує SamplingFilter (LOG_SAMPLE_RATE, LOG_SAMPLED_PER_SECOND)
+SAMPLED = {"sampled": True}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускає частку `rate` записів з extra=SAMPLED і не більше `per_second` за секунду
+    (token bucket). Інші записи та все від WARNING і вище проходять без змін.
+    """
+
+    def __init__(self, rate: float = 1.0, per_second: float = 0.0):
+        super().__init__()
+        self.rate = rate
+        self.per_second = per_second
+        self._tokens = per_second
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False) or record.levelno >= logging.WARNING:
+            return True
+        if self.rate < 1.0 and random.random() >= self.rate:
+            self.dropped += 1
+            return False
+        if self.per_second > 0:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.per_second, self._tokens + (now - self._updated) * self.per_second)
+                self._updated = now
+                if self._tokens < 1:
+                    self.dropped += 1
+                    return False
+                self._tokens -= 1
+        return True
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладе запис у чергу як є: форматування (msg % args, трейсбек) відбувається
+    в потоці QueueListener, а не в event loop. Безпечно, бо черга в межах процесу.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _log_path(path: str) -> str:
+    # процеси-обробники (supervisor.py) пишуть кожен у свій файл: ротація
+    # одного файлу з кількох процесів ламає його
+    name = multiprocessing.current_process().name
+    if name == "MainProcess":
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{name}{ext}"
+
+
+sampling_filter = SamplingFilter(LOG_SAMPLE_RATE, LOG_SAMPLED_PER_SECOND)
+
+
+def setup_logging() -> None:
+    """
+    Налаштовує кореневий логер: QueueHandler → фоновий QueueListener →
+    RotatingFileHandler (LOG_FILE, LOG_MAX_BYTES × LOG_BACKUP_COUNT) і консоль.
+    Повторний виклик у тому ж процесі нічого не змінює.
+    """
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None:
+        return
+
+    path = _log_path(LOG_FILE)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    queue_handler = _LazyQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(sampling_filter)
+
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    _listener = logging.handlers.QueueListener(
+        queue_handler.queue, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Дописує чергу на диск і зупиняє фоновий потік."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,60 +1,232 @@
 #!/usr/bin/env python3
+import time
+
+# час імпорту модулів бота — частина звіту про старт (див. on_startup)
+_IMPORT_STARTED = time.perf_counter()
+
 import logging
-import os
+import secrets
 from datetime import datetime
 
+from telegram import Update
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
+    ContextTypes,
     MessageHandler,
     CallbackQueryHandler,
+    TypeHandler,
     filters
 )
-from dotenv import load_dotenv
 
-# Завантаження змінних оточення перед імпортом конфігурації
-load_dotenv()
-
-from config import TOKEN
+# .env та credentials.env завантажуються в config.py
+from config import (
+    TOKEN,
+    LOOP_LAG_MONITOR,
+    LOOP_LAG_REPORT_INTERVAL,
+    BOT_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET_TOKEN,
+    UPDATE_DEDUP_SIZE,
+    CONCURRENT_UPDATES,
+    MAX_PENDING_UPDATES,
+    SESSION_PERSISTENCE,
+    SESSION_DB_PATH,
+    SESSION_FLUSH_INTERVAL,
+    BOT_WORKERS,
+    SSL_CERT_PATH,
+    SSL_KEY_PATH,
+    METRICS_ENABLED,
+    METRICS_LISTEN,
+    METRICS_PORT,
+    WARMUP_ENABLED,
+    WARMUP_TIMEOUT,
+    JIRA_WARMUP_CONNECTIONS,
+    JIRA_WEBHOOK_ENABLED,
+    JIRA_WEBHOOK_LISTEN,
+    JIRA_WEBHOOK_PORT,
+    JIRA_WEBHOOK_PATH,
+    JIRA_WEBHOOK_SECRET,
+    TG_GLOBAL_RATE,
+    TG_CHAT_RATE,
+    TG_CHAT_BURST,
+    TG_GROUP_RATE_PER_MIN,
+    TG_MAX_RETRIES,
+    TG_COALESCE_WINDOW,
+)
+from updates import UpdateDeduplicator, PerChatUpdateProcessor
+from storage import SQLiteDatabase, SessionPersistence, SessionContext
+from rate_limiter import FloodControlLimiter
+from services import jira_client, issue_cache_stats, JiraUnavailableError
+from google_sheets_service import sheets_write_queue, sheets_executor_backlog, shutdown_sheets_executor
+from metrics import loop_lag_monitor, registry
+from media import close_media_client, upload_budget
+from http_server import LocalHTTPServer, Response
+from outbox import ticket_outbox
+from attachment_cache import attachment_cache
+from jira_webhook import jira_webhook
+from startup import warm_up, format_timings
+from log_setup import setup_logging, sampling_filter
 from handlers import (
     start,
     handle_comment_callback,
+    handle_ticket_page,
     universal_handler,
     handle_contact
 )
 
-# Створити каталог logs/ якщо ще не існує
-os.makedirs("logs", exist_ok=True)
-
-# Конфігурація логування у файл і консоль
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("logs/bot.log", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+# Логування у файл (з ротацією) і консоль через фоновий потік — див. log_setup.py
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
 async def error_handler(update, context):
-    logger.error("Exception while handling an update:", exc_info=context.error)
-    if update and getattr(update, 'message', None):
+    if isinstance(context.error, JiraUnavailableError):
+        # circuit breaker відкритий — одразу кажемо користувачу, без трейсбеку в лог
+        logger.warning("Jira unavailable while handling an update: %s", context.error)
+        text = JiraUnavailableError.user_message
+    else:
+        logger.error("Exception while handling an update:", exc_info=context.error)
+        text = "⚠️ Сталася помилка. Спробуйте знову."
+    message = getattr(update, 'effective_message', None) if update else None
+    if message:
         try:
-            await update.message.reply_text("⚠️ Сталася помилка. Спробуйте знову.")
+            await message.reply_text(text)
         except Exception:
             pass
 
 
-def main():
-    app = ApplicationBuilder().token(TOKEN).build()
+# Службовий HTTP-сервер (метрики); порт зсувається на номер процесу-обробника
+service_server: LocalHTTPServer | None = None
+# Вебхук Jira; у багатопроцесному режимі його приймає лише перший обробник, решта — follow()
+jira_webhook_server: LocalHTTPServer | None = None
+
+
+async def metrics_endpoint(request):
+    return Response(200, registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+async def on_startup(app):
+    """Піднімає довгоживучі клієнти зовнішніх сервісів."""
+    global service_server, jira_webhook_server
+    started = time.perf_counter()
+    await jira_client.start()
+    sheets_write_queue.start()
+    ticket_outbox.start(app.bot)
+    if LOOP_LAG_MONITOR:
+        loop_lag_monitor.report_interval = LOOP_LAG_REPORT_INTERVAL
+        loop_lag_monitor.start()
+    if METRICS_ENABLED:
+        service_server = LocalHTTPServer(METRICS_LISTEN, METRICS_PORT + registry.worker)
+        service_server.route("GET", "/metrics", metrics_endpoint)
+        try:
+            await service_server.start()
+        except OSError as e:
+            logger.error("[METRICS] Не вдалося відкрити %s:%s — %s", METRICS_LISTEN, service_server.port, e)
+            service_server = None
+    if JIRA_WEBHOOK_ENABLED and registry.worker <= 1:
+        if not JIRA_WEBHOOK_SECRET:
+            logger.error("[JIRA-WEBHOOK] JIRA_WEBHOOK_SECRET не задано — вебхук не запущено")
+        else:
+            jira_webhook.start(app.bot)
+            jira_webhook_server = LocalHTTPServer(JIRA_WEBHOOK_LISTEN, JIRA_WEBHOOK_PORT)
+            jira_webhook_server.route("POST", JIRA_WEBHOOK_PATH, jira_webhook.endpoint)
+            try:
+                await jira_webhook_server.start()
+            except OSError as e:
+                logger.error("[JIRA-WEBHOOK] Не вдалося відкрити %s:%s — %s", JIRA_WEBHOOK_LISTEN, JIRA_WEBHOOK_PORT, e)
+                jira_webhook_server = None
+    elif JIRA_WEBHOOK_ENABLED:
+        # вебхук у першому обробнику — звідти беремо свіжі статуси задач
+        jira_webhook.follow()
+
+    # Jira, Sheets, довідник користувачів та індекс заявок — паралельно, до першого оновлення
+    timings = await warm_up(JIRA_WARMUP_CONNECTIONS, WARMUP_TIMEOUT) if WARMUP_ENABLED else {}
+    logger.info(
+        "[STARTUP] імпорт модулів %.2f с; прогрів: %s; post_init %.2f с",
+        IMPORT_SECONDS,
+        format_timings(timings) or "вимкнено",
+        time.perf_counter() - started,
+    )
+
+
+async def on_shutdown(app):
+    """Закриває клієнти та пули з'єднань."""
+    if service_server is not None:
+        await service_server.stop()
+    if jira_webhook_server is not None:
+        await jira_webhook_server.stop()
+    await jira_webhook.stop()
+    await loop_lag_monitor.stop()
+    # незавершені заявки лишаються в outbox і будуть підхоплені після перезапуску
+    await ticket_outbox.stop()
+    await jira_client.close()
+    await close_media_client()
+    attachment_cache.close()
+    await sheets_write_queue.stop()
+    shutdown_sheets_executor()
+    if isinstance(app.persistence, SessionPersistence):
+        # PTB вже викликав flush() перед post_shutdown
+        app.persistence.db.close()
+
+
+def build_application(with_updater: bool = True, request=None):
+    """
+    Створює Application з усіма обробниками.
+    with_updater=False — для процесів-обробників, які отримують оновлення
+    від супервізора, а не з Telegram напряму (див. supervisor.py).
+    request — власна реалізація BaseRequest для Bot API (напр. заглушка в benchmarks/).
+    """
+    builder = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if request is not None:
+        builder = builder.request(request)
+    if not with_updater:
+        builder = builder.updater(None)
+    # ліміти Telegram на надсилання; загальний ліміт ділиться між процесами-обробниками
+    limiter = FloodControlLimiter(
+        global_rate=TG_GLOBAL_RATE / max(1, BOT_WORKERS),
+        chat_rate=TG_CHAT_RATE,
+        chat_burst=TG_CHAT_BURST,
+        group_rate_per_min=TG_GROUP_RATE_PER_MIN,
+        max_retries=TG_MAX_RETRIES,
+        coalesce_window=TG_COALESCE_WINDOW,
+    )
+    builder = builder.rate_limiter(limiter)
+    processor = None
+    if CONCURRENT_UPDATES > 0:
+        # різні чати — паралельно, один чат — строго по черзі
+        processor = PerChatUpdateProcessor(CONCURRENT_UPDATES, MAX_PENDING_UPDATES)
+        builder = builder.concurrent_updates(processor)
+    if SESSION_PERSISTENCE:
+        # сесії переживають перезапуск; кожна завантажується при першому зверненні
+        builder = (
+            builder
+            .persistence(SessionPersistence(SQLiteDatabase(SESSION_DB_PATH), SESSION_FLUSH_INTERVAL))
+            .context_types(ContextTypes(context=SessionContext))
+        )
+    app = builder.build()
+
+    # -1) Відсікаємо повторні доставки одного update_id (webhook-ретраї Telegram)
+    dedup = UpdateDeduplicator(UPDATE_DEDUP_SIZE)
+    app.add_handler(TypeHandler(Update, dedup), group=-1)
 
     # 0) Стартова команда
     app.add_handler(CommandHandler("start", start))
 
     # 1) Обробка кліку на інлайн-кнопки comment_task_<ID>
     app.add_handler(CallbackQueryHandler(handle_comment_callback, pattern=r"^comment_task_"))
+    # Навігація сторінками списку заявок: tl:<вид>:<сторінка>
+    app.add_handler(CallbackQueryHandler(handle_ticket_page, pattern=r"^tl:"))
 
     # 2) Хендлер лише для медіа
     app.add_handler(MessageHandler(
@@ -74,9 +246,76 @@ def main():
     # 5) Обробник помилок
     app.add_error_handler(error_handler)
 
+    _register_metrics(app, processor, limiter, dedup)
+    return app
+
+
+def _register_metrics(app, processor, limiter, dedup) -> None:
+    """Глибини черг, in-flight та stats() компонентів — обчислюються лише під час scrape."""
+    registry.gauge("bot_update_queue_size", "Оновлення в черзі Application.update_queue",
+                   app.update_queue.qsize)
+    if processor is not None:
+        registry.gauge("bot_updates_in_flight", "Оновлення, що обробляються зараз",
+                       lambda: processor.in_flight)
+        registry.gauge("bot_chats_active", "Чати з оновленнями в роботі або в черзі",
+                       lambda: processor.waiting_chats)
+    registry.gauge("sheets_write_queue_pending", "Зміни, що чекають запису в Google Sheets",
+                   lambda: len(sheets_write_queue))
+    registry.gauge("sheets_executor_backlog", "Виклики Sheets, що чекають вільного потоку",
+                   sheets_executor_backlog)
+    registry.gauge("media_upload_bytes_in_flight", "Байти вкладень, що зараз передаються",
+                   lambda: upload_budget.in_use)
+    registry.gauge("jira_circuit_open", "Стан circuit breaker Jira: 0 closed, 1 half-open, 2 open",
+                   lambda: ("closed", "half_open", "open").index(jira_client.breaker.state))
+    registry.stats_source("issue_cache", issue_cache_stats)
+    registry.stats_source("flood_control", limiter.stats)
+    registry.stats_source("loop_lag", loop_lag_monitor.stats)
+    registry.stats_source("ticket_outbox", ticket_outbox.stats)
+    registry.stats_source("jira_webhook", jira_webhook.stats)
+    registry.stats_source("attachment_cache", attachment_cache.stats)
+    registry.gauge("log_sampled_dropped", "Проріджені записи логу «на кожне повідомлення»",
+                   lambda: sampling_filter.dropped)
+    registry.stats_source("update_dedup", lambda: {"duplicates": dedup.duplicates})
+
+
+def main():
+    app = build_application()
     logger.info("⚙️ BOT STARTED AT: %s", datetime.now())
-    app.run_polling()
+    if BOT_MODE == "webhook" and _webhook_configured():
+        run_webhook(app)
+    else:
+        if BOT_MODE == "webhook":
+            logger.warning("⚠️ BOT_MODE=webhook, але WEBHOOK_URL / SSL_CERT_PATH / SSL_KEY_PATH не задані — працюю через polling")
+        app.run_polling(allowed_updates=Update.ALL_TYPES)
+
+
+def _webhook_configured() -> bool:
+    return bool(WEBHOOK_URL and SSL_CERT_PATH and SSL_KEY_PATH)
+
+
+def run_webhook(app):
+    """
+    Приймає оновлення через HTTPS-webhook із сертифікатами SSL_CERT_PATH / SSL_KEY_PATH.
+    Telegram підписує кожен запит секретом (заголовок X-Telegram-Bot-Api-Secret-Token),
+    запити без нього відхиляються.
+    """
+    secret = WEBHOOK_SECRET_TOKEN or secrets.token_urlsafe(32)
+    logger.info("🌐 Webhook: %s:%s/%s", WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH)
+    app.run_webhook(
+        listen=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        url_path=WEBHOOK_PATH,
+        webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+        cert=SSL_CERT_PATH,
+        key=SSL_KEY_PATH,
+        secret_token=secret,
+        allowed_updates=Update.ALL_TYPES,
+    )
 
 
 if __name__ == "__main__":
-    main()
+    if BOT_WORKERS > 1:
+        from supervisor import run_supervisor
+        run_supervisor(BOT_WORKERS)
+    else:
+        main()
@@ -0,0 +1,308 @@
+# media.py
+import asyncio
+import io
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO
+
+import httpx
+
+from config import (
+    MEDIA_SPOOL_THRESHOLD,
+    MEDIA_MAX_INFLIGHT_BYTES,
+    MEDIA_CHUNK_SIZE,
+    MEDIA_TMP_DIR,
+    MEDIA_DOWNLOAD_TIMEOUT,
+    MEDIA_GROUP_WINDOW,
+)
+from services import (
+    attach_file_to_jira,
+    attach_files_to_jira,
+    get_issue_attachment_names,
+    JiraUnavailableError,
+)
+from attachment_cache import attachment_cache
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# ЛІМІТ БАЙТ В ОБРОБЦІ
+# -----------------------
+
+class ByteBudget:
+    """
+    Семафор у байтах: обмежує сумарний розмір вкладень, що одночасно
+    завантажуються з Telegram і вивантажуються в Jira.
+    Файл, більший за весь ліміт, обробляється лише коли інших немає.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._cond = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, size: int):
+        size = max(1, min(size, self.limit))
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_use + size <= self.limit)
+            self.in_use += size
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.in_use -= size
+                self._cond.notify_all()
+
+
+upload_budget = ByteBudget(MEDIA_MAX_INFLIGHT_BYTES)
+
+
+# -----------------------
+# ЗАВАНТАЖЕННЯ З TELEGRAM
+# -----------------------
+
+_download_client: httpx.AsyncClient | None = None
+
+
+def _client() -> httpx.AsyncClient:
+    global _download_client
+    if _download_client is None or _download_client.is_closed:
+        _download_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(MEDIA_DOWNLOAD_TIMEOUT, connect=10.0),
+            follow_redirects=True,
+        )
+    return _download_client
+
+
+async def close_media_client() -> None:
+    global _download_client
+    if _download_client is not None and not _download_client.is_closed:
+        await _download_client.aclose()
+    _download_client = None
+
+
+async def iter_telegram_file(tg_file) -> AsyncIterator[bytes]:
+    """Віддає вміст файлу Telegram частинами по MEDIA_CHUNK_SIZE байт."""
+    async with _client().stream("GET", tg_file.file_path) as r:
+        if r.is_error:
+            # URL файлу містить токен бота — у текст помилки (а отже в логи) він не потрапляє
+            raise httpx.HTTPStatusError(
+                f"Завантаження файлу з Telegram: HTTP {r.status_code}", request=r.request, response=r
+            ) from None
+        async for chunk in r.aiter_bytes(MEDIA_CHUNK_SIZE):
+            yield chunk
+
+
+async def download_telegram_file(tg_file) -> BinaryIO:
+    """
+    Завантажує файл Telegram потоком. Поки розмір не перевищує
+    MEDIA_SPOOL_THRESHOLD, дані лежать у BytesIO, далі — у тимчасовому файлі.
+    Повертає відкритий файловий об'єкт на початку; закрити його має викликач.
+    """
+    path = tg_file.file_path or ""
+    if not path.startswith(("http://", "https://")):
+        # локальний Bot API сервер віддає шлях до файлу на диску
+        return open(path, "rb")
+
+    buf: BinaryIO = io.BytesIO()
+    try:
+        async for chunk in iter_telegram_file(tg_file):
+            if isinstance(buf, io.BytesIO) and buf.tell() + len(chunk) > MEDIA_SPOOL_THRESHOLD:
+                spill = tempfile.TemporaryFile(dir=MEDIA_TMP_DIR)
+                spill.write(buf.getbuffer())
+                buf.close()
+                buf = spill
+            buf.write(chunk)
+    except BaseException:
+        buf.close()
+        raise
+    buf.seek(0)
+    return buf
+
+
+# -----------------------
+# TELEGRAM -> JIRA
+# -----------------------
+
+def file_size_hint(file_obj) -> int:
+    """Розмір файлу з метаданих Telegram; якщо невідомий — поріг буфера в пам'яті."""
+    return getattr(file_obj, "file_size", None) or MEDIA_SPOOL_THRESHOLD
+
+
+async def fetch_telegram_file(bot, file_obj) -> tuple[BinaryIO, str | None]:
+    """
+    Вміст вкладення та його SHA-256: з кешу на диску за file_unique_id,
+    інакше — завантаження з Telegram із збереженням у кеш.
+    Хеш None, якщо кеш вимкнено або файл завеликий для нього.
+    """
+    unique_id = getattr(file_obj, "file_unique_id", None)
+    digest = await attachment_cache.digest_for(unique_id)
+    if digest:
+        stream = await attachment_cache.open(digest)
+        if stream is not None:
+            return stream, digest
+
+    tg_file = await bot.get_file(file_obj.file_id)
+    stream = await download_telegram_file(tg_file)
+    digest = None
+    if attachment_cache.cacheable(getattr(file_obj, "file_size", None)):
+        try:
+            digest = await attachment_cache.store(unique_id, stream)
+        except BaseException:
+            stream.close()
+            raise
+    return stream, digest
+
+
+async def _still_in_jira(issue_id: str, filename: str) -> bool:
+    """Чи вкладення filename досі є в задачі; коли Jira не відповідає — віримо кешу."""
+    try:
+        return filename in await get_issue_attachment_names(issue_id)
+    except (JiraUnavailableError, httpx.HTTPError) as e:
+        logger.warning(f"[MEDIA] Не вдалося перевірити вкладення {issue_id}: {e!r}")
+        return True
+
+
+async def already_attached(issue_id: str, file_obj) -> bool:
+    """Чи цей файл Telegram уже прикріплено до задачі (без завантаження)."""
+    digest = await attachment_cache.digest_for(getattr(file_obj, "file_unique_id", None))
+    return await attachment_cache.is_attached(issue_id, digest, verify=_still_in_jira)
+
+
+async def attach_telegram_file(bot, issue_id: str, file_obj, filename: str) -> httpx.Response | None:
+    """
+    Потоково переносить вкладення з Telegram у задачу Jira.
+    Пам'ять на одне вкладення обмежена MEDIA_SPOOL_THRESHOLD, а сумарний
+    обсяг одночасних передач — MEDIA_MAX_INFLIGHT_BYTES.
+    Повертає None, якщо такий самий файл уже є в задачі.
+    """
+    if await already_attached(issue_id, file_obj):
+        return None
+    async with upload_budget.reserve(file_size_hint(file_obj)):
+        stream, digest = await fetch_telegram_file(bot, file_obj)
+        try:
+            async with attachment_cache.attaching(issue_id, [digest]):
+                # перевірка ще раз під замком: паралельне надсилання могло щойно прикріпити цей файл
+                if await attachment_cache.is_attached(issue_id, digest):
+                    return None
+                resp = await attach_file_to_jira(issue_id, filename, stream)
+                if resp.status_code in (200, 201):
+                    await attachment_cache.mark_attached(issue_id, digest, filename)
+        finally:
+            stream.close()
+    return resp
+
+
+# -----------------------
+# АЛЬБОМИ (media_group_id)
+# -----------------------
+
+class _Album:
+    def __init__(self, bot, issue_id: str, message):
+        self.bot = bot
+        self.issue_id = issue_id
+        self.message = message  # перше повідомлення альбому — на нього відповідаємо
+        self.parts: list[tuple[object, str]] = []
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class MediaGroupCollector:
+    """
+    Збирає частини альбому (однаковий media_group_id), що приходять окремими
+    оновленнями. Через `window` секунд після останньої частини всі файли
+    завантажуються паралельно, вивантажуються в Jira одним запитом,
+    а користувач отримує одну підсумкову відповідь.
+    """
+
+    def __init__(self, window: float = 1.5):
+        self.window = window
+        self._albums: dict[str, _Album] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def add(self, media_group_id: str, bot, issue_id: str, message, file_obj, filename: str) -> None:
+        album = self._albums.get(media_group_id)
+        if album is None:
+            album = self._albums[media_group_id] = _Album(bot, issue_id, message)
+        album.parts.append((file_obj, filename))
+        if album.timer is not None:
+            album.timer.cancel()
+        album.timer = asyncio.get_running_loop().call_later(self.window, self._flush, media_group_id)
+
+    def _flush(self, media_group_id: str) -> None:
+        album = self._albums.pop(media_group_id, None)
+        if album is None:
+            return
+        task = asyncio.create_task(self._upload(album))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _upload(self, album: _Album) -> None:
+        names = [filename for _, filename in album.parts]
+        # файли, що вже є в задачі, не завантажуємо й не вивантажуємо вдруге
+        try:
+            known = await asyncio.gather(*(already_attached(album.issue_id, f) for f, _ in album.parts))
+            parts = [part for part, attached in zip(album.parts, known) if not attached]
+            skipped = [name for (_, name), attached in zip(album.parts, known) if attached]
+            total = sum(file_size_hint(file_obj) for file_obj, _ in parts)
+            async with upload_budget.reserve(total):
+                fetched = await asyncio.gather(
+                    *(fetch_telegram_file(album.bot, file_obj) for file_obj, _ in parts),
+                    return_exceptions=True,
+                )
+                loaded, failed = [], []
+                for (_, name), result in zip(parts, fetched):
+                    if isinstance(result, BaseException):
+                        logger.error(f"[MEDIA] Не вдалося завантажити '{name}' з Telegram: {result!r}")
+                        failed.append(name)
+                    else:
+                        loaded.append((name, *result))
+
+                files, digests, seen = [], [], set()
+                try:
+                    async with attachment_cache.attaching(album.issue_id, [d for _, _, d in loaded]):
+                        for name, stream, digest in loaded:
+                            if digest is not None and (
+                                digest in seen or await attachment_cache.is_attached(album.issue_id, digest)
+                            ):
+                                skipped.append(name)
+                                continue
+                            seen.add(digest)
+                            files.append((name, stream))
+                            digests.append(digest)
+                        resp = await attach_files_to_jira(album.issue_id, files) if files else None
+                        if resp is not None and resp.status_code in (200, 201):
+                            for (name, _), digest in zip(files, digests):
+                                await attachment_cache.mark_attached(album.issue_id, digest, name)
+                finally:
+                    for _, stream, _ in loaded:
+                        stream.close()
+
+            if resp is not None and resp.status_code in (200, 201):
+                text = f"✅ Прикріплено файлів: {len(files)}"
+                if failed:
+                    text += f"\n⚠️ Не вдалося завантажити: {', '.join(failed)}"
+            elif resp is not None:
+                text = f"⛔ Помилка при надсиланні файлів: {resp.status_code}"
+            elif skipped and not failed:
+                text = "ℹ️ Ці файли вже прикріплені до задачі."
+            else:
+                text = "⛔ Не вдалося завантажити файли з Telegram."
+            if skipped and files:
+                text += f"\nℹ️ Уже були в задачі: {', '.join(skipped)}"
+            await album.message.reply_text(text)
+        except Exception as e:
+            if isinstance(e, JiraUnavailableError):
+                text = e.user_message
+            else:
+                logger.exception(f"[MEDIA] Помилка обробки альбому ({len(names)} файлів): {e}")
+                text = "⛔ Помилка при надсиланні файлів."
+            try:
+                await album.message.reply_text(text)
+            except Exception:
+                pass
+
+
+media_groups = MediaGroupCollector(window=MEDIA_GROUP_WINDOW)
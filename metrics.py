@@ -0,0 +1,310 @@
+# metrics.py
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from bisect import bisect_left
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Вимірює, наскільки event loop був заблокований.
+    Фонова задача засинає на `interval` секунд і фіксує, наскільки пізніше
+    вона прокинулась: це запізнення і є часом, коли цикл не обробляв інші задачі.
+    Раз на `report_interval` секунд пише у лог зведення за вікно.
+    """
+
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.1, report_interval: float = 60.0):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.report_interval = report_interval
+        self._task: asyncio.Task | None = None
+        # лічильники за весь час роботи
+        self.total_blocked = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self._window_started = time.monotonic()
+        self._window_blocked = 0.0
+        self._window_max = 0.0
+        self._window_stalls = 0
+        self._window_samples = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def record(self, lag: float) -> None:
+        lag = max(0.0, lag)
+        self._window_samples += 1
+        self._window_max = max(self._window_max, lag)
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.stall_threshold:
+            self._window_stalls += 1
+            self._window_blocked += lag
+            self.stalls += 1
+            self.total_blocked += lag
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - started - self.interval)
+            if time.monotonic() - self._window_started >= self.report_interval:
+                self.report()
+
+    def report(self) -> None:
+        elapsed = time.monotonic() - self._window_started
+        logger.info(
+            "[LOOP] За %.0f с: заблоковано %.3f с (%.1f%%), зависань ≥%.0f мс: %d, макс. затримка %.0f мс",
+            elapsed,
+            self._window_blocked,
+            100.0 * self._window_blocked / elapsed if elapsed else 0.0,
+            self.stall_threshold * 1000,
+            self._window_stalls,
+            self._window_max * 1000,
+        )
+        self._reset_window()
+
+    def stats(self) -> dict:
+        return {
+            "total_blocked_seconds": round(self.total_blocked, 3),
+            "max_lag_seconds": round(self.max_lag, 3),
+            "stalls": self.stalls,
+        }
+
+
+loop_lag_monitor = LoopLagMonitor()
+
+
+# -----------------------
+# МЕТРИКИ (формат Prometheus)
+# -----------------------
+
+# межі бакетів гістограм затримок, секунди
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Лічильник, що лише зростає; окреме значення на кожен набір міток."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in self._values.items()
+        ]
+
+
+class Histogram:
+    """
+    Гістограма з фіксованими бакетами. observe() — бінарний пошук і два
+    інкременти, тож її можна лишати увімкненою на кожному запиті.
+    Викликається з потоку event loop.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # мітки -> [лічильники по бакетах..., +Inf], сума
+        self._series: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> list[str]:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += counts[-1]
+            inf = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Timing:
+    """Гістограма затримок + лічильник помилок з тими самими мітками."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.seconds = Histogram(f"{name}_seconds", help, labelnames, buckets)
+        self.errors = Counter(f"{name}_errors_total", f"{help}: кількість помилок", labelnames)
+
+    def observe(self, seconds: float, *labels, error: bool = False) -> None:
+        self.seconds.observe(seconds, *labels)
+        if error:
+            self.errors.inc(*labels)
+
+
+class Registry:
+    """
+    Реєстр метрик процесу. Окрім лічильників і гістограм приймає
+    gauge-колбеки (викликаються лише під час scrape) та джерела stats(),
+    чиї числові поля віддаються як gauge з міткою component.
+    """
+
+    def __init__(self):
+        self._metrics: list = []
+        self._gauges: dict[str, tuple[str, Callable[[], float | dict]]] = {}
+        self._stats: dict[str, Callable[[], dict]] = {}
+        # номер процесу-обробника (BOT_WORKERS > 1), 0 — основний процес
+        self.worker = 0
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def timing(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Timing:
+        metric = Timing(name, help, labelnames, buckets)
+        self._metrics.extend((metric.seconds, metric.errors))
+        return metric
+
+    def gauge(self, name: str, help: str, fn: Callable[[], float]) -> None:
+        """Поточне значення, що обчислюється під час scrape (глибина черги, in-flight тощо)."""
+        self._gauges[name] = (help, fn)
+
+    def stats_source(self, component: str, fn: Callable[[], dict]) -> None:
+        self._stats[component] = fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        for name, (help, fn) in self._gauges.items():
+            try:
+                value = fn()
+            except Exception as e:
+                logger.debug("[METRICS] gauge %s: %s", name, e)
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+        if self._stats:
+            lines.append("# HELP bot_component_stat Внутрішні лічильники компонентів (stats())")
+            lines.append("# TYPE bot_component_stat gauge")
+            for component, fn in self._stats.items():
+                try:
+                    stats = fn()
+                except Exception as e:
+                    logger.debug("[METRICS] stats %s: %s", component, e)
+                    continue
+                for key, value in stats.items():
+                    if isinstance(value, (int, float)):
+                        labels = _format_labels(("component", "name"), (component, key))
+                        lines.append(f"bot_component_stat{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HANDLER_TIMING = registry.timing(
+    "bot_handler", "Час обробки оновлення обробником", ("handler", "branch")
+)
+JIRA_TIMING = registry.timing(
+    "jira_request", "Час HTTP-запиту до Jira (одна спроба)", ("method", "endpoint")
+)
+TELEGRAM_TIMING = registry.timing(
+    "telegram_request", "Час виклику Bot API (без очікування лімітів)", ("endpoint",)
+)
+SHEETS_TIMING = registry.timing(
+    "sheets_call", "Час виклику Google Sheets у пулі потоків", ("op",)
+)
+
+# гілка universal_handler, обрана для поточного оновлення (див. set_branch)
+_branch: contextvars.ContextVar[str] = contextvars.ContextVar("handler_branch", default="")
+
+
+def set_branch(name: str) -> None:
+    """Позначає гілку обробника, під якою буде записано час поточного оновлення."""
+    _branch.set(name)
+
+
+def instrument_handler(name: str):
+    """Декоратор: час і помилки обробника PTB у bot_handler_seconds / bot_handler_errors_total."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            token = _branch.set("")
+            started = time.perf_counter()
+            error = False
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                HANDLER_TIMING.observe(time.perf_counter() - started, name, _branch.get(), error=error)
+                _branch.reset(token)
+
+        return wrapper
+
+    return decorator
+
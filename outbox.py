@@ -0,0 +1,413 @@
+# outbox.py
+import asyncio
+import hashlib
+import logging
+import random
+import secrets
+import sqlite3
+import time
+
+import httpx
+from telegram import Bot
+from telegram.error import TelegramError
+
+from config import (
+    OUTBOX_DB_PATH,
+    OUTBOX_WORKERS,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RETRY_BASE_DELAY,
+    OUTBOX_RETRY_MAX_DELAY,
+    OUTBOX_POLL_INTERVAL,
+    OUTBOX_LEASE_SECONDS,
+    OUTBOX_DEDUP_WINDOW,
+    OUTBOX_JIRA_LABELS,
+)
+from storage import SQLiteDatabase
+from services import create_jira_issue, find_issue_by_label, find_issue_by_marker, JiraUnavailableError
+from google_sheets_service import add_ticket, ticket_index
+
+logger = logging.getLogger(__name__)
+
+
+OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ticket_outbox (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key       TEXT NOT NULL,
+    label           TEXT NOT NULL UNIQUE,
+    user_id         INTEGER NOT NULL,
+    chat_id         INTEGER NOT NULL,
+    username        TEXT NOT NULL DEFAULT '',
+    summary         TEXT NOT NULL,
+    description     TEXT NOT NULL,
+    state           TEXT NOT NULL,
+    issue_key       TEXT,
+    ack_message_id  INTEGER,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until     REAL NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ticket_outbox_due ON ticket_outbox (state, next_attempt_at);
+CREATE INDEX IF NOT EXISTS ticket_outbox_dedup ON ticket_outbox (dedup_key, created_at);
+"""
+
+# Стани заявки в черзі:
+#   pending  — ще не створена в Jira (або попередня спроба не вдалася);
+#   created  — задача в Jira є, ключ збережено, лишилось записати в Sheets і повідомити;
+#   done     — усе виконано;
+#   failed   — спроби вичерпано або Jira відхилила заявку.
+STATE_PENDING = "pending"
+STATE_CREATED = "created"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+_ACTIVE_STATES = (STATE_PENDING, STATE_CREATED)
+
+LABEL_PREFIX = "tgbot-"
+# скільки нова заявка чекає, доки обробник надішле «прийнято» (щоб ключ задачі не прийшов раніше)
+ACK_GRACE = 5.0
+
+
+class PermanentOutboxError(Exception):
+    """Повтор не допоможе (напр. Jira відповіла 400 на payload)."""
+
+
+def dedup_key_for(user_id: int, summary: str, form: dict) -> str:
+    """Відбиток заявки: однакова форма від того ж користувача — та сама заявка."""
+    raw = "\x1f".join([str(user_id), summary] + [f"{k}={form.get(k, '')}" for k in sorted(form)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TicketOutbox:
+    """
+    Надійна локальна черга створення заявок.
+
+    Обробник лише записує заявку в SQLite і одразу відповідає користувачу;
+    пул фонових обробників створює задачу в Jira, заносить її в Google Sheets
+    і редагує повідомлення-підтвердження, підставляючи ключ задачі.
+
+    Ідемпотентність:
+      - повторне «Створити задачу» з тією ж формою протягом OUTBOX_DEDUP_WINDOW
+        повертає вже наявну заявку, а не додає нову;
+      - кожна заявка має унікальний ключ — мітку Jira (labels) і рядок в описі;
+        перед повторною спробою створення шукаємо задачу з цим ключем — якщо
+        попередня спроба дійшла до Jira, а відповідь загубилась, дубль не
+        створюється. Якщо Jira відхиляє labels (поля немає на екрані створення),
+        мітки вимикаються і пошук іде за описом;
+      - ключ задачі зберігається в БД одразу після створення, тож наступні кроки
+        (Sheets, повідомлення) повторюються без повторного створення.
+    Рядок закріплюється за обробником на OUTBOX_LEASE_SECONDS, тому кілька
+    процесів (BOT_WORKERS > 1) можуть працювати з одним файлом БД.
+    """
+
+    def __init__(self, db: SQLiteDatabase, workers: int = 4, max_attempts: int = 12,
+                 retry_base_delay: float = 2.0, retry_max_delay: float = 300.0,
+                 poll_interval: float = 5.0, lease_seconds: float = 120.0,
+                 dedup_window: float = 600.0, use_labels: bool = True):
+        self.db = db
+        self.db.add_schema(OUTBOX_SCHEMA)
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.dedup_window = dedup_window
+        self.use_labels = use_labels
+        self._bot: Bot | None = None
+        self._queue: asyncio.Queue[int] | None = None
+        self._queued: set[int] = set()
+        self._tasks: list[asyncio.Task] = []
+        self.created = 0
+        self.recovered = 0
+        self.duplicates = 0
+        self.retries = 0
+        self.failures = 0
+
+    # --- життєвий цикл ---
+
+    def start(self, bot: Bot) -> None:
+        if self._tasks:
+            return
+        self._bot = bot
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"outbox-worker-{i}")
+            for i in range(self.workers)
+        ]
+        # підбирає заявки, що лишились після перезапуску, та відкладені повтори
+        self._tasks.append(asyncio.create_task(self._poll(), name="outbox-poll"))
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queued.clear()
+        self.db.close()
+
+    # --- постановка в чергу ---
+
+    async def submit(self, *, user_id: int, chat_id: int, username: str,
+                     summary: str, description: str, dedup_key: str) -> tuple[int, bool]:
+        """
+        Записує заявку в чергу. Повертає (id, is_new); is_new=False — це дубль
+        нещодавньої заявки з тією ж формою, і повертається id наявної.
+        Заявка стає до роботи після set_ack_message() (або, якщо підтвердження
+        не вдалося надіслати, через ACK_GRACE секунд — її підбере опитування).
+        """
+        now = time.time()
+
+        def insert(conn: sqlite3.Connection) -> tuple[int, bool]:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT id FROM ticket_outbox WHERE dedup_key = ? AND created_at >= ? AND state != ? "
+                    "ORDER BY id DESC LIMIT 1",
+                    (dedup_key, now - self.dedup_window, STATE_FAILED),
+                ).fetchone()
+                if row:
+                    return row[0], False
+                cur = conn.execute(
+                    "INSERT INTO ticket_outbox (dedup_key, label, user_id, chat_id, username, summary, "
+                    "description, state, next_attempt_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (dedup_key, LABEL_PREFIX + secrets.token_hex(8), user_id, chat_id, username or "",
+                     summary, description, STATE_PENDING, now + ACK_GRACE, now, now),
+                )
+                return cur.lastrowid, True
+
+        job_id, is_new = await self.db.run(insert)
+        if not is_new:
+            self.duplicates += 1
+        return job_id, is_new
+
+    async def set_ack_message(self, job_id: int, message_id: int) -> None:
+        """Запам'ятовує повідомлення «прийнято» і ставить заявку в роботу."""
+        await self.db.run(lambda conn: conn.execute(
+            "UPDATE ticket_outbox SET ack_message_id = ?, next_attempt_at = MIN(next_attempt_at, ?) "
+            "WHERE id = ? AND ack_message_id IS NULL",
+            (message_id, time.time(), job_id),
+        ))
+        self.wake(job_id)
+
+    def wake(self, job_id: int) -> None:
+        if self._queue is not None and job_id not in self._queued:
+            self._queued.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    def status(self, job_id: int) -> tuple[str, str | None] | None:
+        """(стан, ключ задачі) заявки або None, якщо такої немає."""
+        rows = self.db.read("SELECT state, issue_key FROM ticket_outbox WHERE id = ?", (job_id,))
+        return (rows[0][0], rows[0][1]) if rows else None
+
+    # --- обробка ---
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                now = time.time()
+                rows = await self.db.run(lambda conn: conn.execute(
+                    "SELECT id FROM ticket_outbox WHERE state IN (?, ?) AND next_attempt_at <= ? "
+                    "AND lease_until <= ? ORDER BY id LIMIT 100",
+                    (*_ACTIVE_STATES, now, now),
+                ).fetchall())
+                for (job_id,) in rows:
+                    self.wake(job_id)
+            except sqlite3.Error as e:
+                logger.error(f"[OUTBOX] Помилка читання черги: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            try:
+                await self._process(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"[OUTBOX] Неочікувана помилка заявки #{job_id}: {e}")
+
+    async def _claim(self, job_id: int) -> dict | None:
+        """Закріплює заявку за цим обробником, якщо вона активна і вільна."""
+        now = time.time()
+
+        def claim(conn: sqlite3.Connection) -> dict | None:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                cur = conn.execute(
+                    "UPDATE ticket_outbox SET lease_until = ? WHERE id = ? AND state IN (?, ?) "
+                    "AND next_attempt_at <= ? AND lease_until <= ?",
+                    (now + self.lease_seconds, job_id, *_ACTIVE_STATES, now, now),
+                )
+                if cur.rowcount == 0:
+                    return None
+                conn.row_factory = sqlite3.Row
+                try:
+                    row = conn.execute("SELECT * FROM ticket_outbox WHERE id = ?", (job_id,)).fetchone()
+                finally:
+                    conn.row_factory = None
+                return dict(row)
+
+        return await self.db.run(claim)
+
+    async def _update(self, job_id: int, **fields) -> None:
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        await self.db.run(lambda conn: conn.execute(
+            f"UPDATE ticket_outbox SET {columns} WHERE id = ?", (*fields.values(), job_id)
+        ))
+
+    async def _process(self, job_id: int) -> None:
+        job = await self._claim(job_id)
+        if job is None:
+            return
+        try:
+            if job["state"] == STATE_PENDING:
+                job["issue_key"] = await self._create_issue(job)
+                job["state"] = STATE_CREATED
+                # ключ фіксуємо одразу: далі можна повторювати що завгодно без дублів у Jira
+                await self._update(job_id, state=STATE_CREATED, issue_key=job["issue_key"], last_error=None)
+
+            # рядок у Google Sheets: поки запис не підтверджено, заявка лишається created і повторюється
+            if ticket_index.row_for(job["issue_key"]) is None:
+                try:
+                    await add_ticket(job["issue_key"], job["user_id"], job["chat_id"], job["username"])
+                except Exception as e:
+                    await self._retry_later(job, e)
+                    return
+
+            try:
+                await self._notify(job, f"✅ Задача створена: {job['issue_key']}")
+            except TelegramError as e:
+                # задача вже є — через недоставлене повідомлення її не перестворюємо
+                logger.warning(f"[OUTBOX] Не вдалося повідомити про заявку #{job_id}: {e}")
+            await self._update(job_id, state=STATE_DONE, lease_until=0)
+            logger.info(f"[OUTBOX] Заявка #{job_id} → {job['issue_key']} (спроба {job['attempts'] + 1})")
+        except PermanentOutboxError as e:
+            await self._fail(job, str(e))
+        except (JiraUnavailableError, httpx.HTTPError, sqlite3.Error, RuntimeError) as e:
+            await self._retry_later(job, e)
+
+    async def _create_issue(self, job: dict) -> str:
+        if job["attempts"] > 0:
+            # попередня спроба могла створити задачу, але відповідь не дійшла
+            if self.use_labels:
+                existing = await find_issue_by_label(job["label"])
+            else:
+                existing = await find_issue_by_marker(job["label"])
+            if existing:
+                self.recovered += 1
+                logger.info(f"[OUTBOX] Заявка #{job['id']}: знайдено створену раніше {existing}")
+                return existing
+        # лічильник спроб збільшуємо ДО запиту — після збою наступна спроба спершу шукатиме мітку
+        job["attempts"] += 1
+        await self._update(job["id"], attempts=job["attempts"])
+        try:
+            issue_key = await self._post_issue(job)
+        except httpx.HTTPStatusError as e:
+            code = e.response.status_code
+            if 400 <= code < 500 and code not in (408, 409, 429):
+                raise PermanentOutboxError(f"Jira {code}: {e.response.text[:300]}") from e
+            raise
+        self.created += 1
+        return issue_key
+
+    async def _post_issue(self, job: dict) -> str:
+        payload = {
+            "summary": job["summary"],
+            # ключ в описі — для пошуку без міток і для підтримки (видно, з якої заявки задача)
+            "description": f"{job['description']}\n\n[{job['label']}]",
+        }
+        if self.use_labels:
+            try:
+                return await create_jira_issue({**payload, "labels": [job["label"]]})
+            except httpx.HTTPStatusError as e:
+                if not _labels_rejected(e.response):
+                    raise
+                self.use_labels = False
+                logger.warning("[OUTBOX] Jira не приймає поле labels — ключ заявки лише в описі задачі")
+        return await create_jira_issue(payload)
+
+    async def _retry_later(self, job: dict, error: Exception) -> None:
+        attempts = max(job["attempts"], 1)
+        if job["state"] == STATE_PENDING and attempts >= self.max_attempts:
+            await self._fail(job, str(error))
+            return
+        if job["state"] == STATE_CREATED:
+            # задача в Jira вже є, тож запис у Sheets повторюється без ліміту, але з наростаючою паузою
+            job["attempts"] = attempts = attempts + 1
+            await self._update(job["id"], attempts=attempts)
+        self.retries += 1
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+        delay = random.uniform(delay / 2, delay)
+        logger.warning(f"[OUTBOX] Заявка #{job['id']}: {error!r}, повтор через {delay:.0f} с")
+        await self._update(
+            job["id"],
+            next_attempt_at=time.time() + delay,
+            lease_until=0,
+            last_error=str(error)[:500],
+        )
+
+    async def _fail(self, job: dict, error: str) -> None:
+        self.failures += 1
+        logger.error(f"[OUTBOX] Заявку #{job['id']} не створено: {error}")
+        await self._update(job["id"], state=STATE_FAILED, lease_until=0, last_error=error[:500])
+        try:
+            await self._notify(job, "⛔ Не вдалося створити задачу. Спробуйте знову.")
+        except (TelegramError, httpx.HTTPError) as e:
+            logger.warning(f"[OUTBOX] Не вдалося повідомити про помилку заявки #{job['id']}: {e}")
+
+    async def _notify(self, job: dict, text: str) -> None:
+        """Редагує повідомлення «прийнято»; якщо не вийшло — надсилає нове."""
+        if job.get("ack_message_id"):
+            try:
+                await self._bot.edit_message_text(
+                    text, chat_id=job["chat_id"], message_id=job["ack_message_id"]
+                )
+                return
+            except TelegramError as e:
+                if "message is not modified" in str(e).lower():
+                    return
+                logger.info(f"[OUTBOX] Редагування підтвердження #{job['id']} не вдалося ({e}), надсилаю нове")
+        await self._bot.send_message(job["chat_id"], text)
+
+    def stats(self) -> dict:
+        counts = dict(self.db.read("SELECT state, COUNT(*) FROM ticket_outbox GROUP BY state"))
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "pending": counts.get(STATE_PENDING, 0),
+            "created_not_done": counts.get(STATE_CREATED, 0),
+            "failed": counts.get(STATE_FAILED, 0),
+            "created": self.created,
+            "recovered": self.recovered,
+            "duplicates": self.duplicates,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+def _labels_rejected(response: httpx.Response) -> bool:
+    """400 з помилкою саме поля labels (немає на екрані створення або заборонене)."""
+    if response.status_code != 400:
+        return False
+    try:
+        errors = response.json().get("errors") or {}
+    except ValueError:
+        return False
+    return "labels" in errors
+
+
+ticket_outbox = TicketOutbox(
+    SQLiteDatabase(OUTBOX_DB_PATH),
+    workers=OUTBOX_WORKERS,
+    max_attempts=OUTBOX_MAX_ATTEMPTS,
+    retry_base_delay=OUTBOX_RETRY_BASE_DELAY,
+    retry_max_delay=OUTBOX_RETRY_MAX_DELAY,
+    poll_interval=OUTBOX_POLL_INTERVAL,
+    lease_seconds=OUTBOX_LEASE_SECONDS,
+    dedup_window=OUTBOX_DEDUP_WINDOW,
+    use_labels=OUTBOX_JIRA_LABELS,
+)
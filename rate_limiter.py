@@ -0,0 +1,209 @@
+# rate_limiter.py
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, Coroutine
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from metrics import TELEGRAM_TIMING
+
+logger = logging.getLogger(__name__)
+
+# Лише редагування: повторне однакове edit* нічого не змінює. Однакові sendMessage
+# бувають легітимними (два файли з однаковою назвою, кілька коментарів поспіль)
+COALESCE_ENDPOINTS = {"editMessageText", "editMessageReplyMarkup"}
+
+
+class TokenBucket:
+    """Відро токенів: `rate` токенів за секунду, не більше `capacity` накопичених."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Бере токен, за потреби чекаючи. Повертає час очікування (с)."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                delay = max(self.blocked_until - now, 0.0)
+                if not delay and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = delay or (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def block(self, seconds: float) -> None:
+        """Пауза після 429 від Telegram."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    @property
+    def idle(self) -> bool:
+        now = time.monotonic()
+        return not self._lock.locked() and now >= self.blocked_until and \
+            self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+def _json_default(obj: Any) -> Any:
+    to_dict = getattr(obj, "to_dict", None)
+    return to_dict() if callable(to_dict) else str(obj)
+
+
+class FloodControlLimiter(BaseRateLimiter):
+    """
+    Планувальник вихідних запитів до Bot API:
+    - загальне відро токенів на бота і окреме на кожен чат
+      (особисті чати — TG_CHAT_RATE/с, групи — TG_GROUP_RATE_PER_MIN/хв);
+    - при 429 чекає retry_after і повторює запит (до max_retries разів);
+    - однакові editMessageText/editMessageReplyMarkup в той самий чат протягом
+      coalesce_window не надсилаються повторно — викликач отримує результат першого.
+    Лічильники доступні через stats().
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: int = 3,
+        group_rate_per_min: float = 20.0,
+        max_retries: int = 3,
+        coalesce_window: float = 1.0,
+    ):
+        self.global_bucket = TokenBucket(global_rate, max(1.0, global_rate))
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate_per_min / 60.0
+        self.max_retries = max_retries
+        self.coalesce_window = coalesce_window
+        self._chat_buckets: dict[int | str, TokenBucket] = {}
+        self._recent: dict[tuple, tuple[float, asyncio.Future]] = {}
+        self.counters = {
+            "sent": 0,
+            "throttled": 0,
+            "delayed_seconds": 0.0,
+            "retry_after": 0,
+            "coalesced": 0,
+            "failed": 0,
+        }
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(self.group_rate, 1.0) if is_group else TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > 10000:
+                self._chat_buckets = {k: b for k, b in self._chat_buckets.items() if not b.idle}
+        return bucket
+
+    def _coalesce_key(self, endpoint: str, data: dict) -> tuple | None:
+        if endpoint not in COALESCE_ENDPOINTS or "chat_id" not in data:
+            return None
+        try:
+            return endpoint, data["chat_id"], json.dumps(data, sort_keys=True, default=_json_default)
+        except (TypeError, ValueError):
+            return None
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: int | None,
+    ):
+        key = self._coalesce_key(endpoint, data)
+        if key is None:
+            return await self._send(callback, args, kwargs, endpoint, data, rate_limit_args)
+
+        now = time.monotonic()
+        recent = self._recent.get(key)
+        if recent is not None and (not recent[1].done() or now - recent[0] < self.coalesce_window):
+            self.counters["coalesced"] += 1
+            logger.debug("[FLOOD] Однаковий %s у чат %s — не надсилаю повторно", endpoint, data.get("chat_id"))
+            return await asyncio.shield(recent[1])
+
+        future = asyncio.get_running_loop().create_future()
+        self._recent[key] = (now, future)
+        try:
+            result = await self._send(callback, args, kwargs, endpoint, data, rate_limit_args)
+        except BaseException as e:
+            self._recent.pop(key, None)
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # позначаємо виняток як отриманий
+            raise
+        future.set_result(result)
+        # вікно рахуємо від моменту фактичного надсилання
+        self._recent[key] = (time.monotonic(), future)
+        self._prune_recent()
+        return result
+
+    def _prune_recent(self) -> None:
+        if len(self._recent) < 1000:
+            return
+        cutoff = time.monotonic() - self.coalesce_window
+        self._recent = {k: v for k, v in self._recent.items() if not v[1].done() or v[0] >= cutoff}
+
+    async def _send(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        max_retries = rate_limit_args if isinstance(rate_limit_args, int) else self.max_retries
+        attempt = 0
+        while True:
+            waited = 0.0
+            if chat_id is not None:
+                waited += await self._chat_bucket(chat_id).acquire()
+            # запити без chat_id (answerCallbackQuery, getFile, ...) теж входять у загальний ліміт
+            waited += await self.global_bucket.acquire()
+            if waited:
+                self.counters["throttled"] += 1
+                self.counters["delayed_seconds"] += waited
+            started = time.perf_counter()
+            try:
+                result = await callback(*args, **kwargs)
+                self.counters["sent"] += 1
+                TELEGRAM_TIMING.observe(time.perf_counter() - started, endpoint)
+                return result
+            except Exception as e:
+                TELEGRAM_TIMING.observe(time.perf_counter() - started, endpoint, error=True)
+                if not isinstance(e, RetryAfter):
+                    raise
+                self.counters["retry_after"] += 1
+                retry = e.retry_after
+                retry = retry.total_seconds() if hasattr(retry, "total_seconds") else float(retry)
+                bucket = self._chat_bucket(chat_id) if chat_id is not None else self.global_bucket
+                bucket.block(retry)
+                attempt += 1
+                if attempt > max_retries:
+                    self.counters["failed"] += 1
+                    raise
+                logger.warning("[FLOOD] 429 від Telegram (чат %s), повтор через %.1f с", chat_id, retry)
+                if chat_id is None:
+                    await asyncio.sleep(retry)
+
+    def stats(self) -> dict:
+        return dict(self.counters, chats=len(self._chat_buckets))
@@ -1,9 +1,18 @@
 # services.py
 import logging
+import asyncio
 import base64
 import io
+import random
+import re
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import BinaryIO
 
 import httpx
+from cache import TTLCache
+from metrics import JIRA_TIMING
 from config import (
     JIRA_DOMAIN,
     JIRA_EMAIL,
@@ -11,22 +20,367 @@ from config import (
     JIRA_PROJECT_KEY,
     JIRA_ISSUE_TYPE,
     JIRA_REPORTER_ACCOUNT_ID,
+    JIRA_HTTP2,
+    JIRA_MAX_CONNECTIONS,
+    JIRA_MAX_KEEPALIVE_CONNECTIONS,
+    JIRA_KEEPALIVE_EXPIRY,
+    JIRA_CONNECT_TIMEOUT,
+    JIRA_TIMEOUT,
+    JIRA_WRITE_TIMEOUT,
+    JIRA_UPLOAD_TIMEOUT,
+    JIRA_SEARCH_CHUNK_SIZE,
+    ISSUE_CACHE_TTL,
+    ISSUE_CACHE_STALE_TTL,
+    ISSUE_CACHE_MAXSIZE,
+    JIRA_CB_WINDOW,
+    JIRA_CB_MIN_CALLS,
+    JIRA_CB_ERROR_RATE,
+    JIRA_CB_SLOW_CALL,
+    JIRA_CB_SLOW_RATE,
+    JIRA_CB_OPEN_SECONDS,
+    JIRA_CB_HALF_OPEN_PROBES,
+    JIRA_READ_RETRIES,
+    JIRA_RETRY_BASE_DELAY,
+    JIRA_RETRY_AFTER_MAX,
 )
 
 logger = logging.getLogger(__name__)
 
 
-def _jira_auth_header() -> dict:
+# -----------------------
+# CIRCUIT BREAKER
+# -----------------------
+
+class JiraUnavailableError(RuntimeError):
+    """Jira недоступна: circuit breaker відкритий, запит не виконувався."""
+
+    user_message = "⚠️ Jira тимчасово недоступна. Спробуйте, будь ласка, пізніше."
+
+
+class CircuitBreaker:
     """
-    Повертає заголовки для Basic Auth у Jira API.
+    Circuit breaker з ковзним вікном помилок і повільних викликів.
+    closed    — запити йдуть як звичайно;
+    open      — частка помилок або повільних викликів у вікні перевищила поріг,
+                запити одразу відхиляються протягом open_seconds;
+    half_open — пропускається не більше half_open_probes пробних запитів;
+                успіх закриває breaker, помилка — знову відкриває.
     """
-    token = base64.b64encode(f"{JIRA_EMAIL}:{JIRA_API_TOKEN}".encode()).decode()
-    return {
-        "Authorization": f"Basic {token}",
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-    }
 
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        window: float = 60.0,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call: float = 5.0,
+        slow_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self._calls: deque[tuple[float, bool, bool]] = deque()  # (час, помилка, повільний)
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+
+    def _trim(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            if now - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self._probes = 0
+            logger.info("[JIRA] Circuit breaker: half-open, пробний запит")
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                self.rejected += 1
+                return False
+            self._probes += 1
+        return True
+
+    def abandon(self) -> None:
+        """Запит скасовано до отримання результату — звільняє слот пробного запиту."""
+        if self.state == self.HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    def record(self, failed: bool, duration: float, count_slow: bool = True) -> None:
+        """count_slow=False — виклик, довгий за природою (вкладення), не рахується повільним."""
+        now = time.monotonic()
+        slow = count_slow and duration >= self.slow_call
+        if self.state == self.HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            if failed or slow:
+                self._open(now, "пробний запит невдалий")
+            else:
+                self.state = self.CLOSED
+                self._calls.clear()
+                logger.info("[JIRA] Circuit breaker: closed, Jira відповідає")
+            return
+
+        self._calls.append((now, failed, slow))
+        self._trim(now)
+        total = len(self._calls)
+        if self.state != self.CLOSED or total < self.min_calls:
+            return
+        errors = sum(1 for _, f, _ in self._calls if f)
+        slows = sum(1 for _, _, sl in self._calls if sl)
+        if errors / total >= self.error_rate:
+            self._open(now, f"помилок {errors}/{total}")
+        elif slows / total >= self.slow_rate:
+            self._open(now, f"повільних викликів {slows}/{total}")
+
+    def _open(self, now: float, reason: str) -> None:
+        self.state = self.OPEN
+        self._opened_at = now
+        self._calls.clear()
+        logger.warning(f"[JIRA] Circuit breaker: open на {self.open_seconds:.0f} с ({reason})")
+
+
+# -----------------------
+# HTTP-КЛІЄНТ JIRA
+# -----------------------
+
+class JiraClient:
+    """
+    Довгоживучий клієнт Jira API зі спільним пулом keep-alive з'єднань.
+    Заголовки авторизації обчислюються один раз при створенні.
+    Застосунок викликає start() при старті та close() при зупинці.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        email: str,
+        api_token: str,
+        *,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool = False,
+        connect_timeout: float = 5.0,
+        timeout: float = 10.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+        breaker: CircuitBreaker | None = None,
+        read_retries: int = 2,
+        retry_base_delay: float = 0.3,
+        retry_after_max: float = 30.0,
+    ):
+        token = base64.b64encode(f"{email}:{api_token}".encode()).decode()
+        self._base_url = base_url or ""
+        self._headers = {
+            "Authorization": f"Basic {token}",
+            "Accept": "application/json",
+        }
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._connect_timeout = connect_timeout
+        self._timeout = timeout
+        self._http2 = http2 and _http2_available()
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self.breaker = breaker or CircuitBreaker()
+        self.read_retries = read_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_after_max = retry_after_max
+        # accountId облікового запису бота в Jira (з /myself)
+        self.account_id: str | None = None
+
+    def timeout(self, read: float | None = None) -> httpx.Timeout:
+        """Таймаут запиту: спільний connect, read/write — за типом операції."""
+        return httpx.Timeout(read or self._timeout, connect=self._connect_timeout)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Лінива ініціалізація — щоб функції працювали і без start() (скрипти, консоль)
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                headers=self._headers,
+                limits=self._limits,
+                timeout=self.timeout(),
+                http2=self._http2,
+                transport=self._transport,
+            )
+        return self._client
+
+    async def start(self) -> None:
+        self.client  # створює AsyncClient і пул з'єднань
+        logger.info(
+            "[JIRA] HTTP-клієнт запущено (http2=%s, max_connections=%s, keepalive=%s)",
+            self._http2,
+            self._limits.max_connections,
+            self._limits.max_keepalive_connections,
+        )
+
+    async def warm_up(self, connections: int = 1) -> None:
+        """
+        Відкриває `connections` з'єднань паралельними легкими запитами (TLS + автентифікація),
+        щоб перші запити користувачів не платили за встановлення з'єднання.
+        """
+        responses = await asyncio.gather(
+            *(self.request("GET", "/rest/api/3/myself") for _ in range(max(1, connections)))
+        )
+        for r in responses:
+            r.raise_for_status()
+        self.account_id = responses[0].json().get("accountId")
+
+    async def own_account_id(self) -> str | None:
+        """accountId бота в Jira; запитується один раз і запам'ятовується."""
+        if self.account_id is None:
+            r = await self.request("GET", "/rest/api/3/myself")
+            r.raise_for_status()
+            self.account_id = r.json().get("accountId")
+        return self.account_id
+
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("[JIRA] HTTP-клієнт закрито")
+        self._client = None
+
+    async def request(self, method: str, path: str, *, idempotent: bool | None = None,
+                      upload: bool = False, **kwargs) -> httpx.Response:
+        """
+        Виконує запит через circuit breaker. Ідемпотентні запити (GET або idempotent=True)
+        повторюються при мережевих помилках, 429 і 5xx з експоненційною затримкою та jitter.
+        upload=True — вивантаження файлів: їхня тривалість не входить у частку повільних викликів.
+        Кидає JiraUnavailableError, якщо breaker відкритий.
+        """
+        count_slow = not upload
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD")
+        attempts = 1 + (self.read_retries if idempotent else 0)
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                raise JiraUnavailableError(f"Jira circuit breaker is open ({method} {path})")
+            started = time.monotonic()
+            try:
+                r = await self.client.request(method, path, **kwargs)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except httpx.TransportError:
+                elapsed = time.monotonic() - started
+                self.breaker.record(True, elapsed, count_slow)
+                JIRA_TIMING.observe(elapsed, method, _endpoint(path), error=True)
+                if attempt + 1 >= attempts:
+                    raise
+            except Exception:
+                # DecodingError, TooManyRedirects тощо: не повторюємо, але фіксуємо в breaker,
+                # інакше пробний запит half-open ніколи не звільнить слот
+                elapsed = time.monotonic() - started
+                self.breaker.record(True, elapsed, count_slow)
+                JIRA_TIMING.observe(elapsed, method, _endpoint(path), error=True)
+                raise
+            else:
+                elapsed = time.monotonic() - started
+                failed = r.status_code >= 500 or r.status_code == 429
+                self.breaker.record(failed, elapsed, count_slow)
+                JIRA_TIMING.observe(elapsed, method, _endpoint(path), error=r.status_code >= 400)
+                if not failed or attempt + 1 >= attempts:
+                    return r
+                if r.status_code == 429:
+                    retry_after = _retry_after(r)
+                    if retry_after is not None:
+                        if retry_after > self.retry_after_max:
+                            return r
+                        await asyncio.sleep(retry_after)
+                        continue
+            # full jitter: випадкова затримка в межах експоненційно зростаючого вікна
+            await asyncio.sleep(random.uniform(0, self.retry_base_delay * 2 ** attempt))
+
+
+def _retry_after(r: httpx.Response) -> float | None:
+    """Затримка з заголовка Retry-After (секунди або HTTP-дата); None — заголовка немає."""
+    value = r.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_ISSUE_IN_PATH = re.compile(r"/issue/[^/]+")
+
+
+def _endpoint(path: str) -> str:
+    """Шлях без ключа задачі — щоб мітка метрики мала обмежену кількість значень."""
+    return _ISSUE_IN_PATH.sub("/issue/{key}", path.split("?", 1)[0])
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("[JIRA] JIRA_HTTP2 увімкнено, але пакет 'h2' не встановлено — використовую HTTP/1.1")
+        return False
+    return True
+
+
+jira_client = JiraClient(
+    JIRA_DOMAIN,
+    JIRA_EMAIL,
+    JIRA_API_TOKEN,
+    max_connections=JIRA_MAX_CONNECTIONS,
+    max_keepalive_connections=JIRA_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=JIRA_KEEPALIVE_EXPIRY,
+    http2=JIRA_HTTP2,
+    connect_timeout=JIRA_CONNECT_TIMEOUT,
+    timeout=JIRA_TIMEOUT,
+    breaker=CircuitBreaker(
+        window=JIRA_CB_WINDOW,
+        min_calls=JIRA_CB_MIN_CALLS,
+        error_rate=JIRA_CB_ERROR_RATE,
+        slow_call=JIRA_CB_SLOW_CALL,
+        slow_rate=JIRA_CB_SLOW_RATE,
+        open_seconds=JIRA_CB_OPEN_SECONDS,
+        half_open_probes=JIRA_CB_HALF_OPEN_PROBES,
+    ),
+    read_retries=JIRA_READ_RETRIES,
+    retry_base_delay=JIRA_RETRY_BASE_DELAY,
+    retry_after_max=JIRA_RETRY_AFTER_MAX,
+)
+
+# Знімки задач {"status", "summary"} за ключем задачі
+issue_cache = TTLCache(
+    maxsize=ISSUE_CACHE_MAXSIZE,
+    ttl=ISSUE_CACHE_TTL,
+    stale_ttl=ISSUE_CACHE_STALE_TTL,
+    name="issue_cache",
+)
+
+
+def issue_cache_stats() -> dict:
+    """Лічильники кешу задач (hits / stale_hits / misses / evictions)."""
+    return issue_cache.stats()
+
+
+# -----------------------
+# ОПЕРАЦІЇ З ЗАДАЧАМИ
+# -----------------------
 
 async def create_jira_issue(payload: dict) -> str:
     """
@@ -34,9 +388,9 @@ async def create_jira_issue(payload: dict) -> str:
     Вхідний payload має містити ключі:
       - summary: str
       - description: str
+    і, за потреби, labels: list[str].
     Повертає рядок-ключ створеної задачі (наприклад "TES1-123").
     """
-    url = f"{JIRA_DOMAIN}/rest/api/3/issue"
     jira_body = {
         "fields": {
             "project": {"key": JIRA_PROJECT_KEY},
@@ -53,45 +407,59 @@ async def create_jira_issue(payload: dict) -> str:
             "reporter": {"accountId": JIRA_REPORTER_ACCOUNT_ID},
         }
     }
+    if payload.get("labels"):
+        jira_body["fields"]["labels"] = list(payload["labels"])
 
-    async with httpx.AsyncClient() as client:
-        r = await client.post(
-            url,
-            headers=_jira_auth_header(),
-            json=jira_body,
-            timeout=15.0
-        )
-        r.raise_for_status()
-        data = r.json()
-        issue_key = data.get("key")
-        if not issue_key:
-            raise RuntimeError(f"Jira did not return issue key: {data!r}")
-        return issue_key
+    r = await jira_client.request(
+        "POST",
+        "/rest/api/3/issue",
+        json=jira_body,
+        timeout=jira_client.timeout(JIRA_WRITE_TIMEOUT),
+    )
+    r.raise_for_status()
+    data = r.json()
+    issue_key = data.get("key")
+    if not issue_key:
+        raise RuntimeError(f"Jira did not return issue key: {data!r}")
+    return issue_key
 
 
-async def attach_file_to_jira(issue_id: str, filename: str, content: bytes) -> httpx.Response:
+async def attach_file_to_jira(issue_id: str, filename: str, content: bytes | BinaryIO) -> httpx.Response:
     """
     Прикріплює файл до задачі в Jira.
+    content — байти або відкритий файловий об'єкт; файл вивантажується
+    multipart-запитом частинами, без повного читання в пам'ять.
     """
-    url = f"{JIRA_DOMAIN}/rest/api/3/issue/{issue_id}/attachments"
-    headers = _jira_auth_header().copy()
-    headers.pop("Content-Type", None)
-    headers["X-Atlassian-Token"] = "no-check"
+    return await attach_files_to_jira(issue_id, [(filename, content)])
 
-    file_obj = io.BytesIO(content)
-    files = {
-        "file": (filename, file_obj, "application/octet-stream")
-    }
 
-    async with httpx.AsyncClient() as client:
-        return await client.post(url, headers=headers, files=files)
+async def attach_files_to_jira(issue_id: str, files: list[tuple[str, bytes | BinaryIO]]) -> httpx.Response:
+    """
+    Прикріплює кілька файлів до задачі одним multipart-запитом.
+    files — список пар (ім'я файлу, байти або файловий об'єкт).
+    """
+    parts = []
+    for filename, content in files:
+        if isinstance(content, (bytes, bytearray)):
+            content = io.BytesIO(content)
+        parts.append(("file", (filename, content, "application/octet-stream")))
+
+    r = await jira_client.request(
+        "POST",
+        f"/rest/api/3/issue/{issue_id}/attachments",
+        headers={"X-Atlassian-Token": "no-check"},
+        files=parts,
+        timeout=jira_client.timeout(JIRA_UPLOAD_TIMEOUT),
+        upload=True,
+    )
+    issue_cache.invalidate(issue_id)
+    return r
 
 
 async def add_comment_to_jira(issue_id: str, comment: str) -> httpx.Response:
     """
     Додає текстовий коментар до задачі в Jira.
     """
-    url = f"{JIRA_DOMAIN}/rest/api/3/issue/{issue_id}/comment"
     body = {
         "body": {
             "type": "doc",
@@ -102,32 +470,171 @@ async def add_comment_to_jira(issue_id: str, comment: str) -> httpx.Response:
             }]
         }
     }
-    async with httpx.AsyncClient() as client:
-        return await client.post(
-            url,
-            headers=_jira_auth_header(),
-            json=body
-        )
+    r = await jira_client.request(
+        "POST",
+        f"/rest/api/3/issue/{issue_id}/comment",
+        json=body,
+        timeout=jira_client.timeout(JIRA_WRITE_TIMEOUT),
+    )
+    issue_cache.invalidate(issue_id)
+    return r
+
+
+async def get_issue_snapshot(issue_id: str) -> dict:
+    """
+    Повертає {"status": ..., "summary": ...} задачі.
+    Відповідь береться з кешу; застарілий запис віддається одразу і оновлюється у фоні.
+    Коли Jira недоступна, віддається будь-який збережений запис.
+    """
+    try:
+        return await issue_cache.get_or_load(issue_id, lambda: _fetch_issue(issue_id))
+    except JiraUnavailableError:
+        # Jira недоступна — віддаємо останні відомі дані, навіть якщо вони застаріли
+        cached = issue_cache.peek(issue_id)
+        if cached is None:
+            raise
+        return cached
+
+
+async def _fetch_issue(issue_id: str) -> dict:
+    r = await jira_client.request(
+        "GET",
+        f"/rest/api/3/issue/{issue_id}",
+        params={"fields": "status,summary"},
+    )
+    r.raise_for_status()
+    fields = r.json()["fields"]
+    return {
+        "status": fields["status"]["name"],
+        "summary": fields.get("summary", ""),
+    }
 
 
 async def get_issue_status(issue_id: str) -> str:
     """
     Повертає поточний статус задачі в Jira.
     """
-    url = f"{JIRA_DOMAIN}/rest/api/3/issue/{issue_id}"
-    async with httpx.AsyncClient() as client:
-        r = await client.get(url, headers=_jira_auth_header(), timeout=10.0)
-        r.raise_for_status()
-        data = r.json()
-        return data["fields"]["status"]["name"]
+    return (await get_issue_snapshot(issue_id))["status"]
 
 
 async def get_issue_summary(issue_id: str) -> str:
     """
     Повертає поле summary із Jira.
     """
-    url = f"{JIRA_DOMAIN}/rest/api/3/issue/{issue_id}?fields=summary"
-    async with httpx.AsyncClient() as client:
-        r = await client.get(url, headers=_jira_auth_header(), timeout=10.0)
-        r.raise_for_status()
-        return r.json()["fields"]["summary"]
+    return (await get_issue_snapshot(issue_id))["summary"]
+
+
+async def get_issues_bulk(issue_ids: list[str]) -> dict[str, dict]:
+    """
+    Повертає статус і summary для списку задач одним JQL-пошуком `key in (...)`.
+    Свіжі та застарілі записи беруться з кешу (застарілі оновлюються у фоні),
+    до Jira йдуть лише відсутні ключі. Якщо їх більше, ніж JIRA_SEARCH_CHUNK_SIZE,
+    список ділиться на частини, які запитуються паралельно.
+    Результат: {"TES1-1": {"status": "...", "summary": "..."}, ...}.
+    Задачі, яких Jira не повернула (видалені, немає доступу), у результат не потрапляють.
+    """
+    keys = list(dict.fromkeys(k for k in issue_ids if k))
+    issues: dict[str, dict] = {}
+    missing, stale = [], []
+    for key in keys:
+        found = issue_cache.lookup(key)
+        if found is None:
+            missing.append(key)
+            continue
+        issues[key], is_stale = found
+        if is_stale:
+            stale.append(key)
+
+    if stale:
+        issue_cache.refresh_many_in_background(stale, _search_issues_chunked)
+    if missing:
+        try:
+            issues.update(await issue_cache.load_many(missing, _search_issues_chunked))
+        except JiraUnavailableError:
+            # Jira недоступна — показуємо хоча б те, що є в кеші
+            for key in missing:
+                cached = issue_cache.peek(key)
+                if cached is not None:
+                    issues[key] = cached
+            if not issues:
+                raise
+    return issues
+
+
+async def _search_issues_chunked(keys: list[str]) -> dict[str, dict]:
+    chunks = [
+        keys[i:i + JIRA_SEARCH_CHUNK_SIZE]
+        for i in range(0, len(keys), JIRA_SEARCH_CHUNK_SIZE)
+    ]
+    results = await asyncio.gather(*(_search_issues(chunk) for chunk in chunks))
+
+    issues: dict[str, dict] = {}
+    for part in results:
+        issues.update(part)
+    return issues
+
+
+async def get_issue_attachment_names(issue_id: str) -> set[str]:
+    """Імена файлів, прикріплених до задачі."""
+    r = await jira_client.request(
+        "GET",
+        f"/rest/api/3/issue/{issue_id}",
+        params={"fields": "attachment"},
+    )
+    r.raise_for_status()
+    attachments = (r.json().get("fields") or {}).get("attachment") or []
+    return {a.get("filename", "") for a in attachments}
+
+
+async def find_issue_by_label(label: str) -> str | None:
+    """
+    Ключ задачі з міткою label або None.
+    Мітка — ідемпотентний ключ заявки: за нею перевіряємо, чи попередня
+    спроба створення, відповідь на яку загубилась, таки дійшла до Jira.
+    """
+    body = {
+        "jql": f'labels = "{label}" ORDER BY created ASC',
+        "fields": ["summary"],
+        "maxResults": 1,
+    }
+    r = await jira_client.request("POST", "/rest/api/3/search", json=body, idempotent=True)
+    r.raise_for_status()
+    issues = r.json().get("issues", [])
+    return issues[0]["key"] if issues else None
+
+
+async def find_issue_by_marker(marker: str) -> str | None:
+    """
+    Ключ задачі, в описі якої є marker, або None.
+    Запасний варіант find_issue_by_label для екранів створення без поля Labels.
+    """
+    body = {
+        "jql": f'description ~ "\\"{marker}\\"" ORDER BY created ASC',
+        "fields": ["summary"],
+        "maxResults": 1,
+    }
+    r = await jira_client.request("POST", "/rest/api/3/search", json=body, idempotent=True)
+    r.raise_for_status()
+    issues = r.json().get("issues", [])
+    return issues[0]["key"] if issues else None
+
+
+async def _search_issues(keys: list[str]) -> dict[str, dict]:
+    body = {
+        "jql": f"key in ({', '.join(keys)})",
+        "fields": ["status", "summary"],
+        "maxResults": len(keys),
+        # невідомі ключі дають попередження замість помилки 400 на весь запит
+        "validateQuery": "warn",
+    }
+    # пошук лише читає дані — його безпечно повторювати
+    r = await jira_client.request("POST", "/rest/api/3/search", json=body, idempotent=True)
+    r.raise_for_status()
+    issues = {}
+    for issue in r.json().get("issues", []):
+        fields = issue.get("fields") or {}
+        issues[issue["key"]] = {
+            "status": (fields.get("status") or {}).get("name", ""),
+            "summary": fields.get("summary", ""),
+        }
+    return issues
@@ -0,0 +1,78 @@
+# startup.py
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from services import jira_client
+from google_sheets_service import (
+    run_sheets_call,
+    user_directory,
+    with_users_sheet,
+    ensure_ticket_index,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def _timed(name: str, step: Callable[[], Awaitable], timings: dict[str, float]) -> None:
+    started = time.perf_counter()
+    try:
+        await step()
+    except Exception as e:
+        logger.warning("[STARTUP] Прогрів '%s' не вдався: %s", name, e)
+        timings[name] = -1.0
+        return
+    timings[name] = time.perf_counter() - started
+
+
+# кроки, що не встигли за timeout, — тримаємо посилання, поки вони доробляються
+_background: set[asyncio.Task] = set()
+
+
+def _open_users_sheet() -> None:
+    # авторизація сервісного акаунта + відкриття аркуша; тут же вперше імпортується gspread
+    with_users_sheet(lambda ws: ws)
+
+
+async def warm_up(jira_connections: int = 1, timeout: float = 20.0) -> dict[str, float]:
+    """
+    Паралельно прогріває зовнішні сервіси перед стартом polling:
+      - jira: пул з'єднань Jira (TLS, автентифікація);
+      - sheets: сесія Google Sheets (імпорт gspread, OAuth-токен, handle аркуша users);
+      - users: довідник користувачів;
+      - tickets: індекс заявок.
+    Чекає не довше `timeout` секунд; кроки, що не встигли, продовжуються у фоні.
+    Повертає час кожного кроку в секундах (-1 — помилка).
+    """
+    timings: dict[str, float] = {}
+
+    async def load_directory():
+        if not await run_sheets_call(user_directory.refresh, op="users.refresh"):
+            raise RuntimeError("довідник користувачів не завантажено")
+
+    async def sheets_then_directory():
+        await _timed("sheets", lambda: run_sheets_call(_open_users_sheet, op="warmup.session"), timings)
+        # довідник і індекс читаються вже з авторизованою сесією, паралельно
+        await asyncio.gather(
+            _timed("users", load_directory, timings),
+            _timed("tickets", ensure_ticket_index, timings),
+        )
+
+    tasks = [
+        asyncio.create_task(_timed("jira", lambda: jira_client.warm_up(jira_connections), timings)),
+        asyncio.create_task(sheets_then_directory()),
+    ]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    if pending:
+        logger.warning("[STARTUP] Прогрів не завершився за %.0f с — продовжую у фоні", timeout)
+        for task in pending:
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+    return dict(timings)
+
+
+def format_timings(timings: dict[str, float]) -> str:
+    return ", ".join(
+        f"{name} {'помилка' if seconds < 0 else f'{seconds:.2f} с'}" for name, seconds in timings.items()
+    )
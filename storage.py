@@ -0,0 +1,349 @@
+# storage.py
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from telegram.ext import BasePersistence, CallbackContext, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# SQLITE
+# -----------------------
+
+class SQLiteDatabase:
+    """
+    Локальна вбудована БД SQLite у режимі WAL.
+    Записи виконуються в одному виділеному потоці (через run()), щоб не блокувати
+    event loop; короткі точкові читання можна робити напряму через read().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._writer: sqlite3.Connection | None = None
+        self._reader: sqlite3.Connection | None = None
+        self._migrations: list[str] = []
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        for sql in self._migrations:
+            conn.executescript(sql)
+        return conn
+
+    def add_schema(self, sql: str) -> None:
+        """Реєструє CREATE TABLE IF NOT EXISTS ... — виконується при кожному підключенні."""
+        self._migrations.append(sql)
+        for conn in (self._writer, self._reader):
+            if conn is not None:
+                conn.executescript(sql)
+
+    def _writer_conn(self) -> sqlite3.Connection:
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    def _reader_conn(self) -> sqlite3.Connection:
+        if self._reader is None:
+            self._reader = self._connect()
+        return self._reader
+
+    async def run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Виконує fn(conn) у потоці БД."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(self._writer_conn()))
+
+    def read(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """Коротке читання з поточного потоку (WAL дозволяє читати паралельно із записом)."""
+        return self._reader_conn().execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        for conn in (self._reader, self._writer):
+            if conn is not None:
+                conn.close()
+        self._reader = self._writer = None
+
+
+# -----------------------
+# СЕСІЇ КОРИСТУВАЧІВ
+# -----------------------
+
+SESSIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id    INTEGER PRIMARY KEY,
+    data       TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class SessionPersistence(BasePersistence):
+    """
+    Persistence для context.user_data на SQLite.
+    - сесії не завантажуються всі при старті: кожна підтягується з БД при першому
+      зверненні до context.user_data (див. SessionContext);
+    - записуються лише змінені сесії: PTB передає користувачів, чиї оновлення
+      оброблено за update_interval, а незмінені дані відсіюються порівнянням;
+    - усі сесії одного циклу збереження пишуться однією транзакцією.
+    """
+
+    def __init__(self, db: SQLiteDatabase, update_interval: float = 5.0):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.db = db
+        self.db.add_schema(SESSIONS_SCHEMA)
+        self._loaded: set[int] = set()
+        self._saved: dict[int, str] = {}
+        self._pending: dict[int, str] = {}
+        self._flush_future: asyncio.Future | None = None
+
+    @staticmethod
+    def _dump(data: dict) -> str:
+        return json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+
+    # --- ліниве завантаження ---
+
+    def ensure_loaded(self, user_id: int, data: dict) -> None:
+        if user_id in self._loaded:
+            return
+        try:
+            rows = self.db.read("SELECT data FROM sessions WHERE user_id = ?", (user_id,))
+        except sqlite3.Error as e:
+            # сесія лишається не завантаженою — і не буде перезаписана порожньою
+            logger.error(f"[SESSIONS] Не вдалося прочитати сесію {user_id}: {e}")
+            return
+        self._loaded.add(user_id)
+        if rows:
+            stored = json.loads(rows[0][0])
+            for key, value in stored.items():
+                data.setdefault(key, value)
+            self._saved[user_id] = rows[0][0]
+
+    # --- BasePersistence: user_data ---
+
+    async def get_user_data(self) -> dict:
+        return {}
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        if user_id not in self._loaded:
+            return  # сесію не відкривали — нічого не змінилось, а порожній dict не має затерти збережену
+        payload = self._dump(data)
+        if self._saved.get(user_id) == payload:
+            return
+        self._pending[user_id] = payload
+        if self._flush_future is None:
+            self._flush_future = asyncio.ensure_future(self._flush_soon())
+        await asyncio.shield(self._flush_future)
+
+    async def _flush_soon(self) -> None:
+        # один прохід циклу: решта update_user_data з цього ж збереження потрапить у ту саму транзакцію
+        await asyncio.sleep(0)
+        self._flush_future = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        now = time.time()
+
+        def write(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT INTO sessions (user_id, data, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                    [(uid, payload, now) for uid, payload in pending.items()],
+                )
+
+        try:
+            await self.db.run(write)
+        except sqlite3.Error as e:
+            logger.error(f"[SESSIONS] Помилка запису {len(pending)} сесій: {e}")
+            for uid, payload in pending.items():
+                self._pending.setdefault(uid, payload)
+            return
+        self._saved.update(pending)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._pending.pop(user_id, None)
+        self._saved.pop(user_id, None)
+        await self.db.run(lambda conn: conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,)))
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    # --- решта даних не зберігається ---
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def get_callback_data(self):
+        return None
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def get_conversations(self, name: str) -> dict:
+        return {}
+
+    async def update_conversation(self, name: str, key, new_state) -> None:
+        pass
+
+
+class SessionContext(CallbackContext):
+    """CallbackContext, який підтягує сесію користувача з БД при першому зверненні до user_data."""
+
+    @property
+    def user_data(self):
+        data = super().user_data
+        persistence = self.application.persistence
+        if data is not None and isinstance(persistence, SessionPersistence):
+            persistence.ensure_loaded(self._user_id, data)
+        return data
+
+
+# -----------------------
+# СПІЛЬНЕ СХОВИЩЕ КЕШІВ
+# -----------------------
+
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_rows (
+    name   TEXT NOT NULL,
+    row_no INTEGER NOT NULL,
+    data   TEXT NOT NULL,
+    PRIMARY KEY (name, row_no)
+);
+CREATE TABLE IF NOT EXISTS shared_meta (
+    name      TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL,
+    row_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shared_events (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    name       TEXT NOT NULL,
+    data       TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+# скільки зберігаються події shared_events: процес, що відстав більше, їх пропустить
+SHARED_EVENTS_KEEP_SECONDS = 3600
+
+
+class SharedSheetStore:
+    """
+    Локальна копія рядків аркушів Google Sheets у файлі SQLite, спільна для
+    всіх процесів-обробників на одній машині. Процес, що першим виявив
+    застарілу копію, перечитує аркуш і публікує рядки; решта читають їх звідси.
+    Синхронний API — викликається з потоків Sheets; з'єднання окреме для кожного потоку.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.executescript(SHARED_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def meta(self, name: str) -> tuple[float, int] | None:
+        """(час останньої синхронізації з Google, номер останнього рядка) або None."""
+        row = self._conn().execute(
+            "SELECT synced_at, row_count FROM shared_meta WHERE name = ?", (name,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def read_rows(self, name: str, after_row: int = 0) -> list[tuple[int, list]]:
+        cur = self._conn().execute(
+            "SELECT row_no, data FROM shared_rows WHERE name = ? AND row_no > ? ORDER BY row_no",
+            (name, after_row),
+        )
+        return [(row_no, json.loads(data)) for row_no, data in cur]
+
+    def publish(self, name: str, rows: list[list], first_row: int, replace: bool = False) -> None:
+        """Записує рядки аркуша, починаючи з first_row; replace=True — замінює всю копію."""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if replace:
+                conn.execute("DELETE FROM shared_rows WHERE name = ?", (name,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO shared_rows (name, row_no, data) VALUES (?, ?, ?)",
+                [(name, first_row + i, json.dumps(row, ensure_ascii=False)) for i, row in enumerate(rows)],
+            )
+            row_count = conn.execute(
+                "SELECT COALESCE(MAX(row_no), 0) FROM shared_rows WHERE name = ?", (name,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_meta (name, synced_at, row_count) VALUES (?, ?, ?)",
+                (name, time.time(), row_count),
+            )
+
+    def publish_event(self, name: str, data) -> None:
+        """Додає подію для інших процесів (напр. оновлення задачі з вебхука Jira)."""
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM shared_events WHERE created_at < ?", (now - SHARED_EVENTS_KEEP_SECONDS,))
+            conn.execute(
+                "INSERT INTO shared_events (name, data, created_at) VALUES (?, ?, ?)",
+                (name, json.dumps(data, ensure_ascii=False), now),
+            )
+
+    def last_event(self) -> int:
+        return self._conn().execute("SELECT COALESCE(MAX(seq), 0) FROM shared_events").fetchone()[0]
+
+    def read_events(self, name: str, after_seq: int) -> tuple[int, list]:
+        """Події name після after_seq. Повертає (останній seq, [data, ...])."""
+        rows = self._conn().execute(
+            "SELECT seq, data FROM shared_events WHERE seq > ? AND name = ? ORDER BY seq",
+            (after_seq, name),
+        ).fetchall()
+        if not rows:
+            return after_seq, []
+        return rows[-1][0], [json.loads(data) for _, data in rows]
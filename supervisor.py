@@ -0,0 +1,212 @@
+# supervisor.py
+"""
+Багатопроцесний режим: один процес-супервізор отримує оновлення з Telegram
+(long polling) і розподіляє їх між BOT_WORKERS процесами-обробниками
+консистентним хешуванням chat id. Усі оновлення одного чату завжди потрапляють
+до одного процесу, тож його сесія та порядок повідомлень зберігаються.
+Довідник користувачів та індекс заявок процеси беруть зі спільного
+локального сховища (SharedSheetStore), а не кожен окремо з Google Sheets.
+"""
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import signal
+
+from telegram import Bot, Update
+from telegram.error import Conflict, NetworkError, RetryAfter, TimedOut
+
+from config import (
+    TOKEN,
+    BOT_MODE,
+    SHARED_CACHE_PATH,
+    WORKER_QUEUE_SIZE,
+)
+from updates import chat_key
+
+logger = logging.getLogger(__name__)
+
+
+class HashRing:
+    """Консистентне хешування з віртуальними вузлами."""
+
+    def __init__(self, nodes: int, replicas: int = 128):
+        self._ring: list[tuple[int, int]] = sorted(
+            (self._hash(f"{node}:{replica}"), node)
+            for node in range(nodes)
+            for replica in range(replicas)
+        )
+        self._keys = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+    def node_for(self, key) -> int:
+        idx = bisect.bisect(self._keys, self._hash(str(key))) % len(self._ring)
+        return self._ring[idx][1]
+
+
+# -----------------------
+# ПРОЦЕС-ОБРОБНИК
+# -----------------------
+
+def worker_main(index: int, queue) -> None:
+    """Точка входу процесу-обробника."""
+    # SIGINT/SIGTERM від групи процесів або systemd не повинні обірвати обробник
+    # посеред запису: зупиняє його лише супервізор сигнальним None у черзі,
+    # після чого on_shutdown дописує чергу Sheets і outbox
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    try:
+        asyncio.run(_worker(index, queue))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker(index: int, queue) -> None:
+    # імпорт тут: у spawn-процесі main налаштовує логування та обробники
+    from main import build_application, on_startup, on_shutdown
+    from google_sheets_service import user_directory, ticket_index
+    from jira_webhook import jira_webhook
+    from storage import SharedSheetStore
+
+    from metrics import registry
+
+    shared = SharedSheetStore(SHARED_CACHE_PATH)
+    user_directory.shared = shared
+    ticket_index.shared = shared
+    jira_webhook.shared = shared
+    # кожен обробник віддає метрики на власному порту: METRICS_PORT + 1 + index
+    registry.worker = index + 1
+
+    app = build_application(with_updater=False)
+    loop = asyncio.get_running_loop()
+    try:
+        async with app:
+            # post_init/post_shutdown PTB викликає лише в run_polling/run_webhook
+            await on_startup(app)
+            await app.start()
+            logger.info("[WORKER %s] Запущено", index)
+            try:
+                while True:
+                    data = await loop.run_in_executor(None, queue.get)
+                    if data is None:
+                        break
+                    await app.update_queue.put(Update.de_json(data, app.bot))
+            finally:
+                await app.stop()
+    finally:
+        await on_shutdown(app)
+    logger.info("[WORKER %s] Зупинено", index)
+
+
+# -----------------------
+# СУПЕРВІЗОР
+# -----------------------
+
+class Supervisor:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.ring = HashRing(workers)
+        self._ctx = multiprocessing.get_context("spawn")
+        self.queues = [self._ctx.Queue(maxsize=WORKER_QUEUE_SIZE) for _ in range(workers)]
+        self.processes: list = [None] * workers
+        self._stopping = False
+
+    def _spawn(self, index: int) -> None:
+        proc = self._ctx.Process(
+            target=worker_main, args=(index, self.queues[index]), name=f"bot-worker-{index}"
+        )
+        proc.start()
+        self.processes[index] = proc
+        logger.info("[SUPERVISOR] Процес-обробник %s запущено (pid=%s)", index, proc.pid)
+
+    def _watch(self) -> None:
+        """Перезапускає процеси-обробники, що несподівано завершились."""
+        for index, proc in enumerate(self.processes):
+            if proc is not None and not proc.is_alive() and not self._stopping:
+                logger.error("[SUPERVISOR] Процес-обробник %s завершився (код %s) — перезапуск", index, proc.exitcode)
+                self._spawn(index)
+
+    async def _dispatch(self, update: Update) -> None:
+        key = chat_key(update)
+        index = self.ring.node_for(key if key is not None else update.update_id)
+        await asyncio.get_running_loop().run_in_executor(None, self.queues[index].put, update.to_dict())
+
+    async def run(self) -> None:
+        for index in range(self.workers):
+            self._spawn(index)
+
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass
+
+        offset = None
+        async with Bot(TOKEN) as bot:
+            # getUpdates не працює, поки встановлено вебхук (напр. після BOT_MODE=webhook)
+            await self._delete_webhook(bot)
+            while not stop.is_set():
+                self._watch()
+                try:
+                    updates = await bot.get_updates(
+                        offset=offset, timeout=25, allowed_updates=Update.ALL_TYPES,
+                        read_timeout=35,
+                    )
+                except RetryAfter as e:
+                    retry = e.retry_after
+                    await asyncio.sleep(retry.total_seconds() if hasattr(retry, "total_seconds") else retry)
+                    continue
+                except Conflict as e:
+                    # вебхук встановили знову або працює інший екземпляр з тим самим токеном
+                    logger.error("[SUPERVISOR] getUpdates: конфлікт — %s", e)
+                    await self._delete_webhook(bot)
+                    await asyncio.sleep(5)
+                    continue
+                except (NetworkError, TimedOut) as e:
+                    logger.warning("[SUPERVISOR] getUpdates: %s", e)
+                    await asyncio.sleep(1)
+                    continue
+                for update in updates:
+                    await self._dispatch(update)
+                    offset = update.update_id + 1
+            # підтверджуємо Telegram останнє отримане оновлення
+            if offset is not None:
+                try:
+                    await bot.get_updates(offset=offset, timeout=0)
+                except Exception:
+                    pass
+
+        await self.shutdown()
+
+    @staticmethod
+    async def _delete_webhook(bot: Bot) -> None:
+        try:
+            await bot.delete_webhook()
+        except (NetworkError, TimedOut) as e:
+            logger.warning("[SUPERVISOR] deleteWebhook: %s", e)
+
+    async def shutdown(self) -> None:
+        self._stopping = True
+        loop = asyncio.get_running_loop()
+        for queue in self.queues:
+            await loop.run_in_executor(None, queue.put, None)
+        for proc in self.processes:
+            if proc is not None:
+                await loop.run_in_executor(None, proc.join, 60)
+                if proc.is_alive():
+                    # обробники ігнорують SIGTERM — зупиняємо примусово
+                    proc.kill()
+        logger.info("[SUPERVISOR] Усі процеси-обробники зупинено")
+
+
+def run_supervisor(workers: int) -> None:
+    if BOT_MODE == "webhook":
+        logger.warning("⚠️ Багатопроцесний режим отримує оновлення лише через polling — BOT_MODE=webhook ігнорується")
+    logger.info("⚙️ SUPERVISOR: %s процесів-обробників", workers)
+    asyncio.run(Supervisor(workers).run())
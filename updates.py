@@ -0,0 +1,105 @@
+# updates.py
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, BaseUpdateProcessor, ContextTypes
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """
+    Відкидає повторні доставки того самого update_id (Telegram повторює
+    webhook-запит, якщо не отримав відповіді вчасно).
+    Реєструється як TypeHandler у групі -1, тобто перед усіма обробниками.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._seen: OrderedDict[int, None] = OrderedDict()
+        self.duplicates = 0
+
+    def seen(self, update_id: int) -> bool:
+        if update_id in self._seen:
+            self.duplicates += 1
+            return True
+        self._seen[update_id] = None
+        if len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+        return False
+
+    async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if self.seen(update.update_id):
+            logger.info("[UPDATES] Повторна доставка update_id=%s — пропущено", update.update_id)
+            raise ApplicationHandlerStop
+
+
+def chat_key(update: object) -> int | None:
+    """Ключ впорядкування: чат оновлення, або користувач, якщо чату немає."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return None
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обробляє оновлення з різних чатів паралельно (не більше max_concurrent
+    одночасно), а оновлення одного чату — строго по черзі, у порядку надходження.
+    Від цього залежать покрокова форма (`step`) та режим коментаря.
+
+    Базовий семафор PTB обмежує кількість оновлень у роботі (max_pending),
+    а слот паралельності займається лише після отримання черги свого чату —
+    щоб серія повідомлень з одного чату не тримала слоти інших.
+    """
+
+    def __init__(self, max_concurrent: int, max_pending: int = 1024):
+        super().__init__(max_concurrent_updates=max(max_pending, max_concurrent))
+        self.max_concurrent = max_concurrent
+        self._slots = asyncio.BoundedSemaphore(max_concurrent)
+        self._chat_locks: dict[int, asyncio.Lock] = {}
+        self._chat_waiters: dict[int, int] = {}
+        self.in_flight = 0
+
+    async def do_process_update(self, update: object, coroutine: Awaitable) -> None:
+        key = chat_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        lock = self._chat_locks.get(key)
+        if lock is None:
+            lock = self._chat_locks[key] = asyncio.Lock()
+        self._chat_waiters[key] = self._chat_waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                await self._run(coroutine)
+        finally:
+            self._chat_waiters[key] -= 1
+            if not self._chat_waiters[key]:
+                del self._chat_waiters[key]
+                del self._chat_locks[key]
+
+    async def _run(self, coroutine: Awaitable) -> None:
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                await coroutine
+            finally:
+                self.in_flight -= 1
+
+    @property
+    def waiting_chats(self) -> int:
+        return len(self._chat_locks)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass